@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark batch column parsing against the per-cell parsers
+"""
+
+import os
+import random
+import re
+import sys
+import timeit
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from psx_mcp.parsers import parse_float_column, parse_int_column  # noqa: E402
+
+
+def parse_float_cell(text: str) -> float:
+    """Per-cell float parsing the market watch scraper used before columns"""
+    if not text or text == "-":
+        return 0.0
+    try:
+        return float(re.sub(r"[^\d.-]", "", text))
+    except ValueError:
+        return 0.0
+
+
+def parse_int_cell(text: str) -> int:
+    """Per-cell integer parsing the market watch scraper used before columns"""
+    if not text or text == "-":
+        return 0
+    try:
+        return int(re.sub(r"[^\d]", "", text))
+    except ValueError:
+        return 0
+
+
+def sample_column(rows: int = 460) -> list:
+    """Cell texts shaped like one market watch price column"""
+    rng = random.Random(42)
+    values = [f"{rng.uniform(1, 3000):,.2f}" for _ in range(rows)]
+    for i in rng.sample(range(rows), rows // 20):
+        values[i] = "-"
+    return values
+
+
+def main():
+    """Time one snapshot's worth of numeric cells (8 columns x 460 rows)"""
+    floats = sample_column()
+    volumes = [value.split(".")[0] for value in floats]
+
+    assert list(parse_float_column(floats)) == [parse_float_cell(v) for v in floats]
+    assert list(parse_int_column(volumes)) == [parse_int_cell(v) for v in volumes]
+
+    def per_cell():
+        for _ in range(7):
+            [parse_float_cell(value) for value in floats]
+        [parse_int_cell(value) for value in volumes]
+
+    def batch():
+        for _ in range(7):
+            parse_float_column(floats)
+        parse_int_column(volumes)
+
+    runs = 200
+    for name, func in (("per-cell", per_cell), ("batch", batch)):
+        seconds = timeit.timeit(func, number=runs) / runs
+        print(f"{name:>8}: {seconds * 1000:7.3f} ms per snapshot")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent EOD fetches against a local stand-in for the PSX server
+
+Each new connection pays a fixed setup delay, standing in for the TCP and TLS
+handshakes to dps.psx.com.pk, so the numbers show what pool size and prewarming
+save when many symbols are fetched at once.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from psx_mcp.client import PSXClient  # noqa: E402
+from psx_mcp.ratelimit import RateLimiter  # noqa: E402
+
+HANDSHAKE_DELAY = 0.05  # seconds per new connection
+SYMBOLS = [f"SYM{i}" for i in range(40)]
+PAYLOAD = json.dumps(
+    {
+        "status": 1,
+        "message": "",
+        "data": [
+            [1759489200 - day * 86400, 300.0 + day, 1000 + day, 299.0]
+            for day in range(250)
+        ],
+    }
+).encode()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves the same EOD payload for every path over keep-alive connections"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        time.sleep(HANDSHAKE_DELAY)
+        super().setup()
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Threaded server with a listen backlog deep enough for the whole pool"""
+
+    daemon_threads = True
+    request_queue_size = 64
+
+
+async def fetch_all(base_url: str, max_connections: int, prewarm: int) -> float:
+    """Time one batch of concurrent EOD fetches with a fresh client"""
+    # A limiter that never queues, so only the pool and handshakes are timed
+    client = PSXClient(
+        base_url=base_url,
+        max_connections=max_connections,
+        rate_limiter=RateLimiter(rate=10_000, burst=len(SYMBOLS) + prewarm),
+    )
+    try:
+        if prewarm:
+            await client.prewarm(prewarm)
+        start = time.perf_counter()
+        await asyncio.gather(*(client.get_eod_data(symbol) for symbol in SYMBOLS))
+        return time.perf_counter() - start
+    finally:
+        await client.close()
+
+
+def main():
+    """Compare pool sizes with and without prewarmed connections"""
+    server = StandInServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print(
+        f"{len(SYMBOLS)} concurrent EOD fetches, {HANDSHAKE_DELAY * 1000:.0f} ms setup"
+    )
+    try:
+        for max_connections in (1, 5, 20):
+            for prewarm in (0, max_connections):
+                seconds = asyncio.run(fetch_all(base_url, max_connections, prewarm))
+                print(
+                    f"max_connections={max_connections:>2} prewarm={prewarm:>2}: "
+                    f"{seconds * 1000:7.1f} ms"
+                )
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Benchmark the market watch HTML parser backends on a full-size page
+"""
+
+import os
+import re
+import sys
+import timeit
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from psx_mcp.parsers import PARSERS  # noqa: E402
+
+FIXTURE = os.path.join(
+    os.path.dirname(__file__), "..", "tests", "fixtures", "market_watch.html"
+)
+
+
+def full_size_page(target_rows: int = 460) -> str:
+    """Repeat the fixture's data rows until the page has target_rows rows"""
+    with open(FIXTURE, encoding="utf-8") as fh:
+        html = fh.read()
+    body_start = html.index("<tbody")
+    body_start = html.index(">", body_start) + 1
+    body_end = html.index("</tbody>")
+    rows = re.findall(r"\s*<tr>.*?</tr>", html[body_start:body_end], re.DOTALL)
+    repeated = "".join(rows[i % len(rows)] for i in range(target_rows))
+    return html[:body_start] + repeated + html[body_end:]
+
+
+def main():
+    """Time every backend and check that they agree"""
+    html = full_size_page()
+    reference = PARSERS["bs4"](html)
+    print(f"Page: {len(html):,} chars, {len(reference)} rows")
+
+    for name, parser in PARSERS.items():
+        assert parser(html) == reference, f"{name} disagrees with bs4"
+        runs = 20
+        seconds = timeit.timeit(lambda: parser(html), number=runs) / runs
+        print(f"{name:>6}: {seconds * 1000:8.2f} ms per page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark tool output formats on a full market watch snapshot
+"""
+
+import json
+import os
+import random
+import sys
+import timeit
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from psx_mcp.output import OUTPUT_FORMATS, encode  # noqa: E402
+from psx_mcp.snapshot import MarketSnapshot  # noqa: E402
+
+
+def sample_snapshot(rows: int = 460) -> MarketSnapshot:
+    """Snapshot shaped like one market watch scrape"""
+    rng = random.Random(42)
+    return MarketSnapshot.from_rows(
+        (
+            {
+                "symbol": f"SYM{i}",
+                "sector": f"SECTOR {i % 35}",
+                "listed_in": "KSE100",
+                "ldcp": rng.uniform(1, 3000),
+                "open_price": rng.uniform(1, 3000),
+                "high_price": rng.uniform(1, 3000),
+                "low_price": rng.uniform(1, 3000),
+                "current_price": rng.uniform(1, 3000),
+                "change": rng.uniform(-50, 50),
+                "change_percent": rng.uniform(-10, 10),
+                "volume": rng.randint(0, 5_000_000),
+            }
+            for i in range(rows)
+        ),
+        version=1,
+    )
+
+
+def main():
+    """Time and size market_data's payload in every output format"""
+    payload = {"snapshot_version": 1, "snapshot_age": 0.5}
+    payload["data"] = sample_snapshot().rows()
+
+    runs = 100
+    seconds = timeit.timeit(lambda: json.dumps(payload, indent=2), number=runs)
+    size = len(json.dumps(payload, indent=2))
+    print(f"{'baseline':>8}: {seconds / runs * 1000:7.3f} ms, {size:>7} bytes")
+    for output_format in OUTPUT_FORMATS:
+        seconds = timeit.timeit(lambda: encode(payload, output_format), number=runs)
+        size = len(encode(payload, output_format))
+        print(f"{output_format:>8}: {seconds / runs * 1000:7.3f} ms, {size:>7} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark bisect range slicing against a linear filter over records
+"""
+
+import os
+import random
+import sys
+import timeit
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from psx_mcp.timeseries import TimeSeries  # noqa: E402
+
+DAY = 86400
+
+
+def five_year_history(days: int = 1825) -> list:
+    """Raw EOD points shaped like a PSX history payload (newest first)"""
+    rng = random.Random(42)
+    start = 1601510400
+    return [
+        [start + i * DAY, rng.uniform(50, 500), rng.randint(0, 5_000_000), 100.0]
+        for i in reversed(range(days))
+    ]
+
+
+def main():
+    """Time a 30-day window and a nearest lookup on a five-year history"""
+    series = TimeSeries.from_raw(five_year_history(), with_open=True)
+    records = series.to_records()
+    end = series[0]["timestamp"]
+    start = end - 30 * DAY
+
+    def linear():
+        [point for point in records if start <= point["timestamp"] <= end]
+        min(records, key=lambda x: abs(x["timestamp"] - start))
+
+    def bisect():
+        series.between(start, end).to_records()
+        series.nearest(start)
+
+    assert series.between(start, end).to_records() == [
+        point for point in records if start <= point["timestamp"] <= end
+    ]
+
+    runs = 500
+    for name, func in (("linear", linear), ("bisect", bisect)):
+        seconds = timeit.timeit(func, number=runs) / runs
+        print(f"{name:>8}: {seconds * 1000:7.3f} ms per query")
+
+
+if __name__ == "__main__":
+    main()
@@ -196,7 +196,7 @@ async def main():
     show_usage_examples()
     await demo_new_tools()
 
-    print("\n🎉 Advanced PSX MCP Server is ready with 12 powerful tools!")
+    print("\n🎉 Advanced PSX MCP Server is ready with 17 powerful tools!")
 
 
 if __name__ == "__main__":
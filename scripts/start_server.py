@@ -16,7 +16,7 @@ def main():
     """Start the MCP server"""
     print("🚀 Starting PSX MCP Server...")
     print(f"📍 Server: {mcp.name}")
-    print("🔧 Available tools: 12")
+    print("🔧 Available tools: 17")
     print("📊 Data source: Pakistan Stock Exchange")
     print("-" * 50)
 
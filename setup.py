@@ -56,6 +56,15 @@ setup(
             "pytest-asyncio>=0.21.0",
             "pytest-cov>=4.0.0",
         ],
+        "fast": [
+            "orjson>=3.8.0",
+        ],
+        "http2": [
+            "httpx[http2]>=0.25.0",
+        ],
+        "brotli": [
+            "httpx[brotli]>=0.25.0",
+        ],
     },
     entry_points={
         "console_scripts": [
@@ -0,0 +1,151 @@
+"""
+OHLCV bars resampled from intraday series
+"""
+
+import operator
+import re
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Dict, List, Sequence, Tuple
+
+from .timeseries import TimeSeries
+
+BAR_FIELDS = ("timestamp", "open", "high", "low", "close", "volume", "vwap")
+BAR_TYPES = ("q", "d", "d", "d", "d", "q", "d")
+INTERVAL_UNITS = {"s": 1, "m": 60, "h": 3600}
+
+
+def parse_interval(interval: str) -> int:
+    """Bar length in seconds from e.g. '1m', '5m', '90s', '1h' or '15' (minutes)"""
+    match = re.fullmatch(r"(\d+)([smh]?)", str(interval).strip().lower())
+    if not match or int(match.group(1)) <= 0:
+        raise ValueError(
+            f"Invalid interval '{interval}', expected e.g. '1m', '5m', '15m' or '1h'"
+        )
+    return int(match.group(1)) * INTERVAL_UNITS[match.group(2) or "m"]
+
+
+class Bars:
+    """OHLCV bars of one interval held as typed columns, oldest first.
+
+    A bar covers ``[timestamp, timestamp + interval)``; bar starts are
+    multiples of interval since the Unix epoch, which puts hourly and shorter
+    bars on whole hours in Karachi time (UTC+5). ``vwap`` is the bar's
+    volume-weighted average price, or its close when nothing traded.
+    """
+
+    __slots__ = ("interval", "columns")
+
+    def __init__(self, interval: int):
+        self.interval = interval
+        self.columns = {
+            field: array(code) for field, code in zip(BAR_FIELDS, BAR_TYPES)
+        }
+
+    def __len__(self) -> int:
+        return len(self.columns["timestamp"])
+
+    def extend(self, series: TimeSeries, start: int = 0) -> None:
+        """Aggregate the series' points from sorted position start into bars.
+
+        The points of each bar are found by bisecting the timestamps, and
+        each aggregate runs over zero-copy column slices.
+        """
+        timestamps, prices, volumes = series.timestamps, series.prices, series.volumes
+        columns = [self.columns[field] for field in BAR_FIELDS]
+        size = len(timestamps)
+        low = start
+        while low < size:
+            bar_start = timestamps[low] - timestamps[low] % self.interval
+            high = bisect_left(timestamps, bar_start + self.interval, low)
+            bar_prices, bar_volumes = prices[low:high], volumes[low:high]
+            volume = sum(bar_volumes)
+            close = bar_prices[-1]
+            turnover = sum(map(operator.mul, bar_prices, bar_volumes))
+            bar = (
+                bar_start,
+                bar_prices[0],
+                max(bar_prices),
+                min(bar_prices),
+                close,
+                volume,
+                round(turnover / volume, 4) if volume else close,
+            )
+            for column, value in zip(columns, bar):
+                column.append(value)
+            low = high
+
+    def without_last(self) -> "Bars":
+        """Copy of these bars minus the last one"""
+        bars = Bars(self.interval)
+        for field, column in self.columns.items():
+            bars.columns[field] = column[:-1]
+        return bars
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Materialize every bar as a dict"""
+        return [
+            dict(zip(BAR_FIELDS, bar))
+            for bar in zip(*(self.columns[field] for field in BAR_FIELDS))
+        ]
+
+    def to_columns(self) -> Dict[str, List[Any]]:
+        """Return each bar field as one list"""
+        return {field: self.columns[field].tolist() for field in BAR_FIELDS}
+
+
+class BarCache:
+    """Resampled bars per (symbol, interval), extended as the series grows.
+
+    Intraday series only gain newer points within a session, so when a
+    series still starts and ends its known part where the cached result did,
+    only its last bar and the new points are aggregated again. Holds at most
+    max_entries results (least recently used are dropped); 0 disables it.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[Bars, int, int, int]]" = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def resample(self, symbol: str, series: TimeSeries, interval: int) -> Bars:
+        """Bars of series at interval seconds, reusing the cached ones"""
+        key = (symbol, interval)
+        timestamps = series.timestamps
+        size = len(timestamps)
+        entry = self._entries.get(key)
+        if entry is not None and self._extends(entry, timestamps):
+            cached, count = entry[0], entry[1]
+            if size == count:
+                self._entries.move_to_end(key)
+                return cached
+            # Only the last bar can gain points: rebuild it and what follows
+            bars = cached.without_last()
+            bars.extend(
+                series, bisect_left(timestamps, cached.columns["timestamp"][-1])
+            )
+        else:
+            bars = Bars(interval)
+            bars.extend(series)
+
+        if self.max_entries > 0 and size:
+            self._entries[key] = (bars, size, timestamps[0], timestamps[size - 1])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return bars
+
+    @staticmethod
+    def _extends(entry: Tuple[Bars, int, int, int], timestamps: Sequence[int]) -> bool:
+        """Whether timestamps are the cached points, possibly followed by more"""
+        _, count, first, last = entry
+        return (
+            0 < count <= len(timestamps)
+            and timestamps[0] == first
+            and timestamps[count - 1] == last
+        )
@@ -2,145 +2,646 @@
 PSX API Client for fetching market data
 """
 
+import asyncio
+import functools
+import importlib.util
+import itertools
+import logging
+import os
+import time
 import httpx
-from typing import List, Dict, Any
-from bs4 import BeautifulSoup
-import re
-from .models import TimeSeriesData
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Sequence, Set, Tuple
+from .settings import settings
+from .bars import BarCache
+from .conditional import ValidatorCache
+from .intraday import IntradayBuffer
+from .parsers import MarketWatchTokenizer, market_watch_columns, parse_market_watch
+from .ratelimit import (
+    RateLimiter,
+    background_priority,
+    current_priority,
+    shared_priority,
+)
+from .resilience import CircuitBreaker, CircuitOpenError, backoff_delay, is_transient
+from .snapshot import MarketSnapshot, column_rows
+from .store import EODStore
+from .timeseries import TimeSeries
+
+logger = logging.getLogger(__name__)
+
+
+def accept_encoding() -> str:
+    """Content codings httpx can decode in this environment, best first"""
+    encodings = ["gzip", "deflate"]
+    if any(importlib.util.find_spec(name) for name in ("brotli", "brotlicffi")):
+        encodings.insert(0, "br")
+    return ", ".join(encodings)
+
+
+def cache_ttls(soft: float, hard: float) -> Tuple[float, float]:
+    """Soft and hard TTL of a cached data type; hard is never below soft"""
+    return soft, max(soft, hard)
 
 
 class PSXClient:
     """Client for fetching data from PSX website"""
 
-    def __init__(self):
-        self.base_url = "https://dps.psx.com.pk"
-        self.client = httpx.AsyncClient(timeout=30.0)
+    def __init__(
+        self,
+        snapshot_ttl: Optional[float] = None,
+        series_ttl: Optional[float] = None,
+        max_age: Optional[float] = None,
+        html_parser: Optional[str] = None,
+        streaming: Optional[bool] = None,
+        eod_store: Optional[EODStore] = None,
+        base_url: Optional[str] = None,
+        http2: Optional[bool] = None,
+        max_connections: Optional[int] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        self.base_url = base_url or settings.PSX_BASE_URL
+        self.http2 = settings.HTTP2 if http2 is None else http2
+        if self.http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP2 is enabled but h2 is not installed; using HTTP/1.1")
+            self.http2 = False
+        self.client = self._build_http_client(
+            max_connections or settings.MAX_CONNECTIONS
+        )
+        self.html_parser = html_parser or settings.HTML_PARSER
+        self.streaming = (
+            settings.MARKET_WATCH_STREAMING if streaming is None else streaming
+        )
+        # (soft, hard) TTL per data type: past the soft TTL cached data is
+        # served while it is revalidated, past the hard TTL callers wait.
+        # snapshot_ttl/series_ttl override the soft TTLs, max_age the hard ones
+        self.ttls: Dict[str, Tuple[float, float]] = {
+            "snapshot": cache_ttls(
+                settings.SNAPSHOT_TTL if snapshot_ttl is None else snapshot_ttl,
+                settings.SNAPSHOT_MAX_AGE if max_age is None else max_age,
+            ),
+            "intraday": cache_ttls(
+                settings.INTRADAY_TTL if series_ttl is None else series_ttl,
+                settings.INTRADAY_MAX_AGE if max_age is None else max_age,
+            ),
+            "eod": cache_ttls(
+                settings.EOD_TTL if series_ttl is None else series_ttl,
+                settings.EOD_MAX_AGE if max_age is None else max_age,
+            ),
+        }
+        self.eod_store = eod_store
+        self.validators = ValidatorCache(settings.VALIDATOR_CACHE_SIZE)
+        self.limiter = rate_limiter or RateLimiter.from_settings(settings)
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        # Last good series per URL and when it was fetched: served while
+        # fresh, and marked stale when PSX is failing
+        self._series: "OrderedDict[str, Tuple[TimeSeries, float]]" = OrderedDict()
+        # Intraday sessions per URL, extended with each refresh's new points
+        self._intraday: "OrderedDict[str, IntradayBuffer]" = OrderedDict()
+        self.bars = BarCache(settings.BAR_CACHE_SIZE)
+        self._snapshot: Optional[MarketSnapshot] = None
+        self._snapshot_version = 0
+        # Recent snapshots and pinned series, so cursors page over fixed data
+        self._snapshots: "OrderedDict[int, MarketSnapshot]" = OrderedDict()
+        self._pinned: "OrderedDict[int, TimeSeries]" = OrderedDict()
+        self._pin_ids: Dict[int, int] = {}
+        self._pin_version = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._flight_priority: Dict[str, List[int]] = {}
+        self._revalidating: Set[asyncio.Future] = set()
+
+    def _build_http_client(self, max_connections: int) -> httpx.AsyncClient:
+        """Create the pooled HTTP client from the connection settings"""
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=min(
+                settings.MAX_KEEPALIVE_CONNECTIONS, max_connections
+            ),
+            keepalive_expiry=settings.KEEPALIVE_EXPIRY,
+        )
+        return httpx.AsyncClient(
+            headers={"Accept-Encoding": accept_encoding()},
+            timeout=settings.REQUEST_TIMEOUT,
+            limits=limits,
+            http2=self.http2,
+        )
+
+    async def prewarm(self, connections: Optional[int] = None) -> int:
+        """Open keep-alive connections to PSX before the first tool call.
+
+        Sends concurrent HEAD requests so the pool holds ready connections
+        (one is enough with HTTP/2 multiplexing). Best effort: failures are
+        ignored. Returns the number of requests that succeeded.
+        """
+        count = settings.PREWARM_CONNECTIONS if connections is None else connections
+        if count <= 0:
+            return 0
+        if self.http2:
+            count = 1
+        results = await asyncio.gather(
+            *(self._head(self.base_url) for _ in range(count)),
+            return_exceptions=True,
+        )
+        return sum(1 for result in results if not isinstance(result, BaseException))
+
+    async def _single_flight(
+        self, key: str, fetch: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Run fetch once per key; concurrent callers await the same result.
+
+        Results are shared between callers and must be treated as read-only.
+        The fetch waits for rate limit tokens at the most urgent priority of
+        its callers, so a tool call joining a background refresh is not
+        queued behind other background work.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            with shared_priority() as priority:
+                task = asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+            self._flight_priority[key] = priority
+            task.add_done_callback(lambda done: self._flight_done(key, done))
+        else:
+            self.limiter.promote(self._flight_priority[key], current_priority())
+        # Shield so one cancelled caller does not cancel the shared fetch
+        return await asyncio.shield(task)
+
+    def _flight_done(self, key: str, task: asyncio.Future):
+        """Forget a finished in-flight fetch"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            del self._flight_priority[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every caller went away
+            task.exception()
+
+    def _revalidate(self, key: str, refresh: Callable[[], Awaitable[Any]]):
+        """Run refresh in the background unless key is already being fetched.
+
+        The refresh runs at background priority, behind tool calls.
+        """
+        if key in self._inflight:
+            return
+        with background_priority():
+            task = asyncio.ensure_future(refresh())
+        self._revalidating.add(task)
+        task.add_done_callback(self._revalidated)
+
+    def _revalidated(self, task: asyncio.Future):
+        """Forget a finished background refresh, logging its failure"""
+        self._revalidating.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Background revalidation failed: %s", task.exception())
+
+    async def get_market_snapshot(self) -> MarketSnapshot:
+        """Return the cached market watch snapshot.
+
+        Past the soft TTL it is still returned at once while one background
+        refresh runs; past the hard TTL the caller waits for a refresh.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            soft, hard = self.ttls["snapshot"]
+            age = snapshot.age
+            if age < soft:
+                return snapshot
+            if age < hard:
+                self._revalidate("snapshot", self.refresh_market_snapshot)
+                return snapshot
+        return await self.refresh_market_snapshot()
+
+    async def refresh_market_snapshot(self) -> MarketSnapshot:
+        """Scrape market watch now, sharing a refresh already in progress"""
+        return await self._single_flight("snapshot", self._refresh_snapshot)
+
+    async def _refresh_snapshot(self) -> MarketSnapshot:
+        """Scrape market watch and publish it as the next snapshot version.
+
+        If the scrape fails, the current snapshot is served marked as stale.
+        """
+        try:
+            columns = await self.get_market_watch_columns()
+        except Exception as e:
+            if self._snapshot is None:
+                raise
+            logger.warning("Serving stale market watch snapshot: %s", e)
+            self._snapshot.stale = True
+            return self._snapshot
+        self._snapshot_version += 1
+        snapshot = MarketSnapshot(columns, version=self._snapshot_version)
+        self._snapshot = snapshot
+        self._snapshots[snapshot.version] = snapshot
+        while len(self._snapshots) > max(settings.SNAPSHOT_HISTORY, 1):
+            self._snapshots.popitem(last=False)
+        return snapshot
+
+    def get_snapshot_version(self, version: int) -> MarketSnapshot:
+        """Return a recent snapshot by version, e.g. to continue a cursor"""
+        snapshot = self._snapshots.get(version)
+        if snapshot is None:
+            raise ValueError(
+                f"Cursor expired: snapshot version {version} is no longer cached"
+            )
+        return snapshot
+
+    def earlier_snapshot(
+        self,
+        current: MarketSnapshot,
+        version: Optional[int] = None,
+        seconds: Optional[float] = None,
+    ) -> MarketSnapshot:
+        """Return a kept snapshot to compare current against.
+
+        Picks the given version, else the newest snapshot fetched at least
+        seconds ago (the oldest kept one if none is that old), else the one
+        before current. Without an older snapshot, current itself is returned.
+        """
+        if version is not None:
+            snapshot = self._snapshots.get(version)
+            if snapshot is None:
+                oldest = next(iter(self._snapshots), current.version)
+                raise ValueError(
+                    f"Snapshot version {version} is not cached; versions "
+                    f"{oldest} to {current.version} are available"
+                )
+            return snapshot
+        earlier = [s for s in self._snapshots.values() if s.version < current.version]
+        if not earlier:
+            return current
+        if seconds is None:
+            return earlier[-1]
+        for snapshot in reversed(earlier):
+            if snapshot.age >= seconds:
+                return snapshot
+        return earlier[0]
+
+    def pin_series(self, series: TimeSeries) -> int:
+        """Keep a series available to later pages and return its pin id"""
+        version = self._pin_ids.get(id(series))
+        if version is not None and self._pinned.get(version) is series:
+            self._pinned.move_to_end(version)
+            return version
+
+        self._pin_version += 1
+        version = self._pin_version
+        self._pinned[version] = series
+        self._pin_ids[id(series)] = version
+        while len(self._pinned) > max(settings.SERIES_PIN_LIMIT, 1):
+            old_version, old = self._pinned.popitem(last=False)
+            if self._pin_ids.get(id(old)) == old_version:
+                del self._pin_ids[id(old)]
+        return version
+
+    def get_pinned_series(self, version: int) -> TimeSeries:
+        """Return a pinned series by pin id"""
+        series = self._pinned.get(version)
+        if series is None:
+            raise ValueError(f"Cursor expired: series {version} is no longer cached")
+        self._pinned.move_to_end(version)
+        return series
 
     async def get_market_watch_data(self) -> List[Dict[str, Any]]:
         """Fetch market watch data for all stocks"""
-        try:
-            response = await self.client.get(f"{self.base_url}/market-watch")
-            response.raise_for_status()
+        return column_rows(await self.get_market_watch_columns())
 
-            # Parse HTML response
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Find the market data table
-            table = soup.find('table', {'id': 'marketWatchTable'}) or soup.find('table')
-            if not table:
-                raise Exception("Market data table not found in HTML response")
-
-            stocks = []
-            rows = table.find_all('tr')[1:]  # Skip header row
-            
-            for row in rows:
-                cells = row.find_all(['td', 'th'])
-                if len(cells) >= 9:  # Ensure we have enough columns
-                    try:
-                        stock_data = {
-                            "symbol": cells[0].get_text(strip=True),
-                            "sector": cells[1].get_text(strip=True),
-                            "listed_in": cells[2].get_text(strip=True),
-                            "ldcp": self._parse_float(cells[3].get_text(strip=True)),
-                            "open_price": self._parse_float(cells[4].get_text(strip=True)),
-                            "high_price": self._parse_float(cells[5].get_text(strip=True)),
-                            "low_price": self._parse_float(cells[6].get_text(strip=True)),
-                            "current_price": self._parse_float(cells[7].get_text(strip=True)),
-                            "change": self._parse_float(cells[8].get_text(strip=True)),
-                            "change_percent": self._parse_float(cells[9].get_text(strip=True)) if len(cells) > 9 else 0.0,
-                            "volume": self._parse_int(cells[10].get_text(strip=True)) if len(cells) > 10 else 0,
-                        }
-                        stocks.append(stock_data)
-                    except (ValueError, IndexError) as e:
-                        # Skip rows with invalid data
-                        continue
-
-            return stocks
+    async def get_market_watch_columns(self) -> Dict[str, Sequence]:
+        """Fetch market watch data for all stocks as typed columns"""
+        url = f"{self.base_url}/market-watch"
+        return await self._single_flight(url, lambda: self._fetch_market_watch(url))
 
+    async def _fetch_market_watch(self, url: str) -> Dict[str, Sequence]:
+        """Download and parse the market watch table"""
+        try:
+            return await self._resilient(
+                "market-watch",
+                lambda: self._download_market_watch(url),
+                has_fallback=self._snapshot is not None,
+            )
         except Exception as e:
             raise Exception(f"Failed to fetch market watch data: {str(e)}")
 
-    def _parse_float(self, text: str) -> float:
-        """Parse float value from text, handling commas and other formatting"""
-        if not text or text == '-':
-            return 0.0
-        # Remove commas and other formatting
-        cleaned = re.sub(r'[^\d.-]', '', text)
-        try:
-            return float(cleaned)
-        except ValueError:
-            return 0.0
+    async def _download_market_watch(self, url: str) -> Dict[str, Sequence]:
+        """One attempt at downloading and parsing the market watch table"""
+        if self.streaming and self.html_parser == "fast":
+            return await self._stream_market_watch(url)
 
-    def _parse_int(self, text: str) -> int:
-        """Parse integer value from text, handling commas and other formatting"""
-        if not text or text == '-':
-            return 0
-        # Remove commas and other formatting
-        cleaned = re.sub(r'[^\d]', '', text)
-        try:
-            return int(cleaned)
-        except ValueError:
-            return 0
+        response = await self._get(url)
+        if self.validators.is_not_modified(url, response):
+            return self.validators.reuse(url)
+        response.raise_for_status()
 
-    async def get_intraday_data(self, symbol: str) -> List[Dict[str, Any]]:
-        """Fetch intraday time series data for a specific stock"""
-        try:
-            response = await self.client.get(f"{self.base_url}/timeseries/int/{symbol}")
+        # Parse HTML response
+        rows = parse_market_watch(response.text, self.html_parser)
+
+        # Convert numeric cells column by column
+        columns = market_watch_columns(rows)
+        self.validators.store(url, response, columns)
+        return columns
+
+    async def _stream_market_watch(self, url: str) -> Dict[str, Sequence]:
+        """Tokenize the market watch table while the response body is downloading.
+
+        Decoded chunks go straight into the incremental tokenizer and each row
+        is split into cells as soon as its closing tag arrives, so parsing
+        finishes with the download. The decoded chunks are kept as well, so a
+        page the tokenizer cannot model is parsed with BeautifulSoup instead.
+        """
+        tokenizer = MarketWatchTokenizer()
+        rows: Optional[List[List[str]]] = []
+        received: List[str] = []
+        headers = self.validators.headers(url)
+        async with self.client.stream("GET", url, headers=headers) as response:
+            if self.validators.is_not_modified(url, response):
+                return self.validators.reuse(url)
             response.raise_for_status()
+            chunks = response.aiter_text()
+            try:
+                async for chunk in chunks:
+                    received.append(chunk)
+                    rows.extend(tokenizer.feed(chunk))
+                rows.extend(tokenizer.close())
+            except ValueError:
+                # Read the rest of the page for the BeautifulSoup backend
+                received.extend([chunk async for chunk in chunks])
+                rows = None
+        if rows is None:
+            rows = parse_market_watch("".join(received), "bs4")
+        columns = market_watch_columns(rows)
+        self.validators.store(url, response, columns)
+        return columns
+
+    async def _get(self, url: str) -> httpx.Response:
+        """GET url as a conditional request if its validators are cached"""
+        return await self.client.get(url, headers=self.validators.headers(url))
+
+    async def _head(self, url: str) -> httpx.Response:
+        """HEAD url within the rate limit"""
+        await self.limiter.acquire()
+        return await self.client.head(url)
 
-            data = response.json()
+    async def _resilient(
+        self,
+        endpoint: str,
+        attempt: Callable[[], Awaitable[Any]],
+        has_fallback: bool = False,
+    ) -> Any:
+        """Run an idempotent request with retries behind a circuit breaker.
 
-            # PSX returns {"status": 1, "message": "", "data": [...]}
-            if isinstance(data, dict) and data.get("status") == 1 and "data" in data:
-                raw_data = data["data"]
-            else:
-                raw_data = data
+        Each attempt waits for a rate limit token and is cut off after
+        RETRY_ATTEMPT_TIMEOUT. Transient failures (network errors, timeouts,
+        429 and 5xx) are retried after a jittered exponential backoff, up to
+        MAX_RETRIES times and within REQUEST_TIMEOUT of the first token. When
+        has_fallback is set the caller has older data to serve instead, so the
+        first transient failure is raised without retrying. Calls that still
+        fail count towards the endpoint's circuit breaker, which then refuses
+        further calls for CIRCUIT_BREAKER_RESET seconds; time spent queued for
+        tokens never does.
+        """
+        breaker = self.breakers.get(endpoint)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                settings.CIRCUIT_BREAKER_THRESHOLD, settings.CIRCUIT_BREAKER_RESET
+            )
+            self.breakers[endpoint] = breaker
+        permit = breaker.allow()
+        if permit is None:
+            raise CircuitOpenError(
+                f"{endpoint} is failing, not retrying for {breaker.retry_in():.0f}s"
+            )
 
-            # Convert to our format
-            intraday_data = []
-            for item in raw_data:
-                if len(item) >= 3:
-                    time_point = TimeSeriesData(
-                        timestamp=item[0], price=float(item[1]), volume=int(item[2])
+        loop = asyncio.get_running_loop()
+        deadline: Optional[float] = None
+        error: Optional[Exception] = None
+        try:
+            for retry in itertools.count():
+                await self.limiter.acquire()
+                now = loop.time()
+                if deadline is None:
+                    # The budget starts once the first request may be sent
+                    deadline = now + settings.REQUEST_TIMEOUT
+                timeout = min(settings.RETRY_ATTEMPT_TIMEOUT, deadline - now)
+                if timeout <= 0 and error is not None:
+                    # Queued for a retry past the deadline: PSX's last error
+                    breaker.record_failure()
+                    raise error
+                try:
+                    result = await asyncio.wait_for(attempt(), max(timeout, 0))
+                except Exception as e:
+                    if not is_transient(e):
+                        breaker.record_success()  # PSX answered
+                        raise
+                    delay = backoff_delay(
+                        retry, settings.RETRY_BACKOFF_BASE, settings.RETRY_BACKOFF_MAX
                     )
-                    intraday_data.append(time_point.model_dump())
+                    if (
+                        has_fallback
+                        or retry >= settings.MAX_RETRIES
+                        or loop.time() + delay >= deadline
+                    ):
+                        breaker.record_failure()
+                        raise
+                    error = e
+                    logger.info("Retrying %s in %.2fs after: %r", endpoint, delay, e)
+                    await asyncio.sleep(delay)
+                else:
+                    breaker.record_success()
+                    return result
+        finally:
+            # Only gives back the half-open trial if this call claimed it
+            breaker.release(permit)
+
+    def _remember(self, url: str, series: TimeSeries) -> TimeSeries:
+        """Cache the latest good series of url"""
+        self._series[url] = (series, time.monotonic())
+        self._series.move_to_end(url)
+        while len(self._series) > max(settings.SERIES_CACHE_SIZE, 0):
+            self._series.popitem(last=False)
+        return series
+
+    def _cached(
+        self, kind: str, url: str, refresh: Callable[[], Awaitable[TimeSeries]]
+    ) -> Optional[TimeSeries]:
+        """Cached series of url, or None once it is past the hard TTL.
+
+        Past the soft TTL the series is returned marked with its age and
+        refreshed in the background.
+        """
+        entry = self._series.get(url)
+        if entry is None:
+            return None
+        series, fetched = entry
+        soft, hard = self.ttls[kind]
+        age = time.monotonic() - fetched
+        if age < soft:
+            return series
+        if age >= hard:
+            return None
+        self._revalidate(url, refresh)
+        return series.with_age(age)
 
-            return intraday_data
+    def _stale(self, url: str, error: Exception) -> Optional[TimeSeries]:
+        """Last good series of url marked as stale and with its age, if any"""
+        entry = self._series.get(url)
+        if entry is None:
+            return None
+        logger.warning("Serving stale data for %s: %s", url, error)
+        series, fetched = entry
+        return series.with_age(time.monotonic() - fetched).as_stale()
 
+    async def get_intraday_data(self, symbol: str) -> TimeSeries:
+        """Fetch intraday time series data for a specific stock"""
+        cached = self._cached(
+            "intraday",
+            f"{self.base_url}/timeseries/int/{symbol}",
+            lambda: self.refresh_intraday_data(symbol),
+        )
+        if cached is not None:
+            return cached
+        return await self.refresh_intraday_data(symbol)
+
+    async def refresh_intraday_data(self, symbol: str) -> TimeSeries:
+        """Fetch intraday data for a stock, bypassing the series cache"""
+        url = f"{self.base_url}/timeseries/int/{symbol}"
+        return await self._single_flight(url, lambda: self._fetch_intraday(url, symbol))
+
+    async def _fetch_intraday(self, url: str, symbol: str) -> TimeSeries:
+        """Download and convert the intraday series of one stock"""
+        try:
+            series = await self._resilient(
+                "intraday",
+                lambda: self._download_intraday(url),
+                has_fallback=url in self._series,
+            )
+            return self._remember(url, series)
         except Exception as e:
+            stale = self._stale(url, e)
+            if stale is not None:
+                return stale
             raise Exception(f"Failed to fetch intraday data for {symbol}: {str(e)}")
 
-    async def get_eod_data(self, symbol: str) -> List[Dict[str, Any]]:
+    async def get_eod_data(self, symbol: str) -> TimeSeries:
         """Fetch end-of-day time series data for a specific stock"""
+        cached = self._cached(
+            "eod",
+            f"{self.base_url}/timeseries/eod/{symbol}",
+            lambda: self.refresh_eod_data(symbol),
+        )
+        if cached is not None:
+            return cached
+        return await self.refresh_eod_data(symbol)
+
+    async def refresh_eod_data(self, symbol: str) -> TimeSeries:
+        """Fetch EOD data for a stock, bypassing the series cache.
+
+        With a local store, history that is already current is read from disk.
+        """
+        url = f"{self.base_url}/timeseries/eod/{symbol}"
+        if self.eod_store is None:
+            return await self._single_flight(url, lambda: self._fetch_eod(url, symbol))
+        return await self._single_flight(url, lambda: self._load_eod(url, symbol))
+
+    async def _load_eod(self, url: str, symbol: str) -> TimeSeries:
+        """Serve EOD history from the local store, refreshing it when behind.
+
+        PSX only serves the full history, so a refresh still downloads it, but
+        only bars newer than the stored ones are written. Once the store holds
+        the latest session (see EODStore.is_current) it is read from disk.
+        """
+        store = self.eod_store
+        if await self._in_thread(store.is_current, symbol):
+            series = await self._in_thread(store.load, symbol)
+            if series is not None:
+                return self._remember(url, series)
+
+        has_stored = await self._in_thread(os.path.exists, store.path(symbol))
         try:
-            response = await self.client.get(f"{self.base_url}/timeseries/eod/{symbol}")
-            response.raise_for_status()
+            series = await self._fetch_eod(url, symbol, has_fallback=has_stored)
+        except Exception as e:
+            stored = await self._in_thread(store.load, symbol)
+            if stored is None:
+                raise
+            logger.warning("Serving stale EOD history for %s: %s", symbol, e)
+            return stored.as_stale()
+        if not series.stale:
+            await self._in_thread(store.merge, symbol, series)
+        stored = await self._in_thread(store.load, symbol)
+        if stored is None:
+            return series
+        return stored.as_stale() if series.stale else self._remember(url, stored)
 
-            data = response.json()
-
-            # PSX returns {"status": 1, "message": "", "data": [...]}
-            if isinstance(data, dict) and data.get("status") == 1 and "data" in data:
-                raw_data = data["data"]
-            else:
-                raw_data = data
-
-            # Convert to our format
-            eod_data = []
-            for item in raw_data:
-                if len(item) >= 4:
-                    time_point = TimeSeriesData(
-                        timestamp=item[0],
-                        price=float(item[1]),
-                        volume=int(item[2]),
-                        open_price=float(item[3]),
-                    )
-                    eod_data.append(time_point.model_dump())
+    async def _in_thread(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run blocking disk I/O in the default executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args))
 
-            return eod_data
+    async def _fetch_eod(
+        self, url: str, symbol: str, has_fallback: bool = False
+    ) -> TimeSeries:
+        """Download and convert the end-of-day series of one stock.
 
+        has_fallback tells that the caller can serve stored history instead.
+        """
+        try:
+            series = await self._resilient(
+                "eod",
+                lambda: self._download_series(url, with_open=True),
+                has_fallback=has_fallback or url in self._series,
+            )
+            return self._remember(url, series)
         except Exception as e:
+            stale = self._stale(url, e)
+            if stale is not None:
+                return stale
             raise Exception(f"Failed to fetch EOD data for {symbol}: {str(e)}")
 
+    async def _download_series(self, url: str, with_open: bool) -> TimeSeries:
+        """One attempt at downloading and converting a PSX time series"""
+        response = await self._get(url)
+        if self.validators.is_not_modified(url, response):
+            return self.validators.reuse(url)
+        response.raise_for_status()
+
+        # Convert to our format in bulk
+        series = TimeSeries.from_raw(self._raw_series(response), with_open=with_open)
+        self.validators.store(url, response, series)
+        return series
+
+    async def _download_intraday(self, url: str) -> TimeSeries:
+        """One attempt at updating a stock's intraday buffer from PSX.
+
+        Only points newer than the buffer's last one are converted and stored;
+        the result is a view of the buffer.
+        """
+        response = await self._get(url)
+        if self.validators.is_not_modified(url, response):
+            return self.validators.reuse(url)
+        response.raise_for_status()
+
+        buffer = self._intraday.get(url)
+        if buffer is None:
+            buffer = self._intraday[url] = IntradayBuffer(
+                settings.INTRADAY_BUFFER_SIZE, settings.INTRADAY_BUFFER_MAX
+            )
+        self._intraday.move_to_end(url)
+        while len(self._intraday) > max(settings.SERIES_CACHE_SIZE, 1):
+            self._intraday.popitem(last=False)
+        buffer.merge(self._raw_series(response))
+        series = buffer.series()
+        self.validators.store(url, response, series)
+        return series
+
+    @staticmethod
+    def _raw_series(response: httpx.Response) -> Sequence[Sequence[Any]]:
+        """The raw points of a PSX time series response"""
+        data = response.json()
+
+        # PSX returns {"status": 1, "message": "", "data": [...]}
+        if isinstance(data, dict) and data.get("status") == 1 and "data" in data:
+            return data["data"]
+        return data
+
     async def close(self):
-        """Close the HTTP client"""
+        """Cancel background refreshes and close the HTTP client"""
+        for task in list(self._revalidating):
+            task.cancel()
         await self.client.aclose()
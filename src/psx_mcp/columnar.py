@@ -0,0 +1,140 @@
+"""
+Fixed-width columnar binary files for time series, read through mmap
+"""
+
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from typing import Optional
+
+from .timeseries import TimeSeries
+
+MAGIC = b"PSXC"
+FORMAT_VERSION = 1
+
+# magic, version, flags, count, refreshed_at; padded to 32 bytes so every
+# column starts 8-byte aligned
+HEADER = struct.Struct("<4sBBxxQd8x")
+
+FLAG_HAS_OPEN = 0x01
+FLAG_DESCENDING = 0x02
+
+# Column order on disk: int64 timestamp, float64 close, int64 volume, float64 open
+COLUMN_FORMATS = ("q", "d", "q", "d")
+ITEM_SIZE = 8
+
+# Columns are mapped with native byte order, which the format fixes as little
+if sys.byteorder != "little":  # pragma: no cover
+    raise ImportError("Columnar series files require a little-endian host")
+
+# Windows refuses to replace a file while any mapping of it is open, so there
+# files are read into memory instead and write_series can always replace them
+MAP_FILES = os.name != "nt"
+
+
+class SeriesHeader:
+    """Decoded header of a columnar series file"""
+
+    __slots__ = ("count", "has_open", "descending", "refreshed_at")
+
+    def __init__(
+        self, count: int, has_open: bool, descending: bool, refreshed_at: float
+    ):
+        self.count = count
+        self.has_open = has_open
+        self.descending = descending
+        self.refreshed_at = refreshed_at
+
+    @classmethod
+    def unpack(cls, data: bytes) -> "SeriesHeader":
+        """Decode and validate a header"""
+        if len(data) < HEADER.size:
+            raise ValueError("Truncated series file header")
+        magic, version, flags, count, refreshed_at = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a PSX columnar series file")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported series file version {version}")
+        return cls(
+            count,
+            bool(flags & FLAG_HAS_OPEN),
+            bool(flags & FLAG_DESCENDING),
+            refreshed_at,
+        )
+
+    @property
+    def columns(self) -> int:
+        return 4 if self.has_open else 3
+
+    @property
+    def file_size(self) -> int:
+        return HEADER.size + self.columns * self.count * ITEM_SIZE
+
+
+def read_header(path: str) -> SeriesHeader:
+    """Read only the header of a series file"""
+    with open(path, "rb") as f:
+        return SeriesHeader.unpack(f.read(HEADER.size))
+
+
+def write_series(path: str, series: TimeSeries, refreshed_at: float = 0.0):
+    """Write a series atomically, so readers never see a partial file.
+
+    Existing readers keep their mapping (or, without MAP_FILES, their copy)
+    of the replaced file.
+    """
+    has_open = series.opens is not None
+    flags = (FLAG_HAS_OPEN if has_open else 0) | (
+        FLAG_DESCENDING if series.descending else 0
+    )
+    columns = [series.timestamps, series.prices, series.volumes]
+    if has_open:
+        columns.append(series.opens)
+
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(
+                HEADER.pack(MAGIC, FORMAT_VERSION, flags, len(series), refreshed_at)
+            )
+            for column in columns:
+                f.write(column)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def read_series(path: str) -> Optional[TimeSeries]:
+    """Map a series file into memory and return zero-copy column views.
+
+    Returns None for a missing file. Columns are memoryviews over a
+    read-only shared mapping, so every process reading the same file shares
+    the OS page cache, and range slices never copy. Where MAP_FILES is off
+    the columns view one in-memory copy of the file instead.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with f:
+        header = SeriesHeader.unpack(f.read(HEADER.size))
+        if os.fstat(f.fileno()).st_size < header.file_size:
+            raise ValueError(f"Truncated series file {path}")
+        if MAP_FILES:
+            data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        else:
+            f.seek(0)
+            data = memoryview(f.read(header.file_size))
+
+    width = header.count * ITEM_SIZE
+    columns = [
+        data[HEADER.size + i * width : HEADER.size + (i + 1) * width].cast(fmt)
+        for i, fmt in enumerate(COLUMN_FORMATS[: header.columns])
+    ]
+    if not header.has_open:
+        columns.append(None)
+    return TimeSeries(*columns, descending=header.descending)
@@ -0,0 +1,84 @@
+"""
+Validator cache for conditional requests to PSX
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional
+
+import httpx
+
+
+class _Entry(NamedTuple):
+    """Validators and parsed result of one URL"""
+
+    etag: Optional[str]
+    last_modified: Optional[str]
+    value: Any  # parsed result, shared by every reuse and read-only
+    size: int  # bytes transferred for the full response
+
+
+class ValidatorCache:
+    """Remember ETag/Last-Modified validators and parsed results per URL.
+
+    Requests send If-None-Match/If-Modified-Since for URLs seen before; a
+    304 Not Modified answer reuses the stored result, so an unchanged page is
+    neither downloaded nor parsed again. Holds at most max_entries URLs
+    (least recently used are dropped); 0 disables conditional requests.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.not_modified = 0
+        self.bytes_saved = 0
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def headers(self, url: str) -> Dict[str, str]:
+        """Conditional request headers for url (empty if it was never stored)"""
+        entry = self._entries.get(url)
+        if entry is None:
+            return {}
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def is_not_modified(self, url: str, response: httpx.Response) -> bool:
+        """True if response is a 304 for a URL whose result is still stored"""
+        return response.status_code == 304 and url in self._entries
+
+    def store(self, url: str, response: httpx.Response, value: Any) -> None:
+        """Keep the validators of a full response with its parsed result"""
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if self.max_entries <= 0 or not (etag or last_modified):
+            self._entries.pop(url, None)
+            return
+        size = response.num_bytes_downloaded
+        self._entries[url] = _Entry(etag, last_modified, value, size)
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def reuse(self, url: str) -> Any:
+        """Return the stored result of url after a 304 and count the saving"""
+        entry = self._entries[url]
+        self._entries.move_to_end(url)
+        self.not_modified += 1
+        self.bytes_saved += entry.size
+        return entry.value
+
+    def stats(self) -> Dict[str, int]:
+        """Cache size, 304 responses and response bytes not transferred"""
+        return {
+            "entries": len(self._entries),
+            "not_modified": self.not_modified,
+            "bytes_saved": self.bytes_saved,
+        }
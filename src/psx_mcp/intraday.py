@@ -0,0 +1,128 @@
+"""
+Per-symbol intraday buffers that only grow by the points PSX added
+"""
+
+from array import array
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from .market_hours import PKT
+from .timeseries import TimeSeries
+
+COLUMN_TYPES = ("q", "d", "q")  # timestamps, prices, volumes
+
+
+def session_day(timestamp: int) -> date:
+    """Karachi calendar day a PSX timestamp belongs to"""
+    return datetime.fromtimestamp(timestamp, PKT).date()
+
+
+class IntradayBuffer:
+    """One symbol's intraday session held in preallocated typed columns.
+
+    Points are kept sorted by timestamp in the first ``len(self)`` slots of
+    fixed-size arrays. ``merge()`` writes only the points newer than the last
+    one held into the spare slots, so series returned by ``series()`` (views
+    of the filled slots) are never modified. A full buffer moves to a new
+    allocation of twice the size, or, once ``max_capacity`` is reached, keeps
+    only its newest half, dropping the oldest points like a ring. A point
+    from a later session day starts the buffer over.
+    """
+
+    def __init__(self, capacity: int, max_capacity: Optional[int] = None):
+        self.capacity = max(capacity, 2)
+        self.max_capacity = max(max_capacity or self.capacity, self.capacity)
+        self.session: Optional[date] = None
+        self.descending = True  # PSX serves intraday points newest first
+        self._size = 0
+        self._columns = self._allocate(self.capacity)
+
+    @staticmethod
+    def _allocate(capacity: int) -> Tuple[array, ...]:
+        return tuple(array(code, bytes(8 * capacity)) for code in COLUMN_TYPES)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        """Timestamp of the newest point held"""
+        return self._columns[0][self._size - 1] if self._size else None
+
+    def merge(self, raw_data: Sequence[Sequence[Any]]) -> int:
+        """Append the raw PSX points newer than the last one held.
+
+        Points shorter than ``[timestamp, price, volume]`` are skipped and
+        repeated timestamps keep their last occurrence. Returns the number of
+        points added.
+        """
+        points = [item for item in raw_data if len(item) >= 3]
+        if not points:
+            return 0
+        newest_first = int(points[0][0]) >= int(points[-1][0])
+        if self._size == 0:
+            self.descending = newest_first
+
+        last = self.last_timestamp
+        fresh = {}
+        for item in points:
+            timestamp = int(item[0])
+            if last is None or timestamp > last:
+                fresh[timestamp] = (float(item[1]), int(item[2]))
+            elif newest_first:
+                break  # everything after this is already held
+        if not fresh:
+            return 0
+
+        newest = session_day(max(fresh))
+        if self.session != newest:
+            self._reset(newest)
+            fresh = {t: v for t, v in fresh.items() if session_day(t) == newest}
+        self._append(sorted(fresh.items()))
+        return len(fresh)
+
+    def _reset(self, session: date) -> None:
+        """Start a new session, in a fresh allocation if views may share this one"""
+        self.session = session
+        if self._size:
+            self._size = 0
+            self._columns = self._allocate(self.capacity)
+
+    def _append(self, points: List[Tuple[int, Tuple[float, int]]]) -> None:
+        """Write ascending points after the held ones, making room if needed"""
+        if self._size + len(points) > len(self._columns[0]):
+            self._make_room(len(points))
+        room = len(self._columns[0]) - self._size
+        points = points[max(len(points) - room, 0) :]  # keep the newest that fit
+        stop = self._size + len(points)
+        timestamps, prices, volumes = self._columns
+        timestamps[self._size : stop] = array("q", (t for t, _ in points))
+        prices[self._size : stop] = array("d", (v[0] for _, v in points))
+        volumes[self._size : stop] = array("q", (v[1] for _, v in points))
+        self._size = stop
+
+    def _make_room(self, incoming: int) -> None:
+        """Move the held points to a larger (or, at the cap, emptier) allocation"""
+        needed = self._size + incoming
+        capacity = len(self._columns[0])
+        while capacity < needed and capacity < self.max_capacity:
+            capacity = min(capacity * 2, self.max_capacity)
+        keep = self._size
+        if needed > capacity:
+            keep = max(min(self._size, capacity // 2, capacity - incoming), 0)
+        columns = self._allocate(capacity)
+        for new, old in zip(columns, self._columns):
+            new[:keep] = old[self._size - keep : self._size]
+        self._columns = columns
+        self._size = keep
+
+    def series(self) -> TimeSeries:
+        """Zero-copy view of the points held, in PSX's order"""
+        size = self._size
+        timestamps, prices, volumes = self._columns
+        return TimeSeries(
+            memoryview(timestamps)[:size],
+            memoryview(prices)[:size],
+            memoryview(volumes)[:size],
+            descending=self.descending,
+        )
@@ -0,0 +1,59 @@
+"""
+PSX trading calendar helpers (Asia/Karachi session times)
+"""
+
+from datetime import datetime, time, timedelta, timezone
+from typing import Optional
+
+from .settings import settings
+
+# Pakistan does not observe daylight saving time
+PKT = timezone(timedelta(hours=settings.MARKET_UTC_OFFSET_HOURS), "PKT")
+
+
+def _session_time(value: str) -> time:
+    """Parse an HH:MM session time from settings"""
+    hours, minutes = value.split(":")
+    return time(int(hours), int(minutes))
+
+
+def _now(now: Optional[datetime]) -> datetime:
+    """Return now (defaulting to the current time) in Karachi time"""
+    return datetime.now(PKT) if now is None else now.astimezone(PKT)
+
+
+def is_trading_day(day: datetime) -> bool:
+    """PSX trades Monday to Friday (exchange holidays are not modelled)"""
+    return day.weekday() < 5
+
+
+def last_close(now: Optional[datetime] = None) -> datetime:
+    """Return the most recent session close at or before now"""
+    now = _now(now)
+    close = _session_time(settings.MARKET_CLOSE)
+    day = now
+    while True:
+        candidate = datetime.combine(day.date(), close, tzinfo=PKT)
+        if is_trading_day(candidate) and candidate <= now:
+            return candidate
+        day -= timedelta(days=1)
+
+
+def is_market_open(now: Optional[datetime] = None) -> bool:
+    """Whether a trading session is in progress"""
+    now = _now(now)
+    opening = _session_time(settings.MARKET_OPEN)
+    close = _session_time(settings.MARKET_CLOSE)
+    return is_trading_day(now) and opening <= now.time() < close
+
+
+def next_open(now: Optional[datetime] = None) -> datetime:
+    """Return the next session open strictly after now"""
+    now = _now(now)
+    opening = _session_time(settings.MARKET_OPEN)
+    day = now
+    while True:
+        candidate = datetime.combine(day.date(), opening, tzinfo=PKT)
+        if is_trading_day(candidate) and candidate > now:
+            return candidate
+        day += timedelta(days=1)
@@ -2,7 +2,7 @@
 Data models for PSX MCP Server
 """
 
-from typing import Optional
+from typing import Optional, Tuple, Type
 from pydantic import BaseModel, Field
 
 
@@ -42,3 +42,23 @@ class VolumeAnalysis(BaseModel):
     volume_stats: dict = Field(..., description="Volume statistics")
     price_stats: dict = Field(..., description="Price statistics")
     latest_data: Optional[dict] = Field(None, description="Latest data point")
+
+
+def select_fields(
+    fields: Optional[str], model: Type[BaseModel]
+) -> Optional[Tuple[str, ...]]:
+    """Parse a comma-separated field list, validated against a model's fields.
+
+    Returns None (all fields) when fields is empty. Requested fields keep
+    their order; duplicates are dropped.
+    """
+    if not fields:
+        return None
+    selected = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [field for field in selected if field not in model.model_fields]
+    if unknown:
+        raise ValueError(
+            f"Unknown {model.__name__} field(s): {', '.join(unknown)}; "
+            f"expected any of {', '.join(model.model_fields)}"
+        )
+    return selected or None
@@ -0,0 +1,69 @@
+"""
+JSON output formats for tool responses
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+from .settings import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional fast encoder
+    orjson = None
+
+OUTPUT_FORMATS = ("pretty", "compact", "columnar")
+
+
+def resolve_format(output_format: Optional[str] = None) -> str:
+    """Validate an output format, defaulting to settings.OUTPUT_FORMAT"""
+    output_format = (output_format or settings.OUTPUT_FORMAT).lower()
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(
+            f"Unknown output format '{output_format}', "
+            f"expected one of {', '.join(OUTPUT_FORMATS)}"
+        )
+    return output_format
+
+
+def records_to_columns(records: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Turn a list of records into one list per key, in first-seen key order"""
+    keys: Dict[str, None] = {}
+    for record in records:
+        for key in record:
+            keys.setdefault(key, None)
+    return {key: [record.get(key) for record in records] for key in keys}
+
+
+def to_columnar(value: Any) -> Any:
+    """Convert every list of records nested in value to the columnar layout"""
+    if isinstance(value, list):
+        if value and all(isinstance(item, dict) for item in value):
+            return records_to_columns(value)
+        return value
+    if isinstance(value, dict):
+        return {key: to_columnar(item) for key, item in value.items()}
+    return value
+
+
+def encode(data: Any, output_format: Optional[str] = None) -> str:
+    """Serialize a tool result in the requested (or configured) format.
+
+    ``pretty`` is indented JSON, ``compact`` drops all insignificant
+    whitespace and ``columnar`` is compact JSON with lists of records turned
+    into ``{"field": [...]}`` columns. orjson is used when it is installed.
+    """
+    output_format = resolve_format(output_format)
+    if output_format == "columnar":
+        data = to_columnar(data)
+
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if output_format == "pretty" else 0
+        try:
+            return orjson.dumps(data, option=option).decode()
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits; the stdlib handles them
+
+    if output_format == "pretty":
+        return json.dumps(data, indent=2)
+    return json.dumps(data, separators=(",", ":"))
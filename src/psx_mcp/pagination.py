@@ -0,0 +1,47 @@
+"""
+Opaque cursors for paginated tool results
+"""
+
+import base64
+import json
+from typing import NamedTuple, Optional, Tuple
+
+
+class Cursor(NamedTuple):
+    """Position in a paginated result pinned to one data version"""
+
+    query: str  # identifies the tool call the cursor belongs to
+    version: int  # snapshot version or pinned series id
+    offset: int  # index of the first item of the next page
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    """Encode a cursor as a URL-safe token"""
+    raw = json.dumps(list(cursor), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, query: str) -> Cursor:
+    """Decode a cursor token and check it belongs to query"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        cursor_query, version, offset = json.loads(raw)
+        cursor = Cursor(str(cursor_query), int(version), int(offset))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if cursor.offset < 0:
+        raise ValueError("Invalid cursor")
+    if cursor.query != query:
+        raise ValueError("Cursor does not belong to this request")
+    return cursor
+
+
+def page_bounds(
+    size: int, offset: int, limit: Optional[int]
+) -> Tuple[int, int, Optional[int]]:
+    """Return (start, stop, next_offset) of a page; next_offset is None at the end"""
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be a positive integer")
+    start = min(offset, size)
+    stop = size if limit is None else min(start + limit, size)
+    return start, stop, stop if stop < size else None
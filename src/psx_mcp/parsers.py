@@ -0,0 +1,366 @@
+"""
+HTML parser backends for the PSX market watch page
+"""
+
+import html
+import re
+from array import array
+from typing import Callable, Dict, List, Optional, Sequence
+
+from bs4 import BeautifulSoup
+
+from .snapshot import FLOAT_FIELDS, INT_FIELDS, STOCK_FIELDS
+
+TABLE_ID = "marketWatchTable"
+TABLE_NOT_FOUND = "Market data table not found in HTML response"
+
+# Attributes of a tag; quoted values may contain '>' and '<'
+_ATTRS = r"[^>\"']*(?:(?:\"[^\"]*\"|'[^']*')[^>\"']*)*"
+_ATTRIBUTE = re.compile(r"([^\s/>\"'=]+)(?:\s*=\s*(\"[^\"]*\"|'[^']*'|[^\s>]+))?")
+# Comments and script/style elements whose content is never markup
+_OPAQUE = r"<!--.*?-->|<(?P<raw>script|style)\b" + _ATTRS + r">.*?</(?P=raw)\s*>"
+# Markup before the target table: only table tags and opaque content matter
+_PREAMBLE = re.compile(
+    _OPAQUE
+    + r"|(?P<table><table\b"
+    + _ATTRS
+    + r">)|(?P<partial><!--|<(?:script|style|table)\b)",
+    re.IGNORECASE | re.DOTALL,
+)
+_TABLE_OPEN = re.compile(r"<table\b" + _ATTRS + ">", re.IGNORECASE)
+# Markup inside the table: structural tags, other tags and opaque content.
+# match.lastgroup tells table tags ("name") from unterminated markup
+_MARKUP = re.compile(
+    _OPAQUE
+    + r"|(?P<partial><!--|<(?:script|style)\b)"
+    + r"|<(?P<close>/?)(?P<name>table|t[dhr])\b"
+    + _ATTRS
+    + r">|<[a-z/!?]"
+    + _ATTRS
+    + r">|(?P<unclosed><[a-z/!?])",
+    re.IGNORECASE | re.DOTALL,
+)
+# A cell holding plain text only, the common case
+_PLAIN_CELL = re.compile(r"([^<]*)</(t[dh])\s*>", re.IGNORECASE)
+# Longest prefix of '<script' that a chunk may end with
+_TAIL = len("<script") - 1
+
+# Newlines separate the values of a column joined into one string
+_NON_FLOAT = re.compile(r"[^\d.\-\n]")
+_NON_INT = re.compile(r"[^\d\n]")
+# Joined columns that need nothing beyond comma removal
+_PLAIN_FLOATS = re.compile(r"[\d.\-\n]*")
+_PLAIN_INTS = re.compile(r"(?:\d*|-)(?:\n(?:\d*|-))*")
+
+
+def _attribute(tag: str, name: str) -> Optional[str]:
+    """Return the value of one attribute of a start tag, as html.parser reads it"""
+    value = None
+    # The tag name is read as a valueless attribute and never matches
+    for key, raw in _ATTRIBUTE.findall(tag, 1):
+        if key.lower() == name:
+            if raw[:1] in ("'", '"'):
+                raw = raw[1:-1]
+            value = html.unescape(raw)
+    return value
+
+
+def _unsupported(markup: str) -> ValueError:
+    """Error for markup whose tree the tokenizer cannot reproduce"""
+    return ValueError(f"Unsupported market watch markup: {markup[:80]!r}")
+
+
+class MarketWatchTokenizer:
+    """Incremental tokenizer for the market watch table.
+
+    Markup is fed in arbitrary chunks; every call returns the rows completed
+    so far as lists of cell texts, matching ``table.find_all('tr')[1:]`` with
+    ``get_text(strip=True)`` from the BeautifulSoup backend. Comments and
+    script/style content are skipped, and markup that html.parser would nest
+    differently (nested tables, rows or cells, stray closing tags) raises
+    ValueError so the caller can fall back to BeautifulSoup. Only markup that
+    has not yet been consumed is buffered.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._scanned = 0
+        self._first_table: Optional[int] = None
+        self._in_table = False
+        self._done = False
+        self._header_skipped = False
+        self._row_open = False
+        self._row: Optional[List[str]] = None
+        self._cell_name: Optional[str] = None
+        self._cell: Optional[List[str]] = None
+
+    def feed(self, chunk: str) -> List[List[str]]:
+        """Consume a chunk of markup and return the newly completed rows"""
+        if self._done:
+            return []
+        self._buffer += chunk
+        if not self._in_table and not self._find_table(final=False):
+            return []
+        return self._drain(final=False)
+
+    def close(self) -> List[List[str]]:
+        """Flush the remaining markup and return the last rows"""
+        if self._done:
+            return []
+        if not self._in_table:
+            self._find_table(final=True)
+        rows = self._drain(final=True)
+        self._done = True
+        self._buffer = ""
+        return rows
+
+    def _find_table(self, final: bool) -> bool:
+        """Position the buffer just after the opening tag of the target table"""
+        buffer = self._buffer
+        position = self._scanned
+        while True:
+            match = _PREAMBLE.search(buffer, position)
+            if match is None:
+                # Keep a tag that may have been split across chunks
+                position = max(position, len(buffer) - _TAIL)
+                break
+            if match.group("partial") is not None:
+                if final:
+                    raise _unsupported(buffer[match.start() :])
+                position = match.start()
+                break
+            tag = match.group("table")
+            if tag is not None:
+                if _attribute(tag, "id") == TABLE_ID:
+                    return self._enter_table(match.end())
+                if self._first_table is None:
+                    self._first_table = match.start()
+            position = match.end()
+
+        if final:
+            if self._first_table is None:
+                raise ValueError(TABLE_NOT_FOUND)
+            # No table carries the market watch id: use the first table instead
+            first = _TABLE_OPEN.match(buffer, self._first_table)
+            return self._enter_table(first.end())
+
+        # Drop the scanned markup, except from the first table on
+        keep = position if self._first_table is None else self._first_table
+        self._buffer = buffer[keep:]
+        self._scanned = position - keep
+        if self._first_table is not None:
+            self._first_table = 0
+        return False
+
+    def _enter_table(self, start: int) -> bool:
+        """Start tokenizing the table whose opening tag ends at start"""
+        self._buffer = self._buffer[start:]
+        self._in_table = True
+        return True
+
+    def _drain(self, final: bool) -> List[List[str]]:
+        """Emit every row whose end is already buffered"""
+        rows: List[List[str]] = []
+        buffer = self._buffer
+        position = 0
+        while not self._done:
+            if self._cell_name is not None:
+                plain = _PLAIN_CELL.match(buffer, position)
+                if plain is not None and plain.group(2).lower() == self._cell_name:
+                    if self._cell is not None:
+                        text = html.unescape(plain.group(1)).strip()
+                        self._row.append("".join(self._cell) + text)
+                    self._cell_name = self._cell = None
+                    position = plain.end()
+                    continue
+            match = _MARKUP.search(buffer, position)
+            if match is None and not final:
+                # Trailing text may continue in the next chunk
+                break
+            end = len(buffer) if match is None else match.start()
+            if self._cell is not None and end > position:
+                text = html.unescape(buffer[position:end]).strip()
+                if text:
+                    self._cell.append(text)
+            if match is None:
+                position = end
+                self._close_row(rows)
+                break
+            kind = match.lastgroup
+            if kind == "partial" or kind == "unclosed":
+                if final:
+                    raise _unsupported(buffer[end:])
+                position = end
+                break
+            position = match.end()
+            if kind == "name":
+                tag, close, name = match.group(0, "close", "name")
+                self._structure(tag, name.lower(), close, rows)
+        self._buffer = buffer[position:]
+        return rows
+
+    def _structure(self, tag: str, name: str, close: str, rows: List[List[str]]):
+        """Apply one table, row or cell tag to the open row and cell"""
+        if tag.endswith("/>"):
+            raise _unsupported(tag)
+        if close:
+            if name == "table":
+                self._close_row(rows)
+                self._done = True
+            elif name == "tr" and self._row_open:
+                self._close_row(rows)
+            elif name == self._cell_name:
+                self._close_cell()
+            else:
+                raise _unsupported(tag)
+        elif name == "table" or self._cell_name is not None:
+            raise _unsupported(tag)
+        elif name == "tr":
+            if self._row is not None:
+                raise _unsupported(tag)
+            # An open header row is skipped, so rows nested in it still match
+            self._row_open = True
+            self._row = [] if self._header_skipped else None
+            self._header_skipped = True
+        elif self._row_open:
+            self._cell_name = name
+            self._cell = [] if self._row is not None else None
+        else:
+            raise _unsupported(tag)
+
+    def _close_cell(self):
+        """Finish the open cell and add its text to the open row"""
+        if self._cell is not None:
+            self._row.append("".join(self._cell))
+        self._cell_name = None
+        self._cell = None
+
+    def _close_row(self, rows: List[List[str]]):
+        """Finish the open row, emitting it unless it is the header"""
+        self._close_cell()
+        if self._row is not None:
+            rows.append(self._row)
+        self._row_open = False
+        self._row = None
+
+
+def parse_market_watch_fast(text: str) -> List[List[str]]:
+    """Parse market watch rows with the purpose-built tokenizer"""
+    tokenizer = MarketWatchTokenizer()
+    return tokenizer.feed(text) + tokenizer.close()
+
+
+def parse_market_watch_bs4(text: str) -> List[List[str]]:
+    """Parse market watch rows with BeautifulSoup (reference implementation)"""
+    soup = BeautifulSoup(text, "html.parser")
+
+    # Find the market data table
+    table = soup.find("table", {"id": TABLE_ID}) or soup.find("table")
+    if not table:
+        raise ValueError(TABLE_NOT_FOUND)
+
+    return [
+        [cell.get_text(strip=True) for cell in row.find_all(["td", "th"])]
+        for row in table.find_all("tr")[1:]  # Skip header row
+    ]
+
+
+PARSERS: Dict[str, Callable[[str], List[List[str]]]] = {
+    "fast": parse_market_watch_fast,
+    "bs4": parse_market_watch_bs4,
+}
+
+
+def parse_market_watch(text: str, backend: str = "fast") -> List[List[str]]:
+    """Parse market watch rows, falling back to BeautifulSoup on failure"""
+    if backend not in PARSERS:
+        raise ValueError(
+            f"Unknown HTML parser '{backend}', expected one of {', '.join(PARSERS)}"
+        )
+    try:
+        return PARSERS[backend](text)
+    except Exception:
+        if backend == "bs4":
+            raise
+        return parse_market_watch_bs4(text)
+
+
+def _clean_column(
+    values: Sequence[str], pattern: re.Pattern, plain: re.Pattern
+) -> List[str]:
+    """Strip formatting characters from a whole column at once.
+
+    Values are joined into one string, so commas are removed with a single
+    str.replace and the regex only runs when other formatting is present.
+    '-' and empty values are mapped to '0'.
+    """
+    joined = "\n".join(values)
+    if joined.count("\n") != len(values) - 1:
+        # A value contains a newline itself: clean the values one by one
+        cleaned = [pattern.sub("", value).replace("\n", "") for value in values]
+    else:
+        text = joined.replace(",", "")
+        if not plain.fullmatch(text):
+            text = pattern.sub("", joined)
+        cleaned = text.split("\n")
+    return [value if value and value != "-" else "0" for value in cleaned]
+
+
+def _float_or_zero(text: str) -> float:
+    """Convert one cleaned value, mapping unparsable text to 0.0"""
+    try:
+        return float(text)
+    except ValueError:
+        return 0.0
+
+
+def _int_or_zero(text: str) -> int:
+    """Convert one cleaned value, mapping unparsable text to 0"""
+    try:
+        return int(text)
+    except ValueError:
+        return 0
+
+
+def parse_float_column(values: Sequence[str]) -> array:
+    """Convert a column of cell texts to floats in one pass.
+
+    Formatting characters such as thousands separators are dropped, and '-',
+    empty or otherwise unparsable values become 0.0.
+    """
+    if not values:
+        return array("d")
+    cleaned = _clean_column(values, _NON_FLOAT, _PLAIN_FLOATS)
+    try:
+        return array("d", map(float, cleaned))
+    except ValueError:
+        return array("d", map(_float_or_zero, cleaned))
+
+
+def parse_int_column(values: Sequence[str]) -> array:
+    """Convert a column of cell texts to integers in one pass.
+
+    Every non-digit is dropped and '-' or empty values become 0.
+    """
+    if not values:
+        return array("q")
+    cleaned = _clean_column(values, _NON_INT, _PLAIN_INTS)
+    try:
+        return array("q", map(int, cleaned))
+    except ValueError:
+        return array("q", map(_int_or_zero, cleaned))
+
+
+def market_watch_columns(cell_rows: List[List[str]]) -> Dict[str, Sequence]:
+    """Convert parsed market watch rows into typed snapshot columns"""
+    rows = [cells for cells in cell_rows if len(cells) >= 9]
+    columns: Dict[str, Sequence] = {}
+    for position, field in enumerate(STOCK_FIELDS):
+        raw = [cells[position] if len(cells) > position else "" for cells in rows]
+        if field in FLOAT_FIELDS:
+            columns[field] = parse_float_column(raw)
+        elif field in INT_FIELDS:
+            columns[field] = parse_int_column(raw)
+        else:
+            columns[field] = tuple(raw)
+    return columns
@@ -0,0 +1,207 @@
+"""
+Token-bucket rate limiting for requests to PSX
+"""
+
+import asyncio
+import heapq
+import itertools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+INTERACTIVE = 0  # tool calls waiting on an answer
+BACKGROUND = 1  # prefetch and refresh work
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+# Priority of the requests made by the current task (inherited by child tasks)
+request_priority: "ContextVar[int]" = ContextVar(
+    "psx_request_priority", default=INTERACTIVE
+)
+
+
+# Priority cells of the shared fetches the current task works for. A caller
+# joining a shared fetch can make its cell more urgent (RateLimiter.promote)
+shared_priorities: "ContextVar[Tuple[List[int], ...]]" = ContextVar(
+    "psx_shared_priorities", default=()
+)
+
+
+@contextmanager
+def background_priority() -> Iterator[None]:
+    """Run the requests made inside the block behind interactive ones"""
+    token = request_priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+
+def current_priority() -> int:
+    """Most urgent of the task's priority and those of the fetches it serves"""
+    cells = shared_priorities.get()
+    return min((request_priority.get(), *(cell[0] for cell in cells)))
+
+
+@contextmanager
+def shared_priority() -> Iterator[List[int]]:
+    """Start work inside the block that other callers may join.
+
+    Yields the work's priority cell, which starts at current_priority() and
+    is passed to RateLimiter.promote when a more urgent caller joins.
+    """
+    cell = [current_priority()]
+    token = shared_priorities.set(shared_priorities.get() + (cell,))
+    try:
+        yield cell
+    finally:
+        shared_priorities.reset(token)
+
+
+class RateLimitTimeout(Exception):
+    """A request waited longer than allowed for a rate limit token"""
+
+
+class RateLimiter:
+    """Async token bucket with prioritized, bounded waiting.
+
+    Tokens refill at rate per second up to burst. A request takes a token at
+    once when one is free and nobody is queued; otherwise it queues behind
+    requests of the same or a more urgent priority, and gives up with
+    RateLimitTimeout after max_wait seconds. Requests made for shared work
+    queue at the most urgent priority of the callers waiting on it.
+    """
+
+    def __init__(self, rate: float, burst: int, max_wait: Optional[float] = None):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self._tokens = float(burst)
+        self._updated: Optional[float] = None
+        self._queue: List[Tuple[int, int, asyncio.Future]] = []
+        # Queued requests: their own priority, queued priority and cells
+        self._waiting: Dict[asyncio.Future, List] = {}
+        self._order = itertools.count()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self._depth = {priority: 0 for priority in PRIORITY_NAMES}
+        self._requests = 0
+        self._queued = 0
+        self._served = 0
+        self._timeouts = 0
+        self._total_wait = 0.0
+        self._max_wait_seen = 0.0
+
+    @classmethod
+    def from_settings(cls, settings) -> "RateLimiter":
+        """Build the limiter described by MAX_REQUESTS_PER_MINUTE and friends"""
+        return cls(
+            rate=settings.MAX_REQUESTS_PER_MINUTE / settings.RATE_LIMIT_WINDOW,
+            burst=settings.RATE_LIMIT_BURST,
+            max_wait=settings.RATE_LIMIT_MAX_WAIT,
+        )
+
+    def _refill(self, now: float) -> None:
+        if self._updated is not None:
+            elapsed = now - self._updated
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    async def acquire(self, priority: Optional[int] = None) -> float:
+        """Wait for a token and return the seconds spent waiting.
+
+        priority defaults to the request_priority of the calling task. The
+        request queues at the priority of the shared work it is made for
+        when that is more urgent.
+        """
+        if priority is None:
+            priority = request_priority.get()
+        cells = shared_priorities.get()
+        priority = min((priority, *(cell[0] for cell in cells)))
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        self._refill(start)
+        self._requests += 1
+        if not self._queue and self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+
+        future = loop.create_future()
+        heapq.heappush(self._queue, (priority, next(self._order), future))
+        self._waiting[future] = [priority, cells]
+        self._depth[priority] += 1
+        self._queued += 1
+        self._dispatch()
+        try:
+            await asyncio.wait_for(future, self.max_wait)
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            raise RateLimitTimeout(
+                f"Rate limit: no request slot within {self.max_wait:g}s "
+                f"({self.queue_depth()} requests queued)"
+            )
+        finally:
+            self._depth[self._waiting.pop(future)[0]] -= 1
+
+        waited = loop.time() - start
+        self._served += 1
+        self._total_wait += waited
+        self._max_wait_seen = max(self._max_wait_seen, waited)
+        return waited
+
+    def promote(self, cell: List[int], priority: int) -> None:
+        """Raise shared work to priority, including its queued requests.
+
+        cell comes from shared_priority(); requests made for the work from
+        now on queue at the new priority as well.
+        """
+        if priority >= cell[0]:
+            return
+        cell[0] = priority
+        for future, waiting in self._waiting.items():
+            if waiting[0] > priority and any(c is cell for c in waiting[1]):
+                # Queue again ahead; the old entry is dropped once served
+                self._depth[waiting[0]] -= 1
+                self._depth[priority] += 1
+                waiting[0] = priority
+                heapq.heappush(self._queue, (priority, next(self._order), future))
+        if self._queue:
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Hand free tokens to queued requests and schedule the next refill"""
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        loop = asyncio.get_running_loop()
+        self._refill(loop.time())
+        while self._queue:
+            future = self._queue[0][2]
+            if future.done():  # timed out or cancelled while queued
+                heapq.heappop(self._queue)
+            elif self._tokens >= 1:
+                heapq.heappop(self._queue)
+                self._tokens -= 1
+                future.set_result(None)
+            else:
+                delay = (1 - self._tokens) / self.rate
+                self._wakeup = loop.call_later(delay, self._dispatch)
+                break
+
+    def queue_depth(self) -> int:
+        """Requests currently waiting for a token"""
+        return sum(self._depth.values())
+
+    def stats(self) -> Dict[str, object]:
+        """Queue depth per priority and wait times of queued requests"""
+        return {
+            "queue_depth": {
+                PRIORITY_NAMES[priority]: depth
+                for priority, depth in self._depth.items()
+            },
+            "requests": self._requests,
+            "queued": self._queued,
+            "timeouts": self._timeouts,
+            "average_wait": self._total_wait / self._served if self._served else 0.0,
+            "max_wait": self._max_wait_seen,
+        }
@@ -0,0 +1,149 @@
+"""
+Background refresh of market data, paced by the PSX trading session
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+from .client import PSXClient
+from .market_hours import PKT, is_market_open, next_open
+from .ratelimit import background_priority
+
+logger = logging.getLogger(__name__)
+
+
+def parse_watchlist(symbols: str) -> Tuple[str, ...]:
+    """Parse a comma-separated watchlist into unique upper-case symbols"""
+    return tuple(
+        dict.fromkeys(s.strip().upper() for s in symbols.split(",") if s.strip())
+    )
+
+
+class BackgroundRefresher:
+    """Keep the client's caches warm so tool calls rarely wait on PSX.
+
+    While the market is open the market watch snapshot is refreshed every
+    open_interval seconds and the watchlist's intraday and EOD series every
+    watchlist_interval seconds. While it is closed everything is refreshed
+    every closed_interval seconds, and again as soon as the next session
+    opens. Watchlist series are refreshed at least every watchlist_max_age
+    seconds, so their cached copies never age to the point where a tool call
+    has to wait on PSX. Requests run at background priority, behind tool calls.
+    """
+
+    def __init__(
+        self,
+        client: PSXClient,
+        watchlist: Iterable[str] = (),
+        open_interval: float = 10.0,
+        closed_interval: float = 900.0,
+        watchlist_interval: float = 60.0,
+        watchlist_max_age: Optional[float] = None,
+    ):
+        self.client = client
+        self.watchlist = tuple(watchlist)
+        self.open_interval = open_interval
+        self.closed_interval = closed_interval
+        self.watchlist_interval = watchlist_interval
+        self.watchlist_max_age = watchlist_max_age
+        self.cycles = 0
+        self._snapshot_refreshed: Optional[float] = None
+        self._watchlist_refreshed: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_settings(cls, client: PSXClient, settings) -> "BackgroundRefresher":
+        """Build the refresher described by the background refresh settings"""
+        return cls(
+            client,
+            watchlist=parse_watchlist(settings.WATCHLIST),
+            open_interval=settings.REFRESH_INTERVAL_OPEN,
+            closed_interval=settings.REFRESH_INTERVAL_CLOSED,
+            watchlist_interval=settings.WATCHLIST_REFRESH_INTERVAL,
+            watchlist_max_age=min(settings.INTRADAY_MAX_AGE, settings.EOD_MAX_AGE),
+        )
+
+    def next_delay(self, now: Optional[datetime] = None) -> float:
+        """Seconds until the next refresh cycle"""
+        now = datetime.now(PKT) if now is None else now
+        if is_market_open(now):
+            return self.open_interval
+        until_open = (next_open(now) - now).total_seconds()
+        closed_interval = self._interval(self.closed_interval)
+        return max(min(closed_interval, until_open), 1.0)
+
+    def _interval(self, interval: float) -> float:
+        """Shorten an interval so watchlist series never reach their max age"""
+        if self.watchlist and self.watchlist_max_age is not None:
+            return min(interval, self.watchlist_max_age)
+        return interval
+
+    @staticmethod
+    def _due(refreshed: Optional[float], interval: float) -> bool:
+        """Whether interval seconds have passed since the refresh at refreshed"""
+        return refreshed is None or time.monotonic() - refreshed >= interval
+
+    async def refresh_once(self, now: Optional[datetime] = None) -> None:
+        """Refresh the snapshot and the watchlist when each is due"""
+        market_open = is_market_open(now)
+        if market_open or self._due(self._snapshot_refreshed, self.closed_interval):
+            try:
+                await self.client.refresh_market_snapshot()
+            except Exception as e:
+                logger.warning("Background market watch refresh failed: %s", e)
+            self._snapshot_refreshed = time.monotonic()
+
+        interval = self.watchlist_interval if market_open else self.closed_interval
+        if self.watchlist and self._due(
+            self._watchlist_refreshed, self._interval(interval)
+        ):
+            await self.prefetch_watchlist()
+            self._watchlist_refreshed = time.monotonic()
+        self.cycles += 1
+
+    async def prefetch_watchlist(self) -> None:
+        """Fetch intraday and EOD series of every watchlist symbol"""
+        fetches = [
+            fetch(symbol)
+            for symbol in self.watchlist
+            for fetch in (
+                self.client.refresh_intraday_data,
+                self.client.refresh_eod_data,
+            )
+        ]
+        results = await asyncio.gather(*fetches, return_exceptions=True)
+        failed = [r for r in results if isinstance(r, Exception)]
+        if failed:
+            logger.warning(
+                "Watchlist prefetch: %d of %d fetches failed (%s)",
+                len(failed),
+                len(results),
+                failed[0],
+            )
+
+    async def run(self) -> None:
+        """Refresh forever at background priority"""
+        with background_priority():
+            while True:
+                await self.refresh_once()
+                await asyncio.sleep(self.next_delay())
+
+    def start(self) -> asyncio.Task:
+        """Start run() as a task on the running loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    async def stop(self) -> None:
+        """Cancel the background task and wait for it to finish"""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
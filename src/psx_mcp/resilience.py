@@ -0,0 +1,95 @@
+"""
+Retry backoff and circuit breaking for requests to PSX
+"""
+
+import asyncio
+import random
+import time
+from typing import Optional
+
+import httpx
+
+
+class CircuitOpenError(Exception):
+    """An endpoint failed repeatedly and is not being called for a while"""
+
+
+def is_transient(error: BaseException) -> bool:
+    """True for failures worth retrying: network errors, timeouts, 429 and 5xx"""
+    if isinstance(error, (httpx.TransportError, asyncio.TimeoutError)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return False
+
+
+def backoff_delay(
+    attempt: int, base: float, cap: float, rng: Optional[random.Random] = None
+) -> float:
+    """Full-jitter exponential backoff before retry number attempt (0-based)"""
+    return (rng or random).uniform(0, min(cap, base * 2**attempt))
+
+
+class CircuitBreaker:
+    """Fail fast on an endpoint after threshold consecutive failed calls.
+
+    Once open, calls are refused for reset_after seconds; then a single trial
+    call is let through (half-open). Its success closes the circuit and its
+    failure opens it again.
+    """
+
+    # Permit of calls made while the circuit is closed
+    CLOSED = object()
+
+    def __init__(self, threshold: int, reset_after: float):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial: Optional[object] = None
+
+    @property
+    def state(self) -> str:
+        """'closed', 'open' or 'half-open'"""
+        if self._opened_at is None:
+            return "closed"
+        if self._trial is not None or self.retry_in() == 0:
+            return "half-open"
+        return "open"
+
+    def retry_in(self) -> float:
+        """Seconds until an open circuit lets a trial call through"""
+        if self._opened_at is None:
+            return 0.0
+        elapsed = time.monotonic() - self._opened_at
+        return max(self.reset_after - elapsed, 0.0)
+
+    def allow(self) -> Optional[object]:
+        """Return a permit if a call may go ahead now, else None.
+
+        When half-open the permit claims the trial and is unique to the call,
+        so release() only gives back the trial of the call that claimed it.
+        """
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._trial is not None or self.retry_in() > 0:
+            return None
+        self._trial = object()
+        return self._trial
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._opened_at = None
+        self._trial = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._trial is not None or self.failures >= self.threshold:
+            self._opened_at = time.monotonic()
+        self._trial = None
+
+    def release(self, permit: object) -> None:
+        """Give back a trial that ended without an outcome (e.g. cancelled)"""
+        if permit is self._trial:
+            self._trial = None
@@ -4,38 +4,77 @@ PSX MCP Server - Pakistan Stock Exchange Data Scraper
 Provides tools to fetch market data from PSX website
 """
 
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastmcp import FastMCP
+from .settings import settings
+from .ratelimit import background_priority
+from .refresher import BackgroundRefresher
 from .tools import (
+    psx_client,
     market_data,
     intraday,
     history,
     sector,
+    sector_summary,
     gainers,
     losers,
+    top_movers,
     date_range,
     time_range,
     ohlcv,
     multi_ohlcv,
     price_at_time,
     volume_analysis,
+    multi_history,
+    changes_since,
+    intraday_bars,
 )
 
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    """Warm up connections and caches at startup and clean up on shutdown.
+
+    psx_client is shared by every session, so it stays open across them.
+    Prewarming runs as a background task and never delays startup.
+    """
+    with background_priority():
+        prewarm = asyncio.ensure_future(psx_client.prewarm())
+    refresher = None
+    if settings.BACKGROUND_REFRESH:
+        refresher = BackgroundRefresher.from_settings(psx_client, settings)
+        refresher.start()
+    try:
+        yield
+    finally:
+        prewarm.cancel()
+        if refresher is not None:
+            await refresher.stop()
+
+
 # Initialize the MCP server
-mcp = FastMCP("PSX Data Scraper")
+mcp = FastMCP("PSX Data Scraper", lifespan=lifespan)
 
 # Register all tools
 mcp.tool()(market_data)
 mcp.tool()(intraday)
 mcp.tool()(history)
 mcp.tool()(sector)
+mcp.tool()(sector_summary)
 mcp.tool()(gainers)
 mcp.tool()(losers)
+mcp.tool()(top_movers)
 mcp.tool()(date_range)
 mcp.tool()(time_range)
 mcp.tool()(ohlcv)
 mcp.tool()(multi_ohlcv)
 mcp.tool()(price_at_time)
 mcp.tool()(volume_analysis)
+mcp.tool()(multi_history)
+mcp.tool()(changes_since)
+mcp.tool()(intraday_bars)
 
 if __name__ == "__main__":
     # Run the MCP server
@@ -0,0 +1,98 @@
+"""
+Configuration settings for PSX MCP Server
+"""
+
+import os
+from typing import Optional
+
+
+class Settings:
+    """Configuration settings"""
+
+    # PSX API Configuration
+    PSX_BASE_URL: str = "https://dps.psx.com.pk"
+    REQUEST_TIMEOUT: int = 30
+    HTML_PARSER: str = "fast"  # "fast" tokenizer or "bs4" (BeautifulSoup)
+    MARKET_WATCH_STREAMING: bool = True  # parse market watch while downloading
+
+    # HTTP Connection Pool
+    HTTP2: bool = False  # needs the h2 package (pip install psx-mcp-server[http2])
+    MAX_CONNECTIONS: int = 20
+    MAX_KEEPALIVE_CONNECTIONS: int = 20
+    KEEPALIVE_EXPIRY: float = 30.0  # seconds an idle connection is kept open
+    PREWARM_CONNECTIONS: int = 2  # connections opened at server startup (0: off)
+    VALIDATOR_CACHE_SIZE: int = 256  # URLs revalidated with ETag/Last-Modified (0: off)
+
+    # Server Configuration
+    SERVER_NAME: str = "PSX Data Scraper"
+    SERVER_VERSION: str = "1.0.0"
+
+    # Rate Limiting
+    MAX_REQUESTS_PER_MINUTE: int = 100
+    RATE_LIMIT_WINDOW: int = 60
+    RATE_LIMIT_BURST: int = 20  # requests allowed back to back before throttling
+    RATE_LIMIT_MAX_WAIT: float = 30.0  # seconds a request may queue for a slot
+
+    # Retries and Circuit Breaking
+    MAX_RETRIES: int = 2  # retries of a GET after network errors, 429 or 5xx
+    RETRY_ATTEMPT_TIMEOUT: float = 10.0  # seconds per attempt (REQUEST_TIMEOUT overall)
+    RETRY_BACKOFF_BASE: float = 0.5  # first backoff ceiling, doubled per retry
+    RETRY_BACKOFF_MAX: float = 4.0
+    CIRCUIT_BREAKER_THRESHOLD: int = 5  # consecutive failed calls that open a circuit
+    CIRCUIT_BREAKER_RESET: float = 30.0  # seconds before an open circuit is retried
+
+    # Cache Configuration
+    # Data younger than its TTL is served as is; older data is served at once
+    # while it is refreshed in the background, until it reaches MAX_AGE and a
+    # request has to wait for the refresh
+    SNAPSHOT_TTL: float = 15.0  # seconds a market watch snapshot stays fresh
+    SNAPSHOT_MAX_AGE: float = 120.0
+    INTRADAY_TTL: float = 30.0  # seconds an intraday series stays fresh
+    INTRADAY_MAX_AGE: float = 300.0
+    EOD_TTL: float = 300.0  # seconds an EOD series stays fresh
+    EOD_MAX_AGE: float = 3600.0
+    INTRADAY_BUFFER_SIZE: int = 4096  # points preallocated per intraday session
+    INTRADAY_BUFFER_MAX: int = 65536  # beyond this the oldest points are dropped
+    BAR_CACHE_SIZE: int = 256  # (symbol, interval) intraday bar sets kept in memory
+    SNAPSHOT_HISTORY: int = 64  # recent snapshots kept for cursors and changes_since
+    SERIES_PIN_LIMIT: int = 32  # time series kept for pagination cursors
+    SERIES_CACHE_SIZE: int = 256  # series kept in memory (also served when PSX fails)
+
+    # Local Storage
+    EOD_STORE_ENABLED: bool = True  # keep EOD history on disk between runs
+    EOD_PUBLISH_GRACE: float = 3600.0  # seconds PSX may take to publish a session
+    DATA_DIR: str = os.getenv(
+        "PSX_DATA_DIR", os.path.join(os.path.expanduser("~"), ".psx_mcp")
+    )
+
+    # Background Refresh
+    BACKGROUND_REFRESH: bool = True  # keep caches warm while the server runs
+    REFRESH_INTERVAL_OPEN: float = 10.0  # market watch refresh during trading hours
+    REFRESH_INTERVAL_CLOSED: float = 900.0  # refresh interval outside trading hours
+    WATCHLIST_REFRESH_INTERVAL: float = 60.0  # watchlist series during trading hours
+    WATCHLIST: str = os.getenv("PSX_WATCHLIST", "")  # comma-separated symbols
+
+    # Market Hours (Asia/Karachi, UTC+5 all year)
+    MARKET_UTC_OFFSET_HOURS: int = 5
+    MARKET_OPEN: str = "09:30"
+    MARKET_CLOSE: str = "15:30"
+
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+    # Data Configuration
+    OUTPUT_FORMAT: str = "compact"  # "pretty", "compact" or "columnar" tool output
+    DEFAULT_DATE_FORMAT: str = "%Y-%m-%d"
+    DEFAULT_DATETIME_FORMAT: str = "%Y-%m-%d %H:%M:%S"
+    MAX_HISTORICAL_DAYS: int = 1825  # 5 years
+    MULTI_HISTORY_CONCURRENCY: int = 8  # symbols multi_history fetches at once
+
+    @classmethod
+    def get_env_var(cls, key: str, default: Optional[str] = None) -> Optional[str]:
+        """Get environment variable with optional default"""
+        return os.getenv(key, default)
+
+
+# Global settings instance
+settings = Settings()
@@ -0,0 +1,349 @@
+"""
+Market watch snapshots shared by the snapshot-based tools
+"""
+
+import heapq
+import operator
+import time
+from array import array
+from typing import List, Dict, Any, Optional, Sequence, Iterable, Tuple
+
+# Column layout of a snapshot, in StockData field order
+TEXT_FIELDS = ("symbol", "sector", "listed_in")
+FLOAT_FIELDS = (
+    "ldcp",
+    "open_price",
+    "high_price",
+    "low_price",
+    "current_price",
+    "change",
+    "change_percent",
+)
+INT_FIELDS = ("volume",)
+STOCK_FIELDS = TEXT_FIELDS + FLOAT_FIELDS + INT_FIELDS
+
+# Ranking keys derived from the stored columns
+DERIVED_KEYS = ("abs_change_percent", "turnover", "range_percent")
+RANKING_KEYS = FLOAT_FIELDS + INT_FIELDS + DERIVED_KEYS
+
+# Columns compared between two snapshots by MarketSnapshot.changes_since
+DELTA_COLUMNS = ("current_price", "high_price", "low_price", "volume")
+
+
+def column_rows(
+    columns: Dict[str, Sequence],
+    row_ids: Optional[Iterable[int]] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> List[Dict[str, Any]]:
+    """Materialize rows of a column mapping (all rows by default) as dicts.
+
+    Only the given fields (all StockData fields by default) are read.
+    """
+    if row_ids is None:
+        row_ids = range(len(columns["symbol"]))
+    fields = STOCK_FIELDS if fields is None else tuple(fields)
+    selected = [columns[field] for field in fields]
+    return [
+        dict(zip(fields, [column[row_id] for column in selected])) for row_id in row_ids
+    ]
+
+
+class MarketSnapshot:
+    """A versioned, read-only, column-oriented view of one market watch scrape.
+
+    Text fields are kept as tuples, numeric fields as typed ``array`` columns,
+    and ``index`` maps upper-cased symbols to their row number. Sector row ids
+    and per-sector aggregates are built once, together with the snapshot.
+    ``stale`` is set when a later refresh failed and this snapshot is still
+    being served in its place.
+    """
+
+    def __init__(
+        self,
+        columns: Dict[str, Sequence],
+        version: int,
+        fetched_at: Optional[float] = None,
+    ):
+        self.columns = columns
+        self.version = version
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+        self._created = time.monotonic()
+        self._size = len(columns["symbol"])
+        self.stale = False
+
+        self.index: Dict[str, int] = {}
+        for row_id, symbol in enumerate(columns["symbol"]):
+            self.index.setdefault(symbol.upper(), row_id)
+
+        self.sector_index: Dict[str, Tuple[int, ...]] = {}
+        self.sector_stats: Dict[str, Dict[str, Any]] = {}
+        self._sector_matches: Dict[str, Tuple[str, ...]] = {}
+        self._build_sector_index()
+
+        self._derived: Dict[str, Sequence] = {}
+        self._orders: Dict[Tuple[str, bool], List[int]] = {}
+        self._ranked: set = set()
+        self._changes: Dict[int, List[Dict[str, Any]]] = {}
+
+    def _build_sector_index(self):
+        """Group rows by normalized sector and aggregate each group"""
+        groups: Dict[str, List[int]] = {}
+        names: Dict[str, str] = {}
+        for row_id, name in enumerate(self.columns["sector"]):
+            key = name.lower()
+            groups.setdefault(key, []).append(row_id)
+            names.setdefault(key, name)
+
+        symbols = self.columns["symbol"]
+        change_percent = self.columns["change_percent"]
+        volume = self.columns["volume"]
+        for key in sorted(groups):
+            row_ids = groups[key]
+            changes = [change_percent[row_id] for row_id in row_ids]
+            volumes = [volume[row_id] for row_id in row_ids]
+            total_volume = sum(volumes)
+            weighted = sum(v * c for v, c in zip(volumes, changes))
+            best = row_ids[changes.index(max(changes))]
+            worst = row_ids[changes.index(min(changes))]
+
+            self.sector_index[key] = tuple(row_ids)
+            self.sector_stats[key] = {
+                "sector": names[key],
+                "stocks": len(row_ids),
+                "advancers": sum(1 for c in changes if c > 0),
+                "decliners": sum(1 for c in changes if c < 0),
+                "unchanged": sum(1 for c in changes if c == 0),
+                "total_volume": total_volume,
+                "volume_weighted_change_percent": (
+                    round(weighted / total_volume, 4) if total_volume else 0.0
+                ),
+                "best": {
+                    "symbol": symbols[best],
+                    "change_percent": change_percent[best],
+                },
+                "worst": {
+                    "symbol": symbols[worst],
+                    "change_percent": change_percent[worst],
+                },
+            }
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Iterable[Dict[str, Any]],
+        version: int,
+        fetched_at: Optional[float] = None,
+    ) -> "MarketSnapshot":
+        """Build a snapshot from parsed row dicts"""
+        rows = list(rows)
+        columns: Dict[str, Sequence] = {}
+        for field in TEXT_FIELDS:
+            columns[field] = tuple(row.get(field, "") for row in rows)
+        for field in FLOAT_FIELDS:
+            columns[field] = array("d", [row.get(field, 0.0) for row in rows])
+        for field in INT_FIELDS:
+            columns[field] = array("q", [row.get(field, 0) for row in rows])
+        return cls(columns, version=version, fetched_at=fetched_at)
+
+    @property
+    def age(self) -> float:
+        """Seconds elapsed since the snapshot was fetched"""
+        return time.monotonic() - self._created
+
+    def __len__(self) -> int:
+        return self._size
+
+    def column(self, field: str) -> Sequence:
+        """Return one column of the snapshot"""
+        return self.columns[field]
+
+    def find(self, symbol: str) -> Optional[int]:
+        """Return the row number of a symbol, or None if it is not listed"""
+        return self.index.get(symbol.upper())
+
+    def row(self, row_id: int) -> Dict[str, Any]:
+        """Materialize one row as a StockData-shaped dict"""
+        return {field: self.columns[field][row_id] for field in STOCK_FIELDS}
+
+    def rows(
+        self,
+        row_ids: Optional[Iterable[int]] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Materialize the given rows (all rows by default) as dicts"""
+        return column_rows(self.columns, row_ids, fields)
+
+    def ranking_column(self, key: str) -> Sequence:
+        """Return a stored numeric column or a lazily derived ranking column"""
+        if key not in RANKING_KEYS:
+            expected = ", ".join(RANKING_KEYS)
+            raise ValueError(f"Unknown ranking key '{key}', expected one of {expected}")
+        if key not in DERIVED_KEYS:
+            return self.columns[key]
+
+        column = self._derived.get(key)
+        if column is None:
+            price = self.columns["current_price"]
+            if key == "abs_change_percent":
+                values = [abs(c) for c in self.columns["change_percent"]]
+            elif key == "turnover":
+                values = [v * p for v, p in zip(self.columns["volume"], price)]
+            else:
+                values = [
+                    (high - low) / ldcp * 100 if ldcp else 0.0
+                    for high, low, ldcp in zip(
+                        self.columns["high_price"],
+                        self.columns["low_price"],
+                        self.columns["ldcp"],
+                    )
+                ]
+            column = self._derived[key] = array("d", values)
+        return column
+
+    def order_by(self, key: str, descending: bool = False) -> List[int]:
+        """Return row numbers sorted by a ranking key (stable for ties).
+
+        The full ordering is computed once per snapshot and cached.
+        """
+        order = self._orders.get((key, descending))
+        if order is None:
+            column = self.ranking_column(key)
+            order = sorted(
+                range(self._size), key=column.__getitem__, reverse=descending
+            )
+            self._orders[(key, descending)] = order
+        return order
+
+    def top(
+        self,
+        key: str,
+        k: int,
+        descending: bool = True,
+        row_ids: Optional[Iterable[int]] = None,
+    ) -> List[int]:
+        """Return the row numbers of the k best rows by a ranking key.
+
+        Ties keep snapshot order, exactly like a stable full sort. A key's
+        first query uses heap selection; once it is asked for again the full
+        ordering is cached, so further queries are an O(k) slice. Restricting
+        to row_ids (e.g. a sector) always uses heap selection over that subset.
+        """
+        k = max(k, 0)
+        column = self.ranking_column(key)
+        select = heapq.nlargest if descending else heapq.nsmallest
+        if row_ids is not None:
+            return select(k, row_ids, key=column.__getitem__)
+
+        if (key, descending) in self._orders or (key, descending) in self._ranked:
+            return self.order_by(key, descending)[:k]
+        self._ranked.add((key, descending))
+        return select(k, range(self._size), key=column.__getitem__)
+
+    def ranked_rows(
+        self, key: str, row_ids: List[int], fields: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Materialize rows, adding the ranking value for derived keys"""
+        rows = self.rows(row_ids, fields)
+        if key in DERIVED_KEYS:
+            column = self.ranking_column(key)
+            for row_id, row in zip(row_ids, rows):
+                row[key] = column[row_id]
+        return rows
+
+    def matching_sectors(self, query: str) -> Tuple[str, ...]:
+        """Return normalized sector keys containing query, case-insensitively.
+
+        Matches are resolved against the distinct sectors only and memoized
+        per snapshot, so repeated queries are a dictionary read.
+        """
+        needle = query.lower()
+        matches = self._sector_matches.get(needle)
+        if matches is None:
+            matches = tuple(key for key in self.sector_index if needle in key)
+            self._sector_matches[needle] = matches
+        return matches
+
+    def sector_rows(self, query: str) -> List[int]:
+        """Return row numbers of every stock whose sector contains query"""
+        matches = self.matching_sectors(query)
+        if len(matches) == 1:
+            return list(self.sector_index[matches[0]])
+        return sorted(row_id for key in matches for row_id in self.sector_index[key])
+
+    def sector_summaries(self, query: str = "") -> List[Dict[str, Any]]:
+        """Return the precomputed aggregates of sectors containing query"""
+        return [self.sector_stats[key] for key in self.matching_sectors(query)]
+
+    def _aligned(
+        self, older: "MarketSnapshot"
+    ) -> Tuple[Sequence[int], List[Sequence], List[Sequence]]:
+        """Row ids and delta columns of this and an older snapshot, row-aligned.
+
+        Scrapes usually list the same symbols in the same order, and then the
+        stored columns are used as they are. Otherwise symbols are matched
+        through the older index and symbols missing from it are left out.
+        """
+        new = [self.columns[field] for field in DELTA_COLUMNS]
+        old = [older.columns[field] for field in DELTA_COLUMNS]
+        if older.columns["symbol"] == self.columns["symbol"]:
+            return range(self._size), new, old
+
+        pairs = [
+            (row_id, older.find(symbol))
+            for row_id, symbol in enumerate(self.columns["symbol"])
+        ]
+        pairs = [(row_id, old_id) for row_id, old_id in pairs if old_id is not None]
+        row_ids = [row_id for row_id, _ in pairs]
+        old_ids = [old_id for _, old_id in pairs]
+        return (
+            row_ids,
+            [array(c.typecode, map(c.__getitem__, row_ids)) for c in new],
+            [array(c.typecode, map(c.__getitem__, old_ids)) for c in old],
+        )
+
+    def changes_since(self, older: "MarketSnapshot") -> List[Dict[str, Any]]:
+        """Rows of stocks whose price, volume, high or low moved since older.
+
+        Deltas are computed a column at a time and only changed rows are
+        materialized, largest absolute price move first (ties keep snapshot
+        order). ``new_high``/``new_low`` flag a session high above, or a low
+        below, the older snapshot's. Results are cached per older version.
+        """
+        changes = self._changes.get(older.version)
+        if changes is not None:
+            return changes
+
+        row_ids, new, old = self._aligned(older)
+        price, high, low, volume = new
+        old_price, old_high, old_low, old_volume = old
+        price_change = list(map(operator.sub, price, old_price))
+        volume_added = list(map(operator.sub, volume, old_volume))
+        new_high = list(map(operator.gt, high, old_high))
+        new_low = [
+            0 < current and (current < before or before == 0)
+            for current, before in zip(low, old_low)
+        ]
+
+        symbols = self.columns["symbol"]
+        changes = []
+        for i, moved in enumerate(zip(price_change, volume_added, new_high, new_low)):
+            if not any(moved):
+                continue
+            before = old_price[i]
+            changes.append(
+                {
+                    "symbol": symbols[row_ids[i]],
+                    "current_price": price[i],
+                    "price_change": round(price_change[i], 4),
+                    "price_change_percent": (
+                        round(price_change[i] / before * 100, 4) if before else 0.0
+                    ),
+                    "volume": volume[i],
+                    "volume_added": volume_added[i],
+                    "new_high": new_high[i],
+                    "new_low": new_low[i],
+                }
+            )
+        changes.sort(key=lambda row: abs(row["price_change_percent"]), reverse=True)
+        self._changes[older.version] = changes
+        return changes
@@ -0,0 +1,120 @@
+"""
+Persistent local store for end-of-day history
+"""
+
+import os
+import time
+from array import array
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from .columnar import read_header, read_series, write_series
+from .intraday import session_day
+from .market_hours import last_close
+from .settings import settings
+from .timeseries import TimeSeries
+
+
+def _concat(parts: Tuple[TimeSeries, ...], descending: bool) -> TimeSeries:
+    """Join ascending, non-overlapping EOD series into one new series.
+
+    descending records the order PSX served the bars in (see TimeSeries).
+    """
+    columns = [array(fmt) for fmt in ("q", "d", "q", "d")]
+    for part in parts:
+        for column, values in zip(
+            columns, (part.timestamps, part.prices, part.volumes, part.opens)
+        ):
+            column.frombytes(values.cast("B"))
+    return TimeSeries(*columns, descending=descending)
+
+
+class EODStore:
+    """Per-symbol end-of-day bars kept as columnar files under data_dir.
+
+    Each symbol is one ``eod/<SYMBOL>.psxc`` file (see ``columnar.py``) whose
+    header records when it was last refreshed from PSX. Refreshes only add
+    bars at or after the last stored one, and a symbol that already holds
+    the most recent session's bar is served from disk without contacting PSX.
+    Reads are memory-mapped (see ``columnar.MAP_FILES``) and reused until
+    the file is replaced.
+    """
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        self.directory = os.path.join(data_dir, "eod")
+        self._mapped: Dict[str, Tuple[Tuple[int, int], TimeSeries]] = {}
+
+    def path(self, symbol: str) -> str:
+        """Return the file holding a symbol's history"""
+        return os.path.join(self.directory, f"{symbol.upper()}.psxc")
+
+    def last_timestamp(self, symbol: str) -> Optional[int]:
+        """Return the timestamp of the newest stored bar of a symbol"""
+        series = self.load(symbol)
+        return series.timestamps[-1] if series else None
+
+    def is_current(self, symbol: str, now: Optional[datetime] = None) -> bool:
+        """Whether the symbol holds the bar of the latest session.
+
+        A refresh after the latest close only counts once its bar was stored,
+        or once EOD_PUBLISH_GRACE has passed since the close (a session PSX
+        publishes no bar for, such as an exchange holiday).
+        """
+        try:
+            header = read_header(self.path(symbol))
+        except FileNotFoundError:
+            return False
+        close = last_close(now)
+        if header.refreshed_at < close.timestamp():
+            return False
+        if header.refreshed_at >= close.timestamp() + settings.EOD_PUBLISH_GRACE:
+            return True
+        last = self.last_timestamp(symbol)
+        return last is not None and session_day(last) >= close.date()
+
+    def load(self, symbol: str) -> Optional[TimeSeries]:
+        """Map the stored history of a symbol, newest first like PSX serves it"""
+        path = self.path(symbol)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        key = (stat.st_ino, stat.st_mtime_ns)
+        cached = self._mapped.get(symbol)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        series = read_series(path)
+        if series is not None:
+            self._mapped[symbol] = (key, series)
+        return series
+
+    def merge(
+        self, symbol: str, series: TimeSeries, refreshed_at: Optional[float] = None
+    ) -> int:
+        """Append bars newer than the stored ones and mark the symbol refreshed.
+
+        The last stored bar is rewritten as well, in case it was stored while
+        its session was still open. Returns the number of bars written.
+        """
+        refreshed_at = time.time() if refreshed_at is None else refreshed_at
+        stored = self.load(symbol)
+        if stored is None or len(stored) == 0:
+            if len(series) == 0:
+                return 0
+            merged = newer = series
+        else:
+            last = stored.timestamps[-1]
+            newer = series.between(last, 2**63 - 1)
+            if len(newer) == 0:
+                # Nothing new: only record the refresh
+                merged = stored
+            else:
+                kept = stored.between(stored.timestamps[0], last - 1)
+                merged = _concat((kept, newer), series.descending)
+
+        # Forget the mapping of the file about to be replaced
+        self._mapped.pop(symbol, None)
+        os.makedirs(self.directory, exist_ok=True)
+        write_series(self.path(symbol), merged, refreshed_at)
+        return len(newer)
@@ -0,0 +1,224 @@
+"""
+Compact time series containers for intraday and end-of-day data
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import List, Dict, Any, Optional, Sequence, Iterator
+
+from .models import TimeSeriesData
+
+# Public record layout, kept in sync with the TimeSeriesData schema
+SERIES_FIELDS = tuple(TimeSeriesData.model_fields)
+
+
+class TimeSeries:
+    """A time series held as parallel typed columns sorted by timestamp.
+
+    Columns are memoryviews over ``array`` storage, so range slices share
+    memory with the series they came from. PSX serves series newest first;
+    ``descending`` records that order so indexing, iteration and records
+    keep presenting points the way the source did. ``stale`` marks a series
+    served from cache because refreshing it failed, and ``age`` one served
+    past its TTL while it is being refreshed; views inherit both.
+    """
+
+    __slots__ = (
+        "timestamps",
+        "prices",
+        "volumes",
+        "opens",
+        "descending",
+        "stale",
+        "age",
+    )
+
+    def __init__(
+        self,
+        timestamps: Sequence[int],
+        prices: Sequence[float],
+        volumes: Sequence[int],
+        opens: Optional[Sequence[float]] = None,
+        descending: bool = False,
+        stale: bool = False,
+        age: Optional[float] = None,
+    ):
+        self.timestamps = memoryview(timestamps)
+        self.prices = memoryview(prices)
+        self.volumes = memoryview(volumes)
+        self.opens = None if opens is None else memoryview(opens)
+        self.descending = descending
+        self.stale = stale
+        self.age = age
+
+    @classmethod
+    def from_raw(
+        cls, raw_data: Sequence[Sequence[Any]], with_open: bool
+    ) -> "TimeSeries":
+        """Validate and convert a raw PSX ``data`` array in bulk.
+
+        Intraday points are ``[timestamp, price, volume]`` and EOD points add
+        the open price. Shorter points are skipped, values are coerced with
+        int()/float() column by column, and any invalid value raises.
+        """
+        width = 4 if with_open else 3
+        points = [item for item in raw_data if len(item) >= width]
+        columns = list(zip(*points)) if points else [()] * width
+        return cls.from_columns(
+            timestamps=array("q", map(int, columns[0])),
+            prices=array("d", map(float, columns[1])),
+            volumes=array("q", map(int, columns[2])),
+            opens=array("d", map(float, columns[3])) if with_open else None,
+        )
+
+    @classmethod
+    def from_columns(
+        cls,
+        timestamps: array,
+        prices: array,
+        volumes: array,
+        opens: Optional[array] = None,
+    ) -> "TimeSeries":
+        """Build a series from columns in source order, sorting if needed"""
+        columns = [c for c in (timestamps, prices, volumes, opens) if c is not None]
+        pairs = list(zip(timestamps, timestamps[1:]))
+        descending = False
+        if any(a > b for a, b in pairs):
+            if all(a >= b for a, b in pairs):
+                # Newest first: flip in place and remember the source order
+                for column in columns:
+                    column.reverse()
+                descending = True
+            else:
+                order = sorted(range(len(timestamps)), key=timestamps.__getitem__)
+                for column in columns:
+                    column[:] = array(column.typecode, map(column.__getitem__, order))
+        return cls(timestamps, prices, volumes, opens, descending=descending)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def _position(self, index: int) -> int:
+        """Map an index in source order to a position in the sorted columns"""
+        size = len(self.timestamps)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("TimeSeries index out of range")
+        return size - 1 - index if self.descending else index
+
+    def _point(self, position: int) -> Dict[str, Any]:
+        """Materialize the point stored at a sorted position"""
+        return {
+            "timestamp": self.timestamps[position],
+            "price": self.prices[position],
+            "volume": self.volumes[position],
+            "open_price": None if self.opens is None else self.opens[position],
+        }
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        return self._point(self._position(index))
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.to_records())
+
+    def values(self, field: str) -> List[Any]:
+        """Return one field for every point, in source order"""
+        column = {
+            "timestamp": self.timestamps,
+            "price": self.prices,
+            "volume": self.volumes,
+            "open_price": self.opens,
+        }[field]
+        values = [None] * len(self) if column is None else column.tolist()
+        if self.descending:
+            values.reverse()
+        return values
+
+    def to_columns(
+        self, fields: Optional[Sequence[str]] = None
+    ) -> Dict[str, List[Any]]:
+        """Return each field (all by default) as one list, in source order"""
+        return {field: self.values(field) for field in fields or SERIES_FIELDS}
+
+    def to_records(
+        self, fields: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Materialize every point as a TimeSeriesData-shaped dict.
+
+        Only the given fields (all by default) are read and included.
+        """
+        fields = tuple(fields or SERIES_FIELDS)
+        return [
+            dict(zip(fields, point))
+            for point in zip(*(self.values(field) for field in fields))
+        ]
+
+    def slice(self, start: int, stop: int) -> "TimeSeries":
+        """Return a zero-copy view of sorted positions [start, stop)"""
+        return TimeSeries(
+            self.timestamps[start:stop],
+            self.prices[start:stop],
+            self.volumes[start:stop],
+            None if self.opens is None else self.opens[start:stop],
+            descending=self.descending,
+            stale=self.stale,
+            age=self.age,
+        )
+
+    def as_stale(self) -> "TimeSeries":
+        """Return a zero-copy view of the whole series marked as stale"""
+        view = self.slice(0, len(self))
+        view.stale = True
+        return view
+
+    def with_age(self, age: float) -> "TimeSeries":
+        """Return a zero-copy view of the whole series marked with its age"""
+        view = self.slice(0, len(self))
+        view.age = age
+        return view
+
+    def page(self, start: int, stop: int) -> "TimeSeries":
+        """Return a zero-copy view of points [start, stop) in source order"""
+        size = len(self)
+        start = min(max(start, 0), size)
+        stop = min(max(stop, start), size)
+        if self.descending:
+            return self.slice(size - stop, size - start)
+        return self.slice(start, stop)
+
+    def between(self, start: int, end: int) -> "TimeSeries":
+        """Return a zero-copy view of points with start <= timestamp <= end"""
+        low = bisect_left(self.timestamps, start)
+        high = bisect_right(self.timestamps, end, lo=low)
+        return self.slice(low, high)
+
+    def nearest(self, timestamp: int) -> Optional[Dict[str, Any]]:
+        """Return the point closest to timestamp in O(log n).
+
+        Ties resolve to the point that comes first in source order, matching
+        a linear ``min()`` over the records.
+        """
+        size = len(self)
+        if size == 0:
+            return None
+
+        timestamps = self.timestamps
+        index = bisect_left(timestamps, timestamp)
+        if index == 0:
+            closest = timestamps[0]
+        elif index == size:
+            closest = timestamps[size - 1]
+        else:
+            before, after = timestamps[index - 1], timestamps[index]
+            gap_before, gap_after = timestamp - before, after - timestamp
+            if gap_before < gap_after or (
+                gap_before == gap_after and not self.descending
+            ):
+                closest = before
+            else:
+                closest = after
+
+        if self.descending:
+            return self._point(bisect_right(timestamps, closest) - 1)
+        return self._point(bisect_left(timestamps, closest))
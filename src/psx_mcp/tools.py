@@ -2,58 +2,258 @@
 MCP Tools for PSX data access
 """
 
+import asyncio
 import json
 from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from .settings import settings
+from .bars import parse_interval
 from .client import PSXClient
+from .market_hours import PKT
+from .models import StockData, TimeSeriesData, select_fields
+from .output import encode, resolve_format
+from .pagination import Cursor, decode_cursor, encode_cursor, page_bounds
+from .snapshot import MarketSnapshot
+from .store import EODStore
+from .timeseries import SERIES_FIELDS, TimeSeries
+
+# Initialize the PSX client, keeping EOD history on disk between runs
+psx_client = PSXClient(
+    eod_store=EODStore(settings.DATA_DIR) if settings.EOD_STORE_ENABLED else None
+)
+
+
+def _ohlcv_row(snapshot: MarketSnapshot, row_id: int) -> dict:
+    """Extract OHLCV data for one snapshot row"""
+    columns = snapshot.columns
+    return {
+        "symbol": columns["symbol"][row_id],
+        "sector": columns["sector"][row_id],
+        "open": columns["open_price"][row_id],
+        "high": columns["high_price"][row_id],
+        "low": columns["low_price"][row_id],
+        "close": columns["current_price"][row_id],
+        "volume": columns["volume"][row_id],
+        "ldcp": columns["ldcp"][row_id],
+        "change": columns["change"][row_id],
+        "change_percent": columns["change_percent"][row_id],
+    }
+
+
+def _snapshot_response(
+    snapshot: MarketSnapshot, data: Any, output_format: Optional[str] = None, **extra
+) -> str:
+    """Serialize tool output together with the snapshot it was read from.
+
+    A snapshot kept after a failed refresh is flagged with ``"stale": true``.
+    """
+    if snapshot.stale:
+        extra["stale"] = True
+    return encode(
+        {
+            "snapshot_version": snapshot.version,
+            "snapshot_age": round(snapshot.age, 3),
+            "data": data,
+            **extra,
+        },
+        output_format,
+    )
+
+
+def _series_response(
+    series: TimeSeries,
+    output_format: Optional[str] = None,
+    fields: Optional[Tuple[str, ...]] = None,
+    **extra,
+) -> str:
+    """Serialize a time series, reading columns directly for columnar output.
+
+    Only the selected fields are read. The points go under ``data`` next to
+    the series' freshness (see _series_freshness) and any extra keys, such as
+    a pagination cursor, so every response has the same shape.
+    """
+    if resolve_format(output_format) == "columnar":
+        data, output_format = series.to_columns(fields), "columnar"
+    else:
+        data = series.to_records(fields)
+    return encode({"data": data, **_series_freshness(series), **extra}, output_format)
 
 
-# Initialize the PSX client
-psx_client = PSXClient()
-
+def _series_freshness(series: TimeSeries) -> Dict[str, Any]:
+    """``stale`` (served after a failed refresh) and ``age`` of a series.
 
-async def market_data() -> str:
+    age is the seconds since a cached series was fetched when it is served
+    past its TTL or after a failed refresh, and null for fresh data.
+    """
+    age = None if series.age is None else round(series.age, 3)
+    return {"stale": series.stale, "age": age}
+
+
+async def _cursor_snapshot(
+    query: str, cursor: Optional[str]
+) -> Tuple[MarketSnapshot, int]:
+    """Return the snapshot and offset a page reads from"""
+    if cursor:
+        position = decode_cursor(cursor, query)
+        return psx_client.get_snapshot_version(position.version), position.offset
+    return await psx_client.get_market_snapshot(), 0
+
+
+def _snapshot_page(
+    query: str,
+    snapshot: MarketSnapshot,
+    row_ids: Any,
+    offset: int,
+    limit: Optional[int],
+    paginated: bool,
+    output_format: Optional[str],
+    fields: Optional[Tuple[str, ...]] = None,
+) -> str:
+    """Serialize one page of snapshot rows, with a cursor to the next page"""
+    if not paginated:
+        return _snapshot_response(
+            snapshot, snapshot.rows(row_ids, fields), output_format
+        )
+    start, stop, next_offset = page_bounds(len(row_ids), offset, limit)
+    next_cursor = None
+    if next_offset is not None:
+        next_cursor = encode_cursor(Cursor(query, snapshot.version, next_offset))
+    return _snapshot_response(
+        snapshot,
+        snapshot.rows(row_ids[start:stop], fields),
+        output_format,
+        next_cursor=next_cursor,
+    )
+
+
+async def _series_page(
+    query: str,
+    load: Callable[[], Awaitable[TimeSeries]],
+    limit: Optional[int],
+    cursor: Optional[str],
+    output_format: Optional[str],
+    fields: Optional[Tuple[str, ...]] = None,
+) -> str:
+    """Serialize a series, or one page of it when limit or cursor is given.
+
+    The first page pins the loaded series in the client, so later pages are
+    cut from the same points without another fetch.
+    """
+    if cursor:
+        position = decode_cursor(cursor, query)
+        series, offset = psx_client.get_pinned_series(position.version), position.offset
+    else:
+        series, offset = await load(), 0
+    if limit is None and not cursor:
+        return _series_response(series, output_format, fields)
+
+    start, stop, next_offset = page_bounds(len(series), offset, limit)
+    next_cursor = None
+    if next_offset is not None:
+        version = psx_client.pin_series(series)
+        next_cursor = encode_cursor(Cursor(query, version, next_offset))
+    return _series_response(
+        series.page(start, stop), output_format, fields, next_cursor=next_cursor
+    )
+
+
+async def market_data(
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    output_format: Optional[str] = None,
+) -> str:
     """
     Get current market watch data for all stocks listed on PSX.
 
+    Args:
+        limit: Maximum number of items per page (default: everything)
+        cursor: next_cursor of the previous page, to continue paging
+        fields: Comma-separated StockData fields to include (default: all)
+        output_format: 'pretty', 'compact' or 'columnar' (default from settings)
+
     Returns:
         JSON string containing market data for all stocks including:
         - Symbol, Sector, Listed In, LDCP, Open, High, Low, Current prices
         - Change amount and percentage
         - Volume traded
+        The payload also carries the snapshot version and age in seconds, and
+        next_cursor when paginating.
     """
     try:
-        data = await psx_client.get_market_watch_data()
-        return json.dumps(data, indent=2)
+        selected = select_fields(fields, StockData)
+        snapshot, offset = await _cursor_snapshot("market_data", cursor)
+        row_ids = range(len(snapshot))
+        return _snapshot_page(
+            "market_data",
+            snapshot,
+            row_ids,
+            offset,
+            limit,
+            limit is not None or bool(cursor),
+            output_format,
+            selected,
+        )
     except Exception as e:
         return json.dumps({"error": str(e)})
 
 
-async def intraday(symbol: str) -> str:
+async def intraday(
+    symbol: str,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    output_format: Optional[str] = None,
+) -> str:
     """
     Get intraday time series data for a specific stock.
 
     Args:
         symbol: Stock symbol (e.g., 'HBL', 'OGDC', 'PTC')
+        limit: Maximum number of items per page (default: everything)
+        cursor: next_cursor of the previous page, to continue paging
+        fields: Comma-separated TimeSeriesData fields to include (default: all)
+        output_format: 'pretty', 'compact' or 'columnar' (default from settings)
 
     Returns:
         JSON string containing intraday data points with:
         - Unix timestamp
         - Price at that time
         - Volume traded
+        Points are wrapped as {"data": [...], "stale": ..., "age": ...}, with a
+        next_cursor when paginating
     """
     try:
-        data = await psx_client.get_intraday_data(symbol.upper())
-        return json.dumps(data, indent=2)
+        selected = select_fields(fields, TimeSeriesData)
+        symbol = symbol.upper()
+        return await _series_page(
+            f"intraday:{symbol}",
+            lambda: psx_client.get_intraday_data(symbol),
+            limit,
+            cursor,
+            output_format,
+            selected,
+        )
     except Exception as e:
         return json.dumps({"error": str(e)})
 
 
-async def history(symbol: str) -> str:
+async def history(
+    symbol: str,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    output_format: Optional[str] = None,
+) -> str:
     """
     Get end-of-day time series data for a specific stock (past 5 years).
 
     Args:
         symbol: Stock symbol (e.g., 'HBL', 'OGDC', 'PTC')
+        limit: Maximum number of items per page (default: everything)
+        cursor: next_cursor of the previous page, to continue paging
+        fields: Comma-separated TimeSeriesData fields to include (default: all)
+        output_format: 'pretty', 'compact' or 'columnar' (default from settings)
 
     Returns:
         JSON string containing EOD data points with:
@@ -61,77 +261,184 @@ async def history(symbol: str) -> str:
         - Close price
         - Volume traded
         - Open price
+        Points are wrapped as {"data": [...], "stale": ..., "age": ...}, with a
+        next_cursor when paginating
     """
     try:
-        data = await psx_client.get_eod_data(symbol.upper())
-        return json.dumps(data, indent=2)
+        selected = select_fields(fields, TimeSeriesData)
+        symbol = symbol.upper()
+        return await _series_page(
+            f"history:{symbol}",
+            lambda: psx_client.get_eod_data(symbol),
+            limit,
+            cursor,
+            output_format,
+            selected,
+        )
     except Exception as e:
         return json.dumps({"error": str(e)})
 
 
-async def sector(sector: str) -> str:
+async def sector(
+    sector: str,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    output_format: Optional[str] = None,
+) -> str:
     """
     Search for stocks by sector from the market watch data.
 
     Args:
         sector: Sector name to search for (e.g., 'Banking', 'Technology', 'Energy')
+        limit: Maximum number of items per page (default: everything)
+        cursor: next_cursor of the previous page, to continue paging
+        fields: Comma-separated StockData fields to include (default: all)
+        output_format: 'pretty', 'compact' or 'columnar' (default from settings)
 
     Returns:
         JSON string containing all stocks in the specified sector
     """
     try:
-        all_stocks = await psx_client.get_market_watch_data()
-        filtered_stocks = [
-            stock
-            for stock in all_stocks
-            if sector.lower() in stock.get("sector", "").lower()
-        ]
-        return json.dumps(filtered_stocks, indent=2)
+        selected = select_fields(fields, StockData)
+        query = f"sector:{sector.lower()}"
+        snapshot, offset = await _cursor_snapshot(query, cursor)
+        return _snapshot_page(
+            query,
+            snapshot,
+            snapshot.sector_rows(sector),
+            offset,
+            limit,
+            limit is not None or bool(cursor),
+            output_format,
+            selected,
+        )
+    except Exception as e:
+        return json.dumps({"error": str(e)})
+
+
+async def sector_summary(sector: str = "", output_format: Optional[str] = None) -> str:
+    """
+    Get per-sector market breadth and volume statistics.
+
+    Args:
+        sector: Optional sector name to filter by (default: all sectors)
+        output_format: 'pretty', 'compact' or 'columnar' (default from settings)
+
+    Returns:
+        JSON string containing, for each matching sector:
+        - Number of stocks, advancers, decliners and unchanged
+        - Total volume and volume-weighted change percentage
+        - Best and worst performing stock by change percentage
+    """
+    try:
+        snapshot = await psx_client.get_market_snapshot()
+        return _snapshot_response(
+            snapshot, snapshot.sector_summaries(sector), output_format
+        )
     except Exception as e:
         return json.dumps({"error": str(e)})
 
 
-async def gainers(limit: int = 10) -> str:
+async def gainers(
+    limit: int = 10, fields: Optional[str] = None, output_format: Optional[str] = None
+) -> str:
     """
     Get top gaining stocks from market watch data.
 
     Args:
         limit: Number of top gainers to return (default: 10)
+        fields: Comma-separated StockData fields to include (default: all)
+        output_format: 'pretty', 'compact' or 'columnar' (default from settings)
 
     Returns:
         JSON string containing top gaining stocks sorted by change percentage
     """
     try:
-        all_stocks = await psx_client.get_market_watch_data()
-        sorted_stocks = sorted(
-            all_stocks, key=lambda x: x.get("change_percent", 0), reverse=True
+        selected = select_fields(fields, StockData)
+        snapshot = await psx_client.get_market_snapshot()
+        row_ids = snapshot.top("change_percent", limit, descending=True)
+        return _snapshot_response(
+            snapshot, snapshot.rows(row_ids, selected), output_format
         )
-        top_gainers = sorted_stocks[:limit]
-        return json.dumps(top_gainers, indent=2)
     except Exception as e:
         return json.dumps({"error": str(e)})
 
 
-async def losers(limit: int = 10) -> str:
+async def losers(
+    limit: int = 10, fields: Optional[str] = None, output_format: Optional[str] = None
+) -> str:
     """
     Get top losing stocks from market watch data.
 
     Args:
         limit: Number of top losers to return (default: 10)
+        fields: Comma-separated StockData fields to include (default: all)
+        output_format: 'pretty', 'compact' or 'columnar' (default from settings)
 
     Returns:
         JSON string containing top losing stocks sorted by change percentage
     """
     try:
-        all_stocks = await psx_client.get_market_watch_data()
-        sorted_stocks = sorted(all_stocks, key=lambda x: x.get("change_percent", 0))
-        top_losers = sorted_stocks[:limit]
-        return json.dumps(top_losers, indent=2)
+        selected = select_fields(fields, StockData)
+        snapshot = await psx_client.get_market_snapshot()
+        row_ids = snapshot.top("change_percent", limit, descending=False)
+        return _snapshot_response(
+            snapshot, snapshot.rows(row_ids, selected), output_format
+        )
+    except Exception as e:
+        return json.dumps({"error": str(e)})
+
+
+async def top_movers(
+    key: str = "change_percent",
+    k: int = 10,
+    direction: str = "desc",
+    sector: Optional[str] = None,
+    fields: Optional[str] = None,
+    output_format: Optional[str] = None,
+) -> str:
+    """
+    Rank stocks from market watch data by an arbitrary key.
+
+    Args:
+        key: Ranking key - 'change_percent', 'change', 'volume',
+            'abs_change_percent', 'turnover', 'range_percent' or any other
+            numeric market watch field (default: 'change_percent')
+        k: Number of stocks to return (default: 10)
+        direction: 'desc' for the highest values first, 'asc' for the lowest
+        sector: Optional sector name to rank within
+        fields: Comma-separated StockData fields to include (default: all)
+        output_format: 'pretty', 'compact' or 'columnar' (default from settings)
+
+    Returns:
+        JSON string containing the top k stocks; derived keys such as
+        turnover are included in each row
+    """
+    try:
+        selected = select_fields(fields, StockData)
+        if direction not in ("asc", "desc"):
+            return json.dumps({"error": "direction must be 'asc' or 'desc'"})
+
+        snapshot = await psx_client.get_market_snapshot()
+        row_ids = snapshot.sector_rows(sector) if sector else None
+        top_ids = snapshot.top(key, k, descending=direction == "desc", row_ids=row_ids)
+        return _snapshot_response(
+            snapshot, snapshot.ranked_rows(key, top_ids, selected), output_format
+        )
     except Exception as e:
         return json.dumps({"error": str(e)})
 
 
-async def date_range(symbol: str, start_date: str, end_date: str) -> str:
+async def date_range(
+    symbol: str,
+    start_date: str,
+    end_date: str,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    output_format: Optional[str] = None,
+) -> str:
     """
     Get end-of-day data for a specific stock within a date range.
 
@@ -139,33 +446,44 @@ async def date_range(symbol: str, start_date: str, end_date: str) -> str:
         symbol: Stock symbol (e.g., 'HBL', 'OGDC', 'PTC')
         start_date: Start date in YYYY-MM-DD format
         end_date: End date in YYYY-MM-DD format
+        limit: Maximum number of points per page (default: everything)
+        cursor: next_cursor of the previous page, to continue paging
+        fields: Comma-separated TimeSeriesData fields to include (default: all)
+        output_format: 'pretty', 'compact' or 'columnar' (default from settings)
 
     Returns:
         JSON string containing EOD data within the specified date range
     """
     try:
+        selected = select_fields(fields, TimeSeriesData)
         # Convert dates to timestamps
         start_dt = datetime.strptime(start_date, "%Y-%m-%d")
         end_dt = datetime.strptime(end_date, "%Y-%m-%d")
         start_timestamp = int(start_dt.timestamp())
         end_timestamp = int(end_dt.timestamp())
 
-        # Get all EOD data
-        all_data = await psx_client.get_eod_data(symbol.upper())
+        async def load() -> TimeSeries:
+            # Get all EOD data
+            all_data = await psx_client.get_eod_data(symbol.upper())
 
-        # Filter by date range
-        filtered_data = [
-            point
-            for point in all_data
-            if start_timestamp <= point["timestamp"] <= end_timestamp
-        ]
+            # Slice the date range out of the sorted series
+            return all_data.between(start_timestamp, end_timestamp)
 
-        return json.dumps(filtered_data, indent=2)
+        query = f"date_range:{symbol.upper()}:{start_timestamp}:{end_timestamp}"
+        return await _series_page(query, load, limit, cursor, output_format, selected)
     except Exception as e:
         return json.dumps({"error": str(e)})
 
 
-async def time_range(symbol: str, start_time: str, end_time: str) -> str:
+async def time_range(
+    symbol: str,
+    start_time: str,
+    end_time: str,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    output_format: Optional[str] = None,
+) -> str:
     """
     Get intraday data for a specific stock within a time range.
 
@@ -173,128 +491,101 @@ async def time_range(symbol: str, start_time: str, end_time: str) -> str:
         symbol: Stock symbol (e.g., 'HBL', 'OGDC', 'PTC')
         start_time: Start time in YYYY-MM-DD HH:MM:SS format
         end_time: End time in YYYY-MM-DD HH:MM:SS format
+        limit: Maximum number of points per page (default: everything)
+        cursor: next_cursor of the previous page, to continue paging
+        fields: Comma-separated TimeSeriesData fields to include (default: all)
+        output_format: 'pretty', 'compact' or 'columnar' (default from settings)
 
     Returns:
         JSON string containing intraday data within the specified time range
     """
     try:
+        selected = select_fields(fields, TimeSeriesData)
         # Convert times to timestamps
         start_dt = datetime.strptime(start_time, "%Y-%m-%d %H:%M:%S")
         end_dt = datetime.strptime(end_time, "%Y-%m-%d %H:%M:%S")
         start_timestamp = int(start_dt.timestamp())
         end_timestamp = int(end_dt.timestamp())
 
-        # Get all intraday data
-        all_data = await psx_client.get_intraday_data(symbol.upper())
+        async def load() -> TimeSeries:
+            # Get all intraday data
+            all_data = await psx_client.get_intraday_data(symbol.upper())
 
-        # Filter by time range
-        filtered_data = [
-            point
-            for point in all_data
-            if start_timestamp <= point["timestamp"] <= end_timestamp
-        ]
+            # Slice the time range out of the sorted series
+            return all_data.between(start_timestamp, end_timestamp)
 
-        return json.dumps(filtered_data, indent=2)
+        query = f"time_range:{symbol.upper()}:{start_timestamp}:{end_timestamp}"
+        return await _series_page(query, load, limit, cursor, output_format, selected)
     except Exception as e:
         return json.dumps({"error": str(e)})
 
 
-async def ohlcv(symbol: str) -> str:
+async def ohlcv(symbol: str, output_format: Optional[str] = None) -> str:
     """
     Get OHLCV (Open, High, Low, Close, Volume) data for a specific stock.
 
     Args:
         symbol: Stock symbol (e.g., 'HBL', 'OGDC', 'PTC')
+        output_format: 'pretty', 'compact' or 'columnar' (default from settings)
 
     Returns:
         JSON string containing OHLCV data from market watch
     """
     try:
-        all_stocks = await psx_client.get_market_watch_data()
+        snapshot = await psx_client.get_market_snapshot()
 
         # Find the specific stock
-        stock_data = None
-        for stock in all_stocks:
-            if stock.get("symbol", "").upper() == symbol.upper():
-                stock_data = stock
-                break
-
-        if not stock_data:
+        row_id = snapshot.find(symbol)
+        if row_id is None:
             return json.dumps({"error": f"Stock symbol {symbol} not found"})
 
-        # Extract OHLCV data
-        ohlcv = {
-            "symbol": stock_data.get("symbol"),
-            "sector": stock_data.get("sector"),
-            "open": stock_data.get("open_price"),
-            "high": stock_data.get("high_price"),
-            "low": stock_data.get("low_price"),
-            "close": stock_data.get("current_price"),
-            "volume": stock_data.get("volume"),
-            "ldcp": stock_data.get("ldcp"),
-            "change": stock_data.get("change"),
-            "change_percent": stock_data.get("change_percent"),
-        }
-
-        return json.dumps(ohlcv, indent=2)
+        return _snapshot_response(snapshot, _ohlcv_row(snapshot, row_id), output_format)
     except Exception as e:
         return json.dumps({"error": str(e)})
 
 
-async def multi_ohlcv(symbols: str) -> str:
+async def multi_ohlcv(symbols: str, output_format: Optional[str] = None) -> str:
     """
     Get OHLCV data for multiple stocks at once.
 
     Args:
         symbols: Comma-separated list of stock symbols (e.g., 'HBL,OGDC,PTC')
+        output_format: 'pretty', 'compact' or 'columnar' (default from settings)
 
     Returns:
         JSON string containing OHLCV data for all requested stocks
     """
     try:
         symbol_list = [s.strip().upper() for s in symbols.split(",")]
-        all_stocks = await psx_client.get_market_watch_data()
+        snapshot = await psx_client.get_market_snapshot()
 
         result = []
         for symbol in symbol_list:
-            stock_data = None
-            for stock in all_stocks:
-                if stock.get("symbol", "").upper() == symbol:
-                    stock_data = stock
-                    break
-
-            if stock_data:
-                ohlcv = {
-                    "symbol": stock_data.get("symbol"),
-                    "sector": stock_data.get("sector"),
-                    "open": stock_data.get("open_price"),
-                    "high": stock_data.get("high_price"),
-                    "low": stock_data.get("low_price"),
-                    "close": stock_data.get("current_price"),
-                    "volume": stock_data.get("volume"),
-                    "ldcp": stock_data.get("ldcp"),
-                    "change": stock_data.get("change"),
-                    "change_percent": stock_data.get("change_percent"),
-                }
-                result.append(ohlcv)
+            row_id = snapshot.find(symbol)
+            if row_id is not None:
+                result.append(_ohlcv_row(snapshot, row_id))
             else:
                 result.append({"symbol": symbol, "error": "Not found"})
 
-        return json.dumps(result, indent=2)
+        return _snapshot_response(snapshot, result, output_format)
     except Exception as e:
         return json.dumps({"error": str(e)})
 
 
-async def price_at_time(symbol: str, timestamp: int) -> str:
+async def price_at_time(
+    symbol: str, timestamp: int, output_format: Optional[str] = None
+) -> str:
     """
     Get the closest price data for a stock at a specific timestamp.
 
     Args:
         symbol: Stock symbol (e.g., 'HBL', 'OGDC', 'PTC')
         timestamp: Unix timestamp to find closest price for
+        output_format: 'pretty', 'compact' or 'columnar' (default from settings)
 
     Returns:
-        JSON string containing the closest price data point
+        JSON string containing the closest price data point under "data", with
+        the series' "stale" and "age"
     """
     try:
         # Get intraday data
@@ -304,25 +595,27 @@ async def price_at_time(symbol: str, timestamp: int) -> str:
             return json.dumps({"error": f"No intraday data found for {symbol}"})
 
         # Find the closest timestamp
-        closest_point = min(
-            intraday_data, key=lambda x: abs(x["timestamp"] - timestamp)
-        )
-
-        return json.dumps(closest_point, indent=2)
+        closest_point = intraday_data.nearest(timestamp)
+        response = {"data": closest_point, **_series_freshness(intraday_data)}
+        return encode(response, output_format)
     except Exception as e:
         return json.dumps({"error": str(e)})
 
 
-async def volume_analysis(symbol: str, days: int = 30) -> str:
+async def volume_analysis(
+    symbol: str, days: int = 30, output_format: Optional[str] = None
+) -> str:
     """
     Analyze volume patterns for a stock over a specified number of days.
 
     Args:
         symbol: Stock symbol (e.g., 'HBL', 'OGDC', 'PTC')
         days: Number of days to analyze (default: 30)
+        output_format: 'pretty', 'compact' or 'columnar' (default from settings)
 
     Returns:
-        JSON string containing volume analysis statistics
+        JSON string containing volume analysis statistics, with the series'
+        "stale" and "age"
     """
     try:
         # Calculate date range
@@ -334,12 +627,8 @@ async def volume_analysis(symbol: str, days: int = 30) -> str:
         # Get EOD data for the period
         eod_data = await psx_client.get_eod_data(symbol.upper())
 
-        # Filter by date range
-        filtered_data = [
-            point
-            for point in eod_data
-            if start_timestamp <= point["timestamp"] <= end_timestamp
-        ]
+        # Slice the period out of the sorted series
+        filtered_data = eod_data.between(start_timestamp, end_timestamp)
 
         if not filtered_data:
             return json.dumps(
@@ -347,8 +636,8 @@ async def volume_analysis(symbol: str, days: int = 30) -> str:
             )
 
         # Calculate volume statistics
-        volumes = [point["volume"] for point in filtered_data]
-        prices = [point["price"] for point in filtered_data]
+        volumes = filtered_data.values("volume")
+        prices = filtered_data.values("price")
 
         analysis = {
             "symbol": symbol,
@@ -367,8 +656,182 @@ async def volume_analysis(symbol: str, days: int = 30) -> str:
                 "price_change": prices[-1] - prices[0] if len(prices) > 1 else 0,
             },
             "latest_data": filtered_data[0] if filtered_data else None,
+            **_series_freshness(filtered_data),
         }
 
-        return json.dumps(analysis, indent=2)
+        return encode(analysis, output_format)
+    except Exception as e:
+        return json.dumps({"error": str(e)})
+
+
+def _history_panel(
+    series_by_symbol: Dict[str, TimeSeries], field: str
+) -> List[Dict[str, Any]]:
+    """Align one field of several EOD series into rows keyed by trading date.
+
+    Rows are sorted by date and hold every symbol, with None on dates a
+    symbol has no bar for.
+    """
+    values_by_date: Dict[str, Dict[str, Any]] = {}
+    for symbol, series in series_by_symbol.items():
+        dates = (
+            datetime.fromtimestamp(timestamp, PKT).strftime("%Y-%m-%d")
+            for timestamp in series.values("timestamp")
+        )
+        for date, value in zip(dates, series.values(field)):
+            values_by_date.setdefault(date, {})[symbol] = value
+    return [
+        {
+            "date": date,
+            **{symbol: values.get(symbol) for symbol in series_by_symbol},
+        }
+        for date, values in sorted(values_by_date.items())
+    ]
+
+
+async def multi_history(
+    symbols: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    field: str = "price",
+    output_format: Optional[str] = None,
+) -> str:
+    """
+    Get end-of-day history for multiple stocks as one panel aligned by date.
+
+    Args:
+        symbols: Comma-separated list of stock symbols (e.g., 'HBL,OGDC,PTC')
+        start_date: Start date in YYYY-MM-DD format (default: full history)
+        end_date: End date in YYYY-MM-DD format (default: latest)
+        field: Value per symbol: 'price', 'volume' or 'open_price' (default: price)
+        output_format: 'pretty', 'compact' or 'columnar' (default from settings)
+
+    Returns:
+        JSON string with one row per date holding each symbol's value, plus
+        per-symbol errors for symbols that could not be fetched
+    """
+    try:
+        symbol_list = list(
+            dict.fromkeys(s.strip().upper() for s in symbols.split(",") if s.strip())
+        )
+        if field not in SERIES_FIELDS or field == "timestamp":
+            raise ValueError(
+                f"Unknown field: {field}; expected price, volume or open_price"
+            )
+        start_timestamp = 0
+        if start_date:
+            start_timestamp = int(datetime.strptime(start_date, "%Y-%m-%d").timestamp())
+        end_timestamp = 2**62
+        if end_date:
+            end_timestamp = int(datetime.strptime(end_date, "%Y-%m-%d").timestamp())
+
+        # Cached, stored and in-flight series are reused by get_eod_data
+        semaphore = asyncio.Semaphore(max(settings.MULTI_HISTORY_CONCURRENCY, 1))
+
+        async def load(symbol: str) -> TimeSeries:
+            async with semaphore:
+                series = await psx_client.get_eod_data(symbol)
+            return series.between(start_timestamp, end_timestamp)
+
+        results = await asyncio.gather(
+            *(load(symbol) for symbol in symbol_list), return_exceptions=True
+        )
+
+        series_by_symbol: Dict[str, TimeSeries] = {}
+        errors: Dict[str, str] = {}
+        for symbol, result in zip(symbol_list, results):
+            if isinstance(result, Exception):
+                errors[symbol] = str(result)
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                series_by_symbol[symbol] = result
+
+        response: Dict[str, Any] = {
+            "symbols": list(series_by_symbol),
+            "field": field,
+            "data": _history_panel(series_by_symbol, field),
+        }
+        stale = [symbol for symbol, series in series_by_symbol.items() if series.stale]
+        if stale:
+            response["stale"] = stale
+        if errors:
+            response["errors"] = errors
+        return encode(response, output_format)
+    except Exception as e:
+        return json.dumps({"error": str(e)})
+
+
+async def changes_since(
+    version: Optional[int] = None,
+    seconds: Optional[float] = None,
+    output_format: Optional[str] = None,
+) -> str:
+    """
+    Get only the stocks that changed since an earlier market watch snapshot.
+
+    Much cheaper to poll than market_data: unchanged stocks are left out.
+
+    Args:
+        version: snapshot_version from an earlier response to compare against
+        seconds: Compare against the snapshot from at least this many seconds
+            ago, when no version is given (default: the previous snapshot)
+        output_format: 'pretty', 'compact' or 'columnar' (default from settings)
+
+    Returns:
+        JSON string with since_version and since_age of the snapshot compared
+        against, and per changed stock its price change, volume added and
+        whether it made a new session high or low, largest moves first
+    """
+    try:
+        snapshot = await psx_client.get_market_snapshot()
+        older = psx_client.earlier_snapshot(snapshot, version, seconds)
+        return _snapshot_response(
+            snapshot,
+            snapshot.changes_since(older),
+            output_format,
+            since_version=older.version,
+            since_age=round(older.age, 3),
+        )
+    except Exception as e:
+        return json.dumps({"error": str(e)})
+
+
+async def intraday_bars(
+    symbol: str, interval: str = "5m", output_format: Optional[str] = None
+) -> str:
+    """
+    Get intraday OHLCV bars with VWAP for a specific stock.
+
+    Much smaller than the raw intraday points: one row per interval.
+
+    Args:
+        symbol: Stock symbol (e.g., 'HBL', 'OGDC', 'PTC')
+        interval: Bar length such as '1m', '5m', '15m', '60m' or '1h'
+            (default: '5m')
+        output_format: 'pretty', 'compact' or 'columnar' (default from settings)
+
+    Returns:
+        JSON string with the symbol, the interval in seconds and the bars,
+        oldest first, each with its start timestamp, open, high, low, close,
+        volume and volume-weighted average price (vwap)
+    """
+    try:
+        symbol = symbol.upper()
+        seconds = parse_interval(interval)
+        series = await psx_client.get_intraday_data(symbol)
+        bars = psx_client.bars.resample(symbol, series, seconds)
+
+        if resolve_format(output_format) == "columnar":
+            data, output_format = bars.to_columns(), "columnar"
+        else:
+            data = bars.to_records()
+        response = {
+            "symbol": symbol,
+            "interval": seconds,
+            "data": data,
+            **_series_freshness(series),
+        }
+        return encode(response, output_format)
     except Exception as e:
         return json.dumps({"error": str(e)})
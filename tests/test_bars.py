@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Tests for intraday OHLCV bar resampling and the intraday_bars tool
+"""
+
+import pytest
+import json
+import random
+import sys
+import os
+from unittest.mock import AsyncMock, patch
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from psx_mcp import tools  # noqa: E402
+from psx_mcp.bars import BarCache, Bars, parse_interval  # noqa: E402
+from psx_mcp.client import PSXClient  # noqa: E402
+from psx_mcp.intraday import IntradayBuffer  # noqa: E402
+from psx_mcp.timeseries import TimeSeries  # noqa: E402
+
+OPEN = 1759465800  # 2025-10-03 09:30 PKT
+
+
+def session(count, seed=3):
+    """Raw PSX intraday points at irregular times, newest first"""
+    rng = random.Random(seed)
+    timestamp, points = OPEN, []
+    for _ in range(count):
+        timestamp += rng.randint(1, 90)
+        points.append([timestamp, round(rng.uniform(290, 310), 2), rng.randint(0, 5)])
+    return points[::-1]
+
+
+def naive_bars(raw, interval):
+    """Group points by bar start the obvious way"""
+    groups = {}
+    for timestamp, price, volume in sorted(raw):
+        groups.setdefault(timestamp - timestamp % interval, []).append((price, volume))
+    bars = []
+    for start, points in sorted(groups.items()):
+        prices = [p for p, _ in points]
+        volume = sum(v for _, v in points)
+        turnover = sum(p * v for p, v in points)
+        bars.append(
+            {
+                "timestamp": start,
+                "open": prices[0],
+                "high": max(prices),
+                "low": min(prices),
+                "close": prices[-1],
+                "volume": volume,
+                "vwap": round(turnover / volume, 4) if volume else prices[-1],
+            }
+        )
+    return bars
+
+
+class TestResampling:
+    """Test bar aggregation and the bar cache"""
+
+    def test_parse_interval(self):
+        """Minutes by default; seconds and hours by suffix"""
+        assert parse_interval("5m") == 300
+        assert parse_interval("15") == 900
+        assert parse_interval("1h") == parse_interval("60m") == 3600
+        assert parse_interval("90s") == 90
+        for invalid in ("0m", "5x", "", "m"):
+            with pytest.raises(ValueError, match="Invalid interval"):
+                parse_interval(invalid)
+
+    @pytest.mark.parametrize("interval", [60, 300, 900, 3600])
+    def test_bars_match_naive_grouping(self, interval):
+        """Bars agree with a straightforward group-by, zero volume included"""
+        raw = session(400)
+        bars = Bars(interval)
+        bars.extend(TimeSeries.from_raw(raw, with_open=False))
+
+        assert bars.to_records() == naive_bars(raw, interval)
+        assert bars.to_columns()["timestamp"] == [
+            bar["timestamp"] for bar in naive_bars(raw, interval)
+        ]
+
+    def test_cache_extends_growing_series(self):
+        """New points only re-aggregate the last bar onward"""
+        raw = session(300)
+        buffer = IntradayBuffer(64, max_capacity=1024)
+        cache = BarCache(8)
+
+        buffer.merge(raw[150:])
+        first = cache.resample("HBL", buffer.series(), 300)
+        assert cache.resample("HBL", buffer.series(), 300) is first
+
+        buffer.merge(raw)
+        with patch.object(
+            Bars, "extend", autospec=True, side_effect=Bars.extend
+        ) as extend:
+            grown = cache.resample("HBL", buffer.series(), 300)
+
+        assert extend.call_args.args[2] > 0  # started past the cached bars
+        assert grown.to_records() == naive_bars(raw, 300)
+        assert len(first) < len(grown)
+
+    def test_cache_recomputes_other_series(self):
+        """A series that does not extend the cached one is resampled in full"""
+        cache = BarCache(8)
+        cache.resample("HBL", TimeSeries.from_raw(session(50), False), 60)
+        other = session(50, seed=9)
+
+        bars = cache.resample("HBL", TimeSeries.from_raw(other, False), 60)
+
+        assert bars.to_records() == naive_bars(other, 60)
+
+
+class TestIntradayBarsTool:
+    """Test the intraday_bars tool"""
+
+    @pytest.mark.asyncio
+    async def test_tool_returns_bars(self):
+        """Bars come back oldest first, in records or columns"""
+        raw = session(120)
+        psx_client = PSXClient()
+        psx_client.get_intraday_data = AsyncMock(
+            return_value=TimeSeries.from_raw(raw, with_open=False)
+        )
+        with patch.object(tools, "psx_client", psx_client):
+            payload = json.loads(await tools.intraday_bars("hbl", "15m"))
+            columnar = json.loads(await tools.intraday_bars("HBL", "15m", "columnar"))
+            invalid = json.loads(await tools.intraday_bars("HBL", "soon"))
+
+        assert (payload["symbol"], payload["interval"]) == ("HBL", 900)
+        assert payload["data"] == naive_bars(raw, 900)
+        assert columnar["data"]["vwap"] == [bar["vwap"] for bar in payload["data"]]
+        assert "Invalid interval" in invalid["error"]
+        assert len(psx_client.bars) == 1
+        await psx_client.close()
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Tests for PSXClient request handling (coalescing, transport behaviour)
+"""
+
+import pytest
+import asyncio
+import gzip
+import json
+import sys
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import AsyncMock, Mock, patch
+import httpx
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from psx_mcp import tools  # noqa: E402
+from psx_mcp.client import PSXClient, accept_encoding  # noqa: E402
+from psx_mcp.parsers import market_watch_columns  # noqa: E402
+from psx_mcp.ratelimit import BACKGROUND, INTERACTIVE, request_priority  # noqa: E402
+
+INTRADAY_PAYLOAD = {
+    "status": 1,
+    "message": "",
+    "data": [[1759491302, 300.5, 800], [1759491300, 301.2, 1500]],
+}
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def slow_json_response(payload, delay=0.05):
+    """Build a mocked client.get that answers after a short delay"""
+
+    async def fake_get(url, **kwargs):
+        await asyncio.sleep(delay)
+        response = Mock()
+        response.json.return_value = payload
+        response.raise_for_status.return_value = None
+        return response
+
+    return fake_get
+
+
+class TestSingleFlight:
+    """Test coalescing of concurrent identical upstream fetches"""
+
+    @pytest.fixture
+    def psx_client(self):
+        """Create a PSXClient instance for testing, without series caching"""
+        return PSXClient(series_ttl=0, max_age=0)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_request(self, psx_client):
+        """Concurrent callers for the same URL trigger a single fetch"""
+        with patch.object(
+            psx_client.client, "get", side_effect=slow_json_response(INTRADAY_PAYLOAD)
+        ) as mock_get:
+            results = await asyncio.gather(
+                *(psx_client.get_intraday_data("HBL") for _ in range(5))
+            )
+
+            assert mock_get.call_count == 1
+            assert all(result is results[0] for result in results)
+            assert len(results[0]) == 2
+
+        await psx_client.close()
+
+    @pytest.mark.asyncio
+    async def test_different_urls_are_not_coalesced(self, psx_client):
+        """Each distinct URL gets its own request"""
+        with patch.object(
+            psx_client.client, "get", side_effect=slow_json_response(INTRADAY_PAYLOAD)
+        ) as mock_get:
+            await asyncio.gather(
+                psx_client.get_intraday_data("HBL"),
+                psx_client.get_intraday_data("OGDC"),
+                psx_client.get_eod_data("HBL"),
+            )
+
+            assert mock_get.call_count == 3
+
+        await psx_client.close()
+
+    @pytest.mark.asyncio
+    async def test_sequential_calls_fetch_again(self, psx_client):
+        """A finished flight is not reused by later callers"""
+        with patch.object(
+            psx_client.client, "get", side_effect=slow_json_response(INTRADAY_PAYLOAD)
+        ) as mock_get:
+            await psx_client.get_intraday_data("HBL")
+            await psx_client.get_intraday_data("HBL")
+
+            assert mock_get.call_count == 2
+            assert psx_client._inflight == {}
+
+        await psx_client.close()
+
+    @pytest.mark.asyncio
+    async def test_fresh_series_are_served_from_cache(self):
+        """Series younger than series_ttl are not fetched again"""
+        psx_client = PSXClient(series_ttl=60)
+        with patch.object(
+            psx_client.client, "get", side_effect=slow_json_response(INTRADAY_PAYLOAD)
+        ) as mock_get:
+            first = await psx_client.get_intraday_data("HBL")
+            second = await psx_client.get_intraday_data("HBL")
+
+            assert mock_get.call_count == 1
+            assert second is first
+
+        await psx_client.close()
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_waiter(self, psx_client):
+        """A failed shared fetch raises in every concurrent caller"""
+
+        async def failing_get(url, **kwargs):
+            await asyncio.sleep(0.01)
+            raise httpx.RequestError("Network error")
+
+        with patch.object(
+            psx_client.client, "get", side_effect=failing_get
+        ) as mock_get:
+            results = await asyncio.gather(
+                *(psx_client.get_eod_data("HBL") for _ in range(3)),
+                return_exceptions=True,
+            )
+
+            assert mock_get.call_count == 1
+            assert all("Failed to fetch EOD data for HBL" in str(r) for r in results)
+
+        await psx_client.close()
+
+
+class TestStaleWhileRevalidate:
+    """Test serving expired cache entries while they refresh in the background"""
+
+    @pytest.mark.asyncio
+    async def test_snapshot_is_served_while_revalidating(self):
+        """Past the soft TTL the old snapshot returns at once; one refresh runs"""
+        psx_client = PSXClient(snapshot_ttl=0, max_age=60)
+
+        async def scrape():
+            await asyncio.sleep(0.05)
+            return market_watch_columns([])
+
+        psx_client.get_market_watch_columns = AsyncMock(side_effect=scrape)
+        first = await psx_client.get_market_snapshot()
+        served = await asyncio.gather(
+            *(psx_client.get_market_snapshot() for _ in range(5))
+        )
+
+        assert all(snapshot is first for snapshot in served)
+        assert psx_client.get_market_watch_columns.await_count == 2
+        await asyncio.sleep(0.1)
+        assert psx_client._snapshot.version == first.version + 1
+        assert psx_client.get_market_watch_columns.await_count == 2
+        await psx_client.close()
+
+    @pytest.mark.asyncio
+    async def test_series_is_served_with_its_age(self):
+        """An expired series comes back with its age, refreshed at low priority"""
+        psx_client = PSXClient(series_ttl=0, max_age=60)
+        priorities = []
+        fetch = slow_json_response(INTRADAY_PAYLOAD, delay=0.02)
+
+        async def fake_get(url, **kwargs):
+            priorities.append(request_priority.get())
+            return await fetch(url, **kwargs)
+
+        with patch.object(psx_client.client, "get", side_effect=fake_get):
+            first = await psx_client.get_intraday_data("HBL")
+            with patch.object(tools, "psx_client", psx_client):
+                payload = json.loads(await tools.intraday("HBL"))
+            await asyncio.sleep(0.05)
+
+        assert first.age is None
+        assert payload["age"] >= 0
+        assert payload["stale"] is False
+        assert len(payload["data"]) == 2
+        assert priorities == [INTERACTIVE, BACKGROUND]
+        await psx_client.close()
+
+    @pytest.mark.asyncio
+    async def test_hard_expiry_waits_for_the_refresh(self):
+        """Past the hard TTL callers block on a fresh fetch"""
+        psx_client = PSXClient(series_ttl=0, max_age=0)
+        with patch.object(
+            psx_client.client, "get", side_effect=slow_json_response(INTRADAY_PAYLOAD)
+        ) as mock_get:
+            first = await psx_client.get_intraday_data("HBL")
+            second = await psx_client.get_intraday_data("HBL")
+
+            assert mock_get.call_count == 2
+            assert second is not first
+            assert second.age is None
+
+        await psx_client.close()
+
+
+class TestConnectionPool:
+    """Test HTTP client construction and connection prewarming"""
+
+    @pytest.mark.asyncio
+    async def test_http2_falls_back_without_h2(self):
+        """HTTP/2 is only enabled when the h2 package is importable"""
+        with patch("importlib.util.find_spec", return_value=None):
+            psx_client = PSXClient(http2=True)
+
+        assert psx_client.http2 is False
+        await psx_client.close()
+
+    @pytest.mark.asyncio
+    async def test_prewarm_sends_head_requests(self):
+        """Prewarming opens the requested number of connections to PSX"""
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200)
+
+        psx_client = PSXClient(base_url="https://psx.test")
+        await psx_client.client.aclose()
+        psx_client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        assert await psx_client.prewarm(3) == 3
+        assert [(r.method, r.url.host) for r in requests] == [("HEAD", "psx.test")] * 3
+        assert await psx_client.prewarm(0) == 0
+        await psx_client.close()
+
+    @pytest.mark.asyncio
+    async def test_prewarm_ignores_failures(self):
+        """Connection errors while prewarming are not raised"""
+
+        def handler(request):
+            raise httpx.ConnectError("unreachable")
+
+        psx_client = PSXClient(base_url="https://psx.test")
+        await psx_client.client.aclose()
+        psx_client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        assert await psx_client.prewarm(2) == 0
+        await psx_client.close()
+
+
+EOD_DATA = [[1759489200 - day * 86400, 300.0 + day, 1000, 299.0] for day in range(50)]
+
+
+class ConditionalHandler(BaseHTTPRequestHandler):
+    """Local PSX stand-in honouring validators and gzip like the real server"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        state = self.server.state
+        state["requests"].append(dict(self.headers))
+        if self.path == "/market-watch":
+            with open(os.path.join(FIXTURES, "market_watch.html"), "rb") as fh:
+                body = fh.read()
+            validator = ("Last-Modified", state["last_modified"])
+            matched = self.headers.get("If-Modified-Since") == validator[1]
+            content_type = "text/html; charset=utf-8"
+        else:
+            body = json.dumps({"status": 1, "message": "", "data": EOD_DATA}).encode()
+            validator = ("ETag", state["etag"])
+            matched = self.headers.get("If-None-Match") == validator[1]
+            content_type = "application/json"
+
+        if matched:
+            self.send_response(304)
+            self.send_header(*validator)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        compress = "gzip" in self.headers.get("Accept-Encoding", "")
+        if compress:
+            body = gzip.compress(body)
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header(*validator)
+        if compress:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def psx_server():
+    """Run the local stand-in server on a free port"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ConditionalHandler)
+    server.daemon_threads = True
+    server.state = {
+        "requests": [],
+        "etag": '"v1"',
+        "last_modified": "Fri, 03 Oct 2025 10:30:00 GMT",
+    }
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestConditionalRequests:
+    """Test ETag/Last-Modified revalidation and compressed transfer"""
+
+    @pytest.fixture
+    def psx_client(self, psx_server):
+        host, port = psx_server.server_address
+        return PSXClient(base_url=f"http://{host}:{port}", series_ttl=0, max_age=0)
+
+    @pytest.mark.asyncio
+    async def test_not_modified_reuses_parsed_series(self, psx_server, psx_client):
+        """A 304 returns the series parsed from the first response"""
+        first = await psx_client.get_eod_data("HBL")
+        second = await psx_client.get_eod_data("HBL")
+
+        requests = psx_server.state["requests"]
+        assert second is first
+        assert "If-None-Match" not in requests[0]
+        assert requests[1]["If-None-Match"] == '"v1"'
+        stats = psx_client.validators.stats()
+        assert stats["not_modified"] == 1
+        assert 0 < stats["bytes_saved"] < len(json.dumps(EOD_DATA))
+        await psx_client.close()
+
+    @pytest.mark.asyncio
+    async def test_changed_resource_is_fetched_again(self, psx_server, psx_client):
+        """A new ETag means a full response and a fresh parse"""
+        first = await psx_client.get_eod_data("HBL")
+        psx_server.state["etag"] = '"v2"'
+        second = await psx_client.get_eod_data("HBL")
+        third = await psx_client.get_eod_data("HBL")
+
+        assert second is not first
+        assert second.to_records() == first.to_records()
+        assert third is second
+        assert psx_client.validators.stats()["not_modified"] == 1
+        await psx_client.close()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("streaming", [True, False])
+    async def test_market_watch_last_modified(self, psx_server, streaming):
+        """Market watch is revalidated with If-Modified-Since in either mode"""
+        host, port = psx_server.server_address
+        psx_client = PSXClient(base_url=f"http://{host}:{port}", streaming=streaming)
+
+        first = await psx_client.get_market_watch_columns()
+        second = await psx_client.get_market_watch_columns()
+
+        assert second is first
+        assert len(first["symbol"]) == 10
+        assert psx_server.state["requests"][1]["If-Modified-Since"] == (
+            psx_server.state["last_modified"]
+        )
+        await psx_client.close()
+
+    @pytest.mark.asyncio
+    async def test_compressed_transfer(self, psx_server, psx_client):
+        """gzip is negotiated explicitly and decoded transparently"""
+        series = await psx_client.get_eod_data("HBL")
+
+        assert len(series) == len(EOD_DATA)
+        assert "gzip" in accept_encoding().split(", ")
+        assert psx_server.state["requests"][0]["Accept-Encoding"] == accept_encoding()
+        await psx_client.close()
+
+    @pytest.mark.asyncio
+    async def test_disabled_cache_sends_no_validators(self, psx_server):
+        """VALIDATOR_CACHE_SIZE = 0 turns conditional requests off"""
+        host, port = psx_server.server_address
+        with patch("psx_mcp.client.settings.VALIDATOR_CACHE_SIZE", 0):
+            psx_client = PSXClient(
+                base_url=f"http://{host}:{port}", series_ttl=0, max_age=0
+            )
+
+        first = await psx_client.get_eod_data("HBL")
+        second = await psx_client.get_eod_data("HBL")
+
+        assert second is not first
+        assert "If-None-Match" not in psx_server.state["requests"][1]
+        await psx_client.close()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for the memory-mapped columnar series format
+"""
+
+import pytest
+import mmap
+import sys
+import os
+from unittest.mock import patch
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from psx_mcp import columnar  # noqa: E402
+from psx_mcp.columnar import (  # noqa: E402
+    HEADER,
+    read_header,
+    read_series,
+    write_series,
+)
+from psx_mcp.timeseries import TimeSeries  # noqa: E402
+
+EOD_RAW = [
+    [1759662000, 299.50, 2154321, 303],
+    [1759575600, 302.15, 1987654, 301],
+    [1759489200, 300.87, 2024970, 305],
+]
+INTRADAY_RAW = [
+    [1759491300, 301.20, 1500],
+    [1759491302, 300.50, 800],
+]
+
+
+class TestColumnarFormat:
+    """Test writing and mapping columnar series files"""
+
+    def test_eod_round_trip(self, tmp_path):
+        """EOD series read back identically, with the refresh time"""
+        path = str(tmp_path / "HBL.psxc")
+        series = TimeSeries.from_raw(EOD_RAW, with_open=True)
+        write_series(path, series, refreshed_at=1759700000.5)
+
+        header = read_header(path)
+        mapped = read_series(path)
+
+        assert header.count == 3
+        assert header.refreshed_at == 1759700000.5
+        assert os.path.getsize(path) == HEADER.size + 4 * 3 * 8
+        assert mapped.descending
+        assert mapped.to_records() == series.to_records()
+
+    def test_intraday_round_trip(self, tmp_path):
+        """Series without open prices store three columns"""
+        path = str(tmp_path / "HBL.psxc")
+        series = TimeSeries.from_raw(INTRADAY_RAW, with_open=False)
+        write_series(path, series)
+
+        mapped = read_series(path)
+
+        assert mapped.opens is None
+        assert not mapped.descending
+        assert mapped.to_records() == series.to_records()
+
+    def test_slices_are_zero_copy_views_of_the_mapping(self, tmp_path):
+        """Columns and range slices point into the shared mapping"""
+        path = str(tmp_path / "HBL.psxc")
+        write_series(path, TimeSeries.from_raw(EOD_RAW, with_open=True))
+
+        mapped = read_series(path)
+        window = mapped.between(1759489200, 1759575600)
+
+        assert isinstance(window.prices.obj, mmap.mmap)
+        assert window.prices.obj is mapped.timestamps.obj
+        assert [point["timestamp"] for point in window] == [1759575600, 1759489200]
+
+    def test_copy_without_mapping(self, tmp_path):
+        """Without MAP_FILES the file is copied, so it can be replaced while read"""
+        path = str(tmp_path / "HBL.psxc")
+        series = TimeSeries.from_raw(EOD_RAW, with_open=True)
+        write_series(path, series)
+
+        with patch.object(columnar, "MAP_FILES", False):
+            copied = read_series(path)
+        write_series(path, series.between(1759575600, 1759662000))
+
+        assert isinstance(copied.prices.obj, bytes)
+        assert copied.to_records() == series.to_records()
+        assert len(read_series(path)) == 2
+
+    def test_missing_and_invalid_files(self, tmp_path):
+        """Missing files read as None, corrupt ones raise"""
+        assert read_series(str(tmp_path / "missing.psxc")) is None
+
+        bad = tmp_path / "bad.psxc"
+        bad.write_bytes(b"NOPE" + bytes(HEADER.size))
+        with pytest.raises(ValueError):
+            read_series(str(bad))
+
+        path = str(tmp_path / "HBL.psxc")
+        write_series(path, TimeSeries.from_raw(EOD_RAW, with_open=True))
+        with open(path, "r+b") as f:
+            f.truncate(HEADER.size + 8)
+        with pytest.raises(ValueError):
+            read_series(path)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Tests for the incremental intraday buffer
+"""
+
+import pytest
+import sys
+import os
+from unittest.mock import Mock, patch
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from psx_mcp.client import PSXClient  # noqa: E402
+from psx_mcp.intraday import IntradayBuffer  # noqa: E402
+from psx_mcp.timeseries import TimeSeries  # noqa: E402
+
+OPEN = 1759465800  # 2025-10-03 09:30 PKT
+NEXT_OPEN = OPEN + 3 * 86400  # Monday 2025-10-06
+
+
+def ticks(start, count, step=60):
+    """Raw PSX intraday points, newest first"""
+    return [
+        [start + i * step, 300.0 + i, 100 * (i + 1)] for i in reversed(range(count))
+    ]
+
+
+class TestIntradayBuffer:
+    """Test merging, growth, rollover and views"""
+
+    def test_merge_matches_full_conversion(self):
+        """A merged series reads like the same payload converted in one go"""
+        buffer = IntradayBuffer(8)
+        raw = ticks(OPEN, 5)
+
+        assert buffer.merge(raw) == 5
+        series = buffer.series()
+        assert series.to_records() == TimeSeries.from_raw(raw, False).to_records()
+        assert series[0]["timestamp"] == OPEN + 4 * 60  # newest first, like PSX
+
+    def test_only_newer_points_are_added(self):
+        """Overlapping refreshes append just the new points, once each"""
+        buffer = IntradayBuffer(8)
+        buffer.merge(ticks(OPEN, 3))
+        first = buffer.series()
+
+        assert buffer.merge(ticks(OPEN, 3)) == 0
+        assert buffer.merge(ticks(OPEN, 5) + [[OPEN + 4 * 60, 1.0, 1]]) == 2
+        assert len(buffer) == 5
+        assert buffer.last_timestamp == OPEN + 4 * 60
+        assert len(first) == 3  # earlier views are not affected
+
+    def test_growth_keeps_earlier_views(self):
+        """A full buffer moves to a larger allocation without touching views"""
+        buffer = IntradayBuffer(4, max_capacity=64)
+        buffer.merge(ticks(OPEN, 4))
+        before = buffer.series().to_records()
+        view = buffer.series()
+
+        buffer.merge(ticks(OPEN, 20))
+
+        assert len(buffer) == 20
+        assert view.to_records() == before
+        assert (
+            buffer.series().to_records()
+            == TimeSeries.from_raw(ticks(OPEN, 20), False).to_records()
+        )
+
+    def test_capacity_drops_oldest_points(self):
+        """At max_capacity the oldest points make way for new ones"""
+        buffer = IntradayBuffer(4, max_capacity=8)
+        for count in range(1, 30):
+            buffer.merge(ticks(OPEN, count))
+
+        timestamps = buffer.series().values("timestamp")
+        assert len(buffer) <= 8
+        assert timestamps[0] == OPEN + 28 * 60
+        assert timestamps == sorted(timestamps, reverse=True)
+
+    def test_session_rollover_resets(self):
+        """Points from the next session day replace the previous session"""
+        buffer = IntradayBuffer(8)
+        buffer.merge(ticks(OPEN, 4))
+        previous = buffer.series()
+
+        buffer.merge(ticks(NEXT_OPEN, 2) + ticks(OPEN, 4))
+
+        assert len(buffer) == 2
+        assert str(buffer.session) == "2025-10-06"
+        assert len(previous) == 4
+
+
+class TestClientBuffer:
+    """Test that PSXClient serves intraday data from the buffer"""
+
+    @pytest.mark.asyncio
+    async def test_refreshes_extend_one_buffer(self):
+        """Queries read zero-copy views of the buffer that refreshes extend"""
+        payloads = iter([ticks(OPEN, 3), ticks(OPEN, 6)])
+
+        async def fake_get(url, **kwargs):
+            response = Mock()
+            response.json.return_value = {
+                "status": 1,
+                "message": "",
+                "data": next(payloads),
+            }
+            response.raise_for_status.return_value = None
+            return response
+
+        psx_client = PSXClient(series_ttl=0, max_age=0)
+        with patch.object(psx_client.client, "get", side_effect=fake_get):
+            first = await psx_client.get_intraday_data("HBL")
+            second = await psx_client.get_intraday_data("HBL")
+
+        buffer = psx_client._intraday[f"{psx_client.base_url}/timeseries/int/HBL"]
+        window = second.between(OPEN + 60, OPEN + 180)
+        assert (len(first), len(second)) == (3, 6)
+        assert window.timestamps.obj is second.timestamps.obj
+        assert [p["timestamp"] for p in window] == [OPEN + 180, OPEN + 120, OPEN + 60]
+        assert second.nearest(OPEN + 100)["timestamp"] == OPEN + 120
+        assert buffer.series().to_records() == second.to_records()
+        await psx_client.close()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Tests for the multi_history bulk EOD tool
+"""
+
+import pytest
+import asyncio
+import json
+import sys
+import os
+from unittest.mock import AsyncMock, patch
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from psx_mcp.settings import settings  # noqa: E402
+from psx_mcp import tools  # noqa: E402
+from psx_mcp.client import PSXClient  # noqa: E402
+from psx_mcp.timeseries import TimeSeries  # noqa: E402
+
+DAY = 86400
+CLOSE = 1759489200  # 2025-10-03 15:00 PKT
+EOD_RAW = {
+    "HBL": [[CLOSE - day * DAY, 300.0 + day, 1000 + day, 299.0] for day in range(3)],
+    # UBL has no bar on 2025-10-02
+    "UBL": [[CLOSE, 210.0, 500, 209.0], [CLOSE - 2 * DAY, 212.0, 520, 211.0]],
+}
+
+
+async def fake_eod(symbol):
+    """EOD series by symbol; unknown symbols fail like PSXClient does"""
+    await asyncio.sleep(0.01)
+    if symbol not in EOD_RAW:
+        raise Exception(f"Failed to fetch EOD data for {symbol}: 404")
+    return TimeSeries.from_raw(EOD_RAW[symbol], with_open=True)
+
+
+@pytest.fixture
+def eod_client():
+    """PSXClient with a mocked get_eod_data"""
+    client = PSXClient()
+    client.get_eod_data = AsyncMock(side_effect=fake_eod)
+    return client
+
+
+class TestMultiHistory:
+    """Test the date-aligned multi-symbol history panel"""
+
+    @pytest.mark.asyncio
+    async def test_panel_is_aligned_by_date(self, eod_client):
+        """Rows are sorted by date and missing bars are null"""
+        with patch.object(tools, "psx_client", eod_client):
+            payload = json.loads(await tools.multi_history("hbl, UBL"))
+
+        assert payload["symbols"] == ["HBL", "UBL"]
+        assert payload["field"] == "price"
+        assert payload["data"] == [
+            {"date": "2025-10-01", "HBL": 302.0, "UBL": 212.0},
+            {"date": "2025-10-02", "HBL": 301.0, "UBL": None},
+            {"date": "2025-10-03", "HBL": 300.0, "UBL": 210.0},
+        ]
+        assert "errors" not in payload
+        await eod_client.close()
+
+    @pytest.mark.asyncio
+    async def test_errors_are_isolated(self, eod_client):
+        """A failing symbol is reported without failing the batch"""
+        with patch.object(tools, "psx_client", eod_client):
+            payload = json.loads(await tools.multi_history("HBL,XYZ", field="volume"))
+
+        assert payload["symbols"] == ["HBL"]
+        assert [row["HBL"] for row in payload["data"]] == [1002, 1001, 1000]
+        assert "404" in payload["errors"]["XYZ"]
+        await eod_client.close()
+
+    @pytest.mark.asyncio
+    async def test_date_range(self, eod_client):
+        """start_date and end_date bound the panel"""
+        with patch.object(tools, "psx_client", eod_client):
+            payload = json.loads(
+                await tools.multi_history("HBL,UBL", "2025-10-02", "2025-10-04")
+            )
+
+        assert [row["date"] for row in payload["data"]] == ["2025-10-02", "2025-10-03"]
+        await eod_client.close()
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self, eod_client):
+        """No more than MULTI_HISTORY_CONCURRENCY fetches run at once"""
+        running, peak = 0, 0
+
+        async def tracked_eod(symbol):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            try:
+                return await fake_eod("HBL")
+            finally:
+                running -= 1
+
+        eod_client.get_eod_data = AsyncMock(side_effect=tracked_eod)
+        symbols = ",".join(f"SYM{i}" for i in range(10))
+        with patch.object(tools, "psx_client", eod_client), patch.object(
+            settings, "MULTI_HISTORY_CONCURRENCY", 3
+        ):
+            payload = json.loads(await tools.multi_history(symbols))
+
+        assert len(payload["symbols"]) == 10
+        assert eod_client.get_eod_data.await_count == 10
+        assert peak == 3
+        await eod_client.close()
+
+    @pytest.mark.asyncio
+    async def test_unknown_field(self, eod_client):
+        """Only price, volume and open_price can be requested"""
+        with patch.object(tools, "psx_client", eod_client):
+            payload = json.loads(await tools.multi_history("HBL", field="timestamp"))
+
+        assert "Unknown field" in payload["error"]
+        await eod_client.close()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for tool output formats
+"""
+
+import pytest
+import json
+import sys
+import os
+from unittest.mock import AsyncMock, patch
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from psx_mcp import output, tools  # noqa: E402
+from psx_mcp.output import encode, records_to_columns, resolve_format  # noqa: E402
+from psx_mcp.timeseries import TimeSeries  # noqa: E402
+
+RECORDS = [
+    {"symbol": "HBL", "current_price": 285.6, "volume": 2024970},
+    {"symbol": "UBL", "current_price": 362.1, "volume": 1198000},
+]
+EOD_RAW = [
+    [1759575600, 302.15, 1987654, 301],
+    [1759489200, 300.87, 2024970, 305],
+]
+
+
+class TestEncode:
+    """Test the pretty, compact and columnar encoders"""
+
+    def test_formats_round_trip(self):
+        """Every format decodes back to the same data (columns for columnar)"""
+        data = {"snapshot_version": 3, "data": RECORDS}
+
+        pretty = encode(data, "pretty")
+        compact = encode(data, "compact")
+        columnar = encode(data, "columnar")
+
+        assert json.loads(pretty) == data
+        assert json.loads(compact) == data
+        assert "\n" in pretty and " " not in compact
+        assert json.loads(columnar) == {
+            "snapshot_version": 3,
+            "data": {
+                "symbol": ["HBL", "UBL"],
+                "current_price": [285.6, 362.1],
+                "volume": [2024970, 1198000],
+            },
+        }
+        assert len(columnar) < len(compact) < len(pretty)
+
+    def test_stdlib_fallback_matches(self):
+        """Without orjson the stdlib encoder gives equivalent output"""
+        formats = ("pretty", "compact", "columnar")
+        fast = {fmt: encode(RECORDS, fmt) for fmt in formats}
+
+        with patch.object(output, "orjson", None):
+            for fmt in formats:
+                assert encode(RECORDS, fmt) == fast[fmt]
+
+    def test_records_to_columns_fills_missing_keys(self):
+        """Keys missing from some records become None"""
+        columns = records_to_columns([{"a": 1}, {"a": 2, "b": 3}])
+
+        assert columns == {"a": [1, 2], "b": [None, 3]}
+
+    def test_format_resolution(self):
+        """The default comes from settings and unknown formats raise"""
+        assert resolve_format(None) == "compact"
+        assert resolve_format("PRETTY") == "pretty"
+        with pytest.raises(ValueError):
+            resolve_format("xml")
+
+
+class TestToolOutput:
+    """Test output formats through the tools"""
+
+    @pytest.mark.asyncio
+    async def test_history_columnar(self):
+        """Time series tools emit columns straight from the series"""
+        series = TimeSeries.from_raw(EOD_RAW, with_open=True)
+        client = AsyncMock()
+        client.get_eod_data.return_value = series
+
+        with patch.object(tools, "psx_client", client):
+            columnar = json.loads(await tools.history("HBL", output_format="columnar"))
+            records = json.loads(await tools.history("HBL"))
+
+        assert columnar["data"] == series.to_columns()
+        assert columnar["data"]["timestamp"] == [1759575600, 1759489200]
+        assert records == {"data": series.to_records(), "stale": False, "age": None}
+
+    @pytest.mark.asyncio
+    async def test_unknown_format_is_an_error(self):
+        """An invalid output format is reported like any other error"""
+        client = AsyncMock()
+        client.get_eod_data.return_value = TimeSeries.from_raw(EOD_RAW, True)
+
+        with patch.object(tools, "psx_client", client):
+            result = json.loads(await tools.history("HBL", output_format="xml"))
+
+        assert "Unknown output format" in result["error"]
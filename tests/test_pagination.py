@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Tests for cursor pagination of tool results
+"""
+
+import pytest
+import json
+import sys
+import os
+from unittest.mock import AsyncMock, patch
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from psx_mcp import tools  # noqa: E402
+from psx_mcp.client import PSXClient  # noqa: E402
+from psx_mcp.pagination import (  # noqa: E402
+    Cursor,
+    decode_cursor,
+    encode_cursor,
+    page_bounds,
+)
+from psx_mcp.snapshot import MarketSnapshot  # noqa: E402
+from psx_mcp.timeseries import TimeSeries  # noqa: E402
+
+MARKET_ROWS = [
+    {
+        "symbol": f"SYM{i}",
+        "sector": "Commercial Banks" if i % 2 else "Cement",
+        "current_price": 100.0 + i,
+        "change_percent": float(i),
+        "volume": 1000 * i,
+    }
+    for i in range(7)
+]
+EOD_RAW = [[1759489200 - day * 86400, 300.0 + day, 1000, 299.0] for day in range(9)]
+
+
+@pytest.fixture
+def paged_client():
+    """PSXClient with mocked market watch and EOD fetches"""
+    client = PSXClient(snapshot_ttl=0, max_age=0)
+    client.get_market_watch_columns = AsyncMock(
+        return_value=MarketSnapshot.from_rows(MARKET_ROWS, version=0).columns
+    )
+    client.get_eod_data = AsyncMock(
+        side_effect=lambda symbol: TimeSeries.from_raw(EOD_RAW, with_open=True)
+    )
+    return client
+
+
+async def collect(tool, limit, **kwargs):
+    """Call a paginated tool until the last page, returning every payload"""
+    pages = [json.loads(await tool(limit=limit, **kwargs))]
+    while pages[-1]["next_cursor"]:
+        cursor = pages[-1]["next_cursor"]
+        pages.append(json.loads(await tool(limit=limit, cursor=cursor, **kwargs)))
+    return pages
+
+
+class TestCursors:
+    """Test cursor encoding and page arithmetic"""
+
+    def test_round_trip(self):
+        """Cursors decode back for the request they were issued for"""
+        token = encode_cursor(Cursor("history:HBL", 3, 200))
+
+        assert decode_cursor(token, "history:HBL") == Cursor("history:HBL", 3, 200)
+        with pytest.raises(ValueError, match="does not belong"):
+            decode_cursor(token, "history:UBL")
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            decode_cursor("not-a-cursor", "history:HBL")
+
+    def test_page_bounds(self):
+        """Pages stop at the end and report the next offset"""
+        assert page_bounds(10, 0, 4) == (0, 4, 4)
+        assert page_bounds(10, 8, 4) == (8, 10, None)
+        assert page_bounds(10, 12, 4) == (10, 10, None)
+        assert page_bounds(10, 3, None) == (3, 10, None)
+        with pytest.raises(ValueError):
+            page_bounds(10, 0, 0)
+
+
+class TestSnapshotPagination:
+    """Test paging through snapshot tools"""
+
+    @pytest.mark.asyncio
+    async def test_market_data_pages_stay_on_one_snapshot(self, paged_client):
+        """Later pages read the pinned snapshot even after a refresh"""
+        with patch.object(tools, "psx_client", paged_client):
+            pages = [json.loads(await tools.market_data(limit=3))]
+            await paged_client.get_market_snapshot()  # TTL 0: refreshes
+            while pages[-1]["next_cursor"]:
+                cursor = pages[-1]["next_cursor"]
+                pages.append(json.loads(await tools.market_data(3, cursor)))
+
+        assert [len(page["data"]) for page in pages] == [3, 3, 1]
+        assert {page["snapshot_version"] for page in pages} == {1}
+        assert [row["symbol"] for page in pages for row in page["data"]] == [
+            row["symbol"] for row in MARKET_ROWS
+        ]
+        assert paged_client.get_market_watch_columns.await_count == 2
+        await paged_client.close()
+
+    @pytest.mark.asyncio
+    async def test_sector_pages(self, paged_client):
+        """Sector results page in snapshot order"""
+        with patch.object(tools, "psx_client", paged_client):
+            pages = await collect(tools.sector, 2, sector="banks")
+
+        assert [len(page["data"]) for page in pages] == [2, 1]
+        assert [row["symbol"] for page in pages for row in page["data"]] == [
+            "SYM1",
+            "SYM3",
+            "SYM5",
+        ]
+        await paged_client.close()
+
+    @pytest.mark.asyncio
+    async def test_unpaginated_output_is_unchanged(self, paged_client):
+        """Without limit or cursor there is no next_cursor key"""
+        with patch.object(tools, "psx_client", paged_client):
+            payload = json.loads(await tools.market_data())
+
+        assert "next_cursor" not in payload
+        assert len(payload["data"]) == len(MARKET_ROWS)
+        await paged_client.close()
+
+    @pytest.mark.asyncio
+    async def test_expired_snapshot_cursor(self, paged_client):
+        """Cursors for snapshots no longer retained report an error"""
+        token = encode_cursor(Cursor("market_data", 99, 3))
+        with patch.object(tools, "psx_client", paged_client):
+            payload = json.loads(await tools.market_data(limit=3, cursor=token))
+
+        assert "Cursor expired" in payload["error"]
+        await paged_client.close()
+
+
+class TestSeriesPagination:
+    """Test paging through time series tools"""
+
+    @pytest.mark.asyncio
+    async def test_history_pages_fetch_once(self, paged_client):
+        """Every page is cut from the series pinned by the first page"""
+        expected = TimeSeries.from_raw(EOD_RAW, with_open=True).to_records()
+        with patch.object(tools, "psx_client", paged_client):
+            pages = await collect(tools.history, 4, symbol="HBL")
+
+        assert [len(page["data"]) for page in pages] == [4, 4, 1]
+        assert [point for page in pages for point in page["data"]] == expected
+        assert paged_client.get_eod_data.await_count == 1
+        await paged_client.close()
+
+    @pytest.mark.asyncio
+    async def test_date_range_pages(self, paged_client):
+        """Range results page over the range only"""
+        with patch.object(tools, "psx_client", paged_client):
+            unpaged = json.loads(
+                await tools.date_range("HBL", "2025-09-25", "2025-10-02")
+            )
+            pages = await collect(
+                tools.date_range,
+                3,
+                symbol="HBL",
+                start_date="2025-09-25",
+                end_date="2025-10-02",
+            )
+
+        assert [point for page in pages for point in page["data"]] == unpaged["data"]
+        assert len(pages) > 1
+        await paged_client.close()
+
+    def test_series_page_views(self):
+        """TimeSeries.page slices in source order for either orientation"""
+        newest_first = TimeSeries.from_raw(EOD_RAW, with_open=True)
+        oldest_first = TimeSeries.from_raw(EOD_RAW[::-1], with_open=True)
+
+        for series in (newest_first, oldest_first):
+            records = series.to_records()
+            assert series.page(2, 5).to_records() == records[2:5]
+            assert series.page(7, 20).to_records() == records[7:]
+            assert len(series.page(20, 30)) == 0
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Tests for the market watch HTML parser backends
+"""
+
+import pytest
+import re
+import sys
+import os
+from unittest.mock import Mock, patch
+import httpx
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from psx_mcp.client import PSXClient  # noqa: E402
+from psx_mcp.parsers import (  # noqa: E402
+    MarketWatchTokenizer,
+    parse_float_column,
+    parse_int_column,
+    parse_market_watch,
+    parse_market_watch_bs4,
+    parse_market_watch_fast,
+)
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def parse_float_cell(text):
+    """Per-cell float parsing the market watch scraper used before columns"""
+    if not text or text == "-":
+        return 0.0
+    try:
+        return float(re.sub(r"[^\d.-]", "", text))
+    except ValueError:
+        return 0.0
+
+
+def parse_int_cell(text):
+    """Per-cell integer parsing the market watch scraper used before columns"""
+    if not text or text == "-":
+        return 0
+    try:
+        return int(re.sub(r"[^\d]", "", text))
+    except ValueError:
+        return 0
+
+
+def load_fixture(name):
+    """Read a recorded HTML fixture"""
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as fh:
+        return fh.read()
+
+
+class TestParserBackends:
+    """Test that the fast tokenizer matches the BeautifulSoup reference"""
+
+    def test_backends_agree_on_fixture(self):
+        """Both backends produce identical rows on the recorded page"""
+        html = load_fixture("market_watch.html")
+        rows = parse_market_watch_bs4(html)
+
+        assert len(rows) == 11
+        assert parse_market_watch_fast(html) == rows
+        assert rows[2][1] == "OIL & GAS EXPLORATION COMPANIES"
+
+    @pytest.mark.parametrize("chunk_size", [1, 13, 512, 4096])
+    def test_incremental_feeding(self, chunk_size):
+        """Feeding the page in chunks yields the same rows"""
+        html = load_fixture("market_watch.html")
+        tokenizer = MarketWatchTokenizer()
+        rows = []
+        for start in range(0, len(html), chunk_size):
+            rows.extend(tokenizer.feed(html[start : start + chunk_size]))
+        rows.extend(tokenizer.close())
+
+        assert rows == parse_market_watch_bs4(html)
+
+    def test_markup_before_table_is_not_buffered(self):
+        """Scanned page header markup is dropped while waiting for the table"""
+        tokenizer = MarketWatchTokenizer()
+        for _ in range(1000):
+            assert tokenizer.feed("<div><!-- nav --><script>s = 1</script></div>") == []
+        assert len(tokenizer._buffer) < len("<script")
+
+        tokenizer.feed("<scr")
+        tokenizer.feed("ipt>'<table id=marketWatchTable>'</script><table id=")
+        rows = tokenizer.feed(
+            '"marketWatchTable"><tr><th>H</th></tr><tr><td>1</td></tr>'
+        )
+        assert rows == [["1"]]
+        assert tokenizer._buffer == ""
+
+    @pytest.mark.parametrize(
+        "html, modelled",
+        [
+            (
+                "<table><tr><th>H</th></tr>"
+                "<tr><td> a &amp; <b>b</b> </td></tr></table>",
+                True,
+            ),
+            ("<TABLE id=marketWatchTable><TR><TH>H</TH><TR><TD>1,2</TD></TABLE>", True),
+            (
+                '<table id="x"><tr><td>no</td></tr></table>'
+                '<table id="marketWatchTable"><tr><td>h</td></tr>'
+                "<tr><td>yes<!-- hidden --></td></tr></table>",
+                True,
+            ),
+            (
+                '<table><tr><th>H</th></tr><tr><td data-x="a>b">v</td></tr></table>',
+                True,
+            ),
+            (
+                "<table><tr><th>H</th></tr><tr><td>x <!-- <td>c</td> --> y</td></tr>"
+                "<!-- <tr><td>hidden</td></tr> --></table>",
+                True,
+            ),
+            (
+                "<table><tr><th>H</th></tr><tr><td>a<script>if (a<b) s = '</td>'"
+                "</script>z</td><td>q<style>p<b{}</style></td></tr></table>",
+                True,
+            ),
+            (
+                "<script>s = '<table id=marketWatchTable><tr><td>x</td></tr>'</script>"
+                "<table><tr><th>H</th></tr><tr><td>ok</td></tr></table>",
+                True,
+            ),
+            (
+                "<table><tr><th>H</th></tr><tr><td>a<table><tr><td>n</td></tr>"
+                "</table></td></tr><tr><td>after</td></tr></table>",
+                False,
+            ),
+            ("<table><tr><th>H</th></tr><tr><td>1<td>2</tr></table>", False),
+            ("<table><tr><th>H</th></tr><tr><td>1</td><tr><td>2</td></table>", False),
+            ("<table><tr><th>H</th></tr><tr><td>x<!-- unterminated", False),
+        ],
+    )
+    def test_backends_agree_on_edge_cases(self, html, modelled):
+        """Entities, comments, raw text and nesting match or fall back to bs4"""
+        expected = parse_market_watch_bs4(html)
+        if modelled:
+            assert parse_market_watch_fast(html) == expected
+        else:
+            with pytest.raises(ValueError, match="Unsupported"):
+                parse_market_watch_fast(html)
+        assert parse_market_watch(html, "fast") == expected
+
+    def test_missing_table(self):
+        """Both backends reject a page without a table"""
+        for parser in (parse_market_watch_fast, parse_market_watch_bs4):
+            with pytest.raises(ValueError, match="table not found"):
+                parser("<p>maintenance</p>")
+
+    def test_fallback_to_bs4(self):
+        """A failing fast backend falls back to BeautifulSoup"""
+        html = load_fixture("market_watch.html")
+        with patch.dict(
+            "psx_mcp.parsers.PARSERS", {"fast": Mock(side_effect=RuntimeError)}
+        ):
+            assert parse_market_watch(html, "fast") == parse_market_watch_bs4(html)
+
+
+CELL_VALUES = [
+    "1,285.60",
+    "-9.30",
+    "-2.64%",
+    "2,024,970",
+    "-",
+    "",
+    "--",
+    "0.00",
+    "1.2.3",
+    "Rs. 42",
+    "12\n34",
+    "N/A",
+    "7",
+]
+
+
+class TestColumnParsing:
+    """Test batch numeric column parsing against the per-cell parsers"""
+
+    def test_float_column_matches_per_cell(self):
+        """parse_float_column keeps the per-cell float semantics"""
+        reference = parse_float_cell
+        column = parse_float_column(CELL_VALUES)
+
+        assert column.typecode == "d"
+        assert list(column) == [reference(value) for value in CELL_VALUES]
+
+    def test_int_column_matches_per_cell(self):
+        """parse_int_column keeps the per-cell integer semantics"""
+        reference = parse_int_cell
+        column = parse_int_column(CELL_VALUES)
+
+        assert column.typecode == "q"
+        assert list(column) == [reference(value) for value in CELL_VALUES]
+
+    def test_clean_columns_take_fast_path(self):
+        """Well-formed columns and empty columns convert directly"""
+        assert list(parse_float_column(["1,000.5", "-", "2"])) == [1000.5, 0.0, 2.0]
+        assert list(parse_int_column(["1,000", "", "2"])) == [1000, 0, 2]
+        assert len(parse_float_column([])) == 0
+
+
+class ChunkedStream(httpx.AsyncByteStream):
+    """Response body delivered in small chunks, like a slow network"""
+
+    def __init__(self, body: bytes, chunk_size: int = 1024):
+        self.body = body
+        self.chunk_size = chunk_size
+        self.chunks_sent = 0
+
+    async def __aiter__(self):
+        for start in range(0, len(self.body), self.chunk_size):
+            self.chunks_sent += 1
+            yield self.body[start : start + self.chunk_size]
+
+
+def fixture_client(backend="fast", streaming=True, stream=None):
+    """PSXClient whose transport serves the recorded market watch page"""
+    body = load_fixture("market_watch.html").encode("utf-8")
+
+    def handler(request):
+        headers = {"Content-Type": "text/html; charset=utf-8"}
+        return httpx.Response(
+            200, headers=headers, stream=stream or ChunkedStream(body)
+        )
+
+    psx_client = PSXClient(html_parser=backend, streaming=streaming)
+    psx_client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return psx_client
+
+
+class TestClientParsing:
+    """Test market watch parsing through PSXClient"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "backend,streaming", [("fast", True), ("fast", False), ("bs4", False)]
+    )
+    async def test_market_watch_from_fixture(self, backend, streaming):
+        """Every backend and mode yields the same stock rows"""
+        psx_client = fixture_client(backend, streaming)
+        result = await psx_client.get_market_watch_data()
+
+        assert len(result) == 10
+        assert result[0]["symbol"] == "HBL"
+        assert result[0]["volume"] == 2024970
+        assert result[6]["open_price"] == 0.0
+        assert result[7]["ldcp"] == 1285.6
+        assert result[1]["change_percent"] == -2.64
+        await psx_client.close()
+
+    @pytest.mark.asyncio
+    async def test_streaming_consumes_body_in_chunks(self):
+        """The streaming path parses the body chunk by chunk"""
+        body = load_fixture("market_watch.html").encode("utf-8")
+        stream = ChunkedStream(body, chunk_size=97)
+        streaming_client = fixture_client(stream=stream)
+        buffered_client = fixture_client(streaming=False)
+
+        streamed = await streaming_client.get_market_watch_data()
+        buffered = await buffered_client.get_market_watch_data()
+
+        assert stream.chunks_sent == -(-len(body) // 97)
+        assert streamed == buffered
+        await streaming_client.close()
+        await buffered_client.close()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("chunk_size", [64, 1 << 20])
+    async def test_streaming_falls_back_to_bs4(self, chunk_size):
+        """Markup the tokenizer cannot model is parsed from the whole page"""
+        html = load_fixture("market_watch.html").replace(
+            ">COMMERCIAL BANKS</td>", ">BANKS<table><tr><td>!</td></tr></table></td>", 1
+        )
+        body = html.encode("utf-8")
+        stream = ChunkedStream(body, chunk_size=chunk_size)
+        psx_client = fixture_client(stream=stream)
+
+        result = await psx_client.get_market_watch_data()
+
+        assert stream.chunks_sent == -(-len(body) // chunk_size)
+        assert [row["symbol"] for row in result] == [
+            cells[0] for cells in parse_market_watch_bs4(html) if len(cells) >= 9
+        ]
+        assert result[0]["sector"] == "BANKS!"
+        await psx_client.close()
@@ -15,7 +15,7 @@ import httpx
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
 
 from psx_mcp.client import PSXClient  # noqa: E402
-from psx_mcp.models import StockData, TimeSeriesData  # noqa: E402
+from psx_mcp.models import StockData, TimeSeriesData, select_fields  # noqa: E402
 from psx_mcp.server import mcp  # noqa: E402
 
 
@@ -87,7 +87,8 @@ class TestPSXClient:
     @pytest.mark.asyncio
     async def test_market_watch_data_failure(self, psx_client):
         """Test market watch data retrieval failure"""
-        with patch.object(psx_client.client, "get") as mock_get:
+        # Market watch may be streamed, so fail the request at the send level
+        with patch.object(psx_client.client, "send") as mock_get:
             mock_get.side_effect = httpx.RequestError("Network error")
 
             with pytest.raises(Exception) as exc_info:
@@ -416,6 +417,17 @@ class TestDataModels:
         assert eod.volume == 2024970
         assert eod.open_price == 305.0
 
+    def test_select_fields(self):
+        """Test field lists are validated against a model"""
+        assert select_fields(None, StockData) is None
+        assert select_fields("", TimeSeriesData) is None
+        assert select_fields(" symbol, change_percent,symbol", StockData) == (
+            "symbol",
+            "change_percent",
+        )
+        with pytest.raises(ValueError, match="Unknown TimeSeriesData field"):
+            select_fields("timestamp,close", TimeSeriesData)
+
 
 class TestIntegration:
     """Integration tests with actual PSX API"""
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Tests for the token-bucket rate limiter
+"""
+
+import pytest
+import asyncio
+import sys
+import os
+import httpx
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from psx_mcp.settings import settings  # noqa: E402
+from psx_mcp.client import PSXClient  # noqa: E402
+from psx_mcp.ratelimit import (  # noqa: E402
+    BACKGROUND,
+    INTERACTIVE,
+    RateLimiter,
+    RateLimitTimeout,
+    background_priority,
+    shared_priority,
+)
+
+
+class TestRateLimiter:
+    """Test token refill, priorities and bounded waiting"""
+
+    def test_from_settings(self):
+        """The refill rate follows MAX_REQUESTS_PER_MINUTE per window"""
+        limiter = RateLimiter.from_settings(settings)
+
+        assert limiter.rate == pytest.approx(
+            settings.MAX_REQUESTS_PER_MINUTE / settings.RATE_LIMIT_WINDOW
+        )
+        assert limiter.burst == settings.RATE_LIMIT_BURST
+        with pytest.raises(ValueError):
+            RateLimiter(rate=0, burst=1)
+
+    @pytest.mark.asyncio
+    async def test_burst_then_throttle(self):
+        """Requests beyond the burst queue until tokens refill"""
+        limiter = RateLimiter(rate=50, burst=2)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        waits = await asyncio.gather(*(limiter.acquire() for _ in range(4)))
+
+        assert waits[:2] == [0.0, 0.0]
+        assert loop.time() - start >= 0.035
+        stats = limiter.stats()
+        assert stats["requests"] == 4
+        assert stats["queued"] == 2
+        assert stats["max_wait"] >= 0.035
+        assert stats["queue_depth"] == {"interactive": 0, "background": 0}
+
+    @pytest.mark.asyncio
+    async def test_interactive_requests_go_first(self):
+        """A queued interactive request overtakes queued background work"""
+        limiter = RateLimiter(rate=20, burst=1)
+        await limiter.acquire()
+        order = []
+
+        async def request(name, priority):
+            await limiter.acquire(priority)
+            order.append(name)
+
+        background = asyncio.ensure_future(request("background", BACKGROUND))
+        await asyncio.sleep(0)
+        interactive = asyncio.ensure_future(request("interactive", INTERACTIVE))
+        await asyncio.sleep(0)
+
+        assert limiter.stats()["queue_depth"] == {"interactive": 1, "background": 1}
+        await asyncio.gather(background, interactive)
+        assert order == ["interactive", "background"]
+
+    @pytest.mark.asyncio
+    async def test_wait_is_bounded(self):
+        """A request that cannot get a slot in time raises instead of hanging"""
+        limiter = RateLimiter(rate=1, burst=1, max_wait=0.05)
+        await limiter.acquire()
+
+        with pytest.raises(RateLimitTimeout):
+            await limiter.acquire()
+
+        assert limiter.stats()["timeouts"] == 1
+        assert limiter.queue_depth() == 0
+
+    @pytest.mark.asyncio
+    async def test_background_priority_context(self):
+        """Requests inside background_priority() queue as background"""
+        limiter = RateLimiter(rate=20, burst=1)
+        await limiter.acquire()
+
+        with background_priority():
+            waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+
+        assert limiter.stats()["queue_depth"]["background"] == 1
+        await waiter
+
+    @pytest.mark.asyncio
+    async def test_promoted_shared_work_goes_first(self):
+        """Promoting shared work moves its queued request ahead"""
+        limiter = RateLimiter(rate=20, burst=1)
+        await limiter.acquire()
+        order = []
+
+        async def request(name):
+            await limiter.acquire()
+            order.append(name)
+
+        with background_priority():
+            other = asyncio.ensure_future(request("other"))
+            await asyncio.sleep(0)
+            with shared_priority() as priority:
+                shared = asyncio.ensure_future(request("shared"))
+            await asyncio.sleep(0)
+
+        limiter.promote(priority, INTERACTIVE)
+
+        assert limiter.stats()["queue_depth"] == {"interactive": 1, "background": 1}
+        await asyncio.gather(other, shared)
+        assert order == ["shared", "other"]
+        assert limiter.queue_depth() == 0
+
+
+class TestClientRateLimit:
+    """Test that PSXClient sends every request through its limiter"""
+
+    @pytest.mark.asyncio
+    async def test_every_request_takes_a_token(self):
+        """Market watch, intraday, EOD and prewarm requests are all limited"""
+
+        def handler(request):
+            if request.url.path == "/market-watch":
+                return httpx.Response(200, text="<table><tbody></tbody></table>")
+            return httpx.Response(200, json={"status": 1, "message": "", "data": []})
+
+        limiter = RateLimiter(rate=1000, burst=100)
+        psx_client = PSXClient(base_url="https://psx.test", rate_limiter=limiter)
+        await psx_client.client.aclose()
+        psx_client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        await psx_client.get_market_watch_columns()
+        await psx_client.get_intraday_data("HBL")
+        await psx_client.get_eod_data("HBL")
+        await psx_client.prewarm(2)
+
+        assert limiter.stats()["requests"] == 5
+        await psx_client.close()
+
+    @pytest.mark.asyncio
+    async def test_joining_background_fetch_raises_its_priority(self):
+        """A tool call sharing a background refresh does not wait as background"""
+
+        def handler(request):
+            return httpx.Response(200, text="<table><tbody></tbody></table>")
+
+        limiter = RateLimiter(rate=20, burst=1)
+        psx_client = PSXClient(base_url="https://psx.test", rate_limiter=limiter)
+        await psx_client.client.aclose()
+        psx_client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        await limiter.acquire()
+
+        with background_priority():
+            refresh = asyncio.ensure_future(psx_client.refresh_market_snapshot())
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert limiter.stats()["queue_depth"] == {"interactive": 0, "background": 1}
+
+        tool_call = asyncio.ensure_future(psx_client.refresh_market_snapshot())
+        await asyncio.sleep(0)
+        assert limiter.stats()["queue_depth"] == {"interactive": 1, "background": 0}
+
+        assert await tool_call is await refresh
+        assert limiter.stats()["requests"] == 2
+        await psx_client.close()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Tests for the market-hours-aware background refresher
+"""
+
+import pytest
+import asyncio
+import sys
+import os
+from datetime import datetime
+from unittest.mock import AsyncMock, Mock, patch
+import httpx
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from psx_mcp.client import PSXClient  # noqa: E402
+from psx_mcp.market_hours import PKT  # noqa: E402
+from psx_mcp.ratelimit import BACKGROUND, request_priority  # noqa: E402
+from psx_mcp.refresher import BackgroundRefresher, parse_watchlist  # noqa: E402
+
+TRADING = datetime(2025, 10, 8, 11, 0, tzinfo=PKT)  # Wednesday session
+CLOSED = datetime(2025, 10, 8, 18, 0, tzinfo=PKT)  # Wednesday evening
+SERIES_PAYLOAD = {"status": 1, "message": "", "data": [[1759491300, 301.2, 1500]]}
+
+
+def mock_client():
+    """Client double recording the priority each refresh ran at"""
+    client = Mock()
+    client.priorities = []
+
+    async def record(*args):
+        client.priorities.append(request_priority.get())
+
+    client.refresh_market_snapshot = AsyncMock(side_effect=record)
+    client.refresh_intraday_data = AsyncMock(side_effect=record)
+    client.refresh_eod_data = AsyncMock(side_effect=record)
+    return client
+
+
+class TestBackgroundRefresher:
+    """Test refresh cadence, watchlist prefetch and task lifecycle"""
+
+    def test_parse_watchlist(self):
+        """Symbols are upper-cased, stripped and deduplicated"""
+        assert parse_watchlist(" hbl,UBL,,hbl ") == ("HBL", "UBL")
+        assert parse_watchlist("") == ()
+
+    def test_next_delay_follows_the_session(self):
+        """Frequent refreshes while trading, rare ones (until the open) otherwise"""
+        refresher = BackgroundRefresher(
+            mock_client(), open_interval=10, closed_interval=900
+        )
+
+        assert refresher.next_delay(TRADING) == 10
+        assert refresher.next_delay(CLOSED) == 900
+        before_open = datetime(2025, 10, 9, 9, 25, tzinfo=PKT)
+        assert refresher.next_delay(before_open) == 300
+
+    @pytest.mark.asyncio
+    async def test_watchlist_is_prefetched_when_due(self):
+        """Every cycle refreshes the snapshot; the watchlist only when due"""
+        client = mock_client()
+        refresher = BackgroundRefresher(
+            client, watchlist=("HBL", "UBL"), watchlist_interval=60
+        )
+
+        await refresher.refresh_once(TRADING)
+        await refresher.refresh_once(TRADING)
+
+        assert client.refresh_market_snapshot.await_count == 2
+        assert client.refresh_intraday_data.await_count == 2
+        assert client.refresh_eod_data.await_count == 2
+        assert refresher.cycles == 2
+
+    @pytest.mark.asyncio
+    async def test_watchlist_is_refreshed_within_max_age_when_closed(self):
+        """Closed-hours cycles keep watchlist series younger than their max age"""
+        client = mock_client()
+        refresher = BackgroundRefresher(
+            client, watchlist=("HBL",), closed_interval=900, watchlist_max_age=300
+        )
+        assert refresher.next_delay(CLOSED) == 300
+
+        with patch("psx_mcp.refresher.time") as clock:
+            for elapsed in (0, 300, 600, 900):
+                clock.monotonic.return_value = elapsed
+                await refresher.refresh_once(CLOSED)
+
+        assert client.refresh_intraday_data.await_count == 4
+        assert client.refresh_market_snapshot.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_failures_do_not_stop_the_cycle(self):
+        """A failing snapshot or symbol is logged and the rest still runs"""
+        client = mock_client()
+        client.refresh_market_snapshot.side_effect = Exception("PSX down")
+        client.refresh_intraday_data.side_effect = Exception("PSX down")
+        refresher = BackgroundRefresher(client, watchlist=("HBL",))
+
+        await refresher.refresh_once(TRADING)
+
+        assert client.refresh_eod_data.await_count == 1
+        assert refresher.cycles == 1
+
+    @pytest.mark.asyncio
+    async def test_runs_at_background_priority(self):
+        """The refresh task runs behind interactive requests until stopped"""
+        client = mock_client()
+        refresher = BackgroundRefresher(client, watchlist=("HBL",))
+
+        with patch.object(refresher, "next_delay", return_value=0.01):
+            task = refresher.start()
+            await asyncio.sleep(0.05)
+            await refresher.stop()
+
+        assert task.cancelled()
+        assert refresher.cycles >= 2
+        assert set(client.priorities) == {BACKGROUND}
+        assert request_priority.get() != BACKGROUND
+
+    @pytest.mark.asyncio
+    async def test_prefetch_warms_the_client_cache(self):
+        """Tool calls after a prefetch are served without contacting PSX"""
+        requests = []
+
+        def handler(request):
+            requests.append(request.url.path)
+            return httpx.Response(200, json=SERIES_PAYLOAD)
+
+        psx_client = PSXClient(base_url="https://psx.test", series_ttl=60)
+        await psx_client.client.aclose()
+        psx_client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        refresher = BackgroundRefresher(psx_client, watchlist=("HBL",))
+
+        await refresher.prefetch_watchlist()
+        prefetched = len(requests)
+        await psx_client.get_intraday_data("HBL")
+        await psx_client.get_eod_data("HBL")
+
+        assert prefetched == 2
+        assert len(requests) == prefetched
+        await psx_client.close()
+
+
+class TestServerLifespan:
+    """Test that the MCP server starts and stops the background work"""
+
+    @pytest.mark.asyncio
+    async def test_lifespan_starts_and_stops_refresher(self):
+        """Connecting prewarms and starts the refresher; disconnecting stops it"""
+        from fastmcp import Client
+        from psx_mcp import server
+
+        with patch.object(
+            server.psx_client, "prewarm", AsyncMock(return_value=0)
+        ) as prewarm, patch.object(
+            server.psx_client, "close", AsyncMock()
+        ) as close, patch.object(
+            BackgroundRefresher, "start"
+        ) as start, patch.object(
+            BackgroundRefresher, "stop", AsyncMock()
+        ) as stop:
+            async with Client(server.mcp) as client:
+                tools = await client.list_tools()
+                assert start.call_count == 1
+                assert stop.await_count == 0
+
+        assert "multi_history" in {tool.name for tool in tools}
+        assert prewarm.call_count == 1
+        assert stop.await_count == 1
+        assert close.await_count == 0  # shared by later sessions
+
+    @pytest.mark.asyncio
+    async def test_sessions_share_client_without_waiting_for_prewarm(self):
+        """A slow prewarm does not delay startup, and a second session still works"""
+        from fastmcp import Client
+        from psx_mcp import server
+
+        cancelled = []
+
+        async def slow_prewarm():
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        with patch.object(server.psx_client, "prewarm", slow_prewarm), patch.object(
+            server.settings, "BACKGROUND_REFRESH", False
+        ):
+            for _ in range(2):
+                async with Client(server.mcp) as client:
+                    await asyncio.wait_for(client.list_tools(), timeout=5)
+
+        assert cancelled == [True, True]
+        assert not server.psx_client.client.is_closed
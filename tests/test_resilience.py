@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Tests for retries, circuit breaking and stale fallback in PSXClient
+"""
+
+import pytest
+import asyncio
+import json
+import random
+import sys
+import os
+from unittest.mock import patch
+import httpx
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from psx_mcp.settings import settings  # noqa: E402
+from psx_mcp import tools  # noqa: E402
+from psx_mcp.client import PSXClient  # noqa: E402
+from psx_mcp.ratelimit import RateLimiter  # noqa: E402
+from psx_mcp.resilience import (  # noqa: E402
+    CircuitBreaker,
+    backoff_delay,
+    is_transient,
+)
+
+EOD_PAYLOAD = {
+    "status": 1,
+    "message": "",
+    "data": [[1759489200 - day * 86400, 300.0 + day, 1000, 299.0] for day in range(5)],
+}
+FAST_RETRIES = {
+    "MAX_RETRIES": 2,
+    "RETRY_BACKOFF_BASE": 0.001,
+    "RETRY_BACKOFF_MAX": 0.002,
+    "RETRY_ATTEMPT_TIMEOUT": 0.2,
+    "CIRCUIT_BREAKER_THRESHOLD": 2,
+    "CIRCUIT_BREAKER_RESET": 30.0,
+}
+
+
+def scripted_client(*statuses, **kwargs):
+    """PSXClient whose upstream answers with the given statuses in turn"""
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        status = statuses[min(len(calls), len(statuses)) - 1]
+        if status == 200:
+            return httpx.Response(200, json=EOD_PAYLOAD)
+        return httpx.Response(status)
+
+    kwargs.setdefault("series_ttl", 0)
+    kwargs.setdefault("max_age", 0)
+    psx_client = PSXClient(base_url="https://psx.test", **kwargs)
+    psx_client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return psx_client, calls
+
+
+@pytest.fixture(autouse=True)
+def fast_retries():
+    """Shrink backoff and timeouts so failure paths run in milliseconds"""
+    with patch.multiple(settings, **FAST_RETRIES):
+        yield
+
+
+class TestBackoff:
+    """Test the building blocks"""
+
+    def test_backoff_is_jittered_and_capped(self):
+        """Delays stay within the doubling ceiling and the cap"""
+        rng = random.Random(7)
+        delays = [backoff_delay(attempt, 0.5, 4.0, rng) for attempt in range(8)]
+
+        assert all(0 <= delay <= min(4.0, 0.5 * 2**n) for n, delay in enumerate(delays))
+        assert len(set(delays)) == len(delays)
+
+    def test_transient_errors(self):
+        """Network errors, timeouts, 429 and 5xx are retried; 4xx are not"""
+        request = httpx.Request("GET", "https://psx.test")
+
+        def status_error(status):
+            response = httpx.Response(status, request=request)
+            return httpx.HTTPStatusError("error", request=request, response=response)
+
+        assert is_transient(httpx.ConnectError("down"))
+        assert is_transient(asyncio.TimeoutError())
+        assert is_transient(status_error(503))
+        assert is_transient(status_error(429))
+        assert not is_transient(status_error(404))
+        assert not is_transient(ValueError("bad payload"))
+
+    def test_circuit_breaker_states(self):
+        """Open after the threshold, one trial when half-open, close on success"""
+        breaker = CircuitBreaker(threshold=2, reset_after=0)
+        breaker.record_failure()
+        assert breaker.state == "closed"
+        breaker.record_failure()
+        assert breaker.state == "half-open"  # reset_after=0: trial allowed
+
+        assert breaker.allow()
+        assert not breaker.allow()  # only one trial at a time
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+        breaker = CircuitBreaker(threshold=1, reset_after=60)
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert not breaker.allow()
+        assert 0 < breaker.retry_in() <= 60
+
+    def test_release_only_returns_the_claimed_trial(self):
+        """A permit that did not claim the half-open trial cannot give it back"""
+        breaker = CircuitBreaker(threshold=1, reset_after=0)
+        closed = breaker.allow()
+        breaker.record_failure()
+        trial = breaker.allow()
+
+        assert trial is not None
+        breaker.release(closed)
+        assert breaker.allow() is None
+        breaker.release(trial)
+        assert breaker.allow() is not None
+
+
+class TestClientResilience:
+    """Test retries, fail-fast and stale fallback through PSXClient"""
+
+    @pytest.mark.asyncio
+    async def test_transient_errors_are_retried(self):
+        """A 503 followed by a 200 succeeds without surfacing an error"""
+        psx_client, calls = scripted_client(503, 200)
+
+        series = await psx_client.get_eod_data("HBL")
+
+        assert len(series) == 5
+        assert not series.stale
+        assert len(calls) == 2
+        await psx_client.close()
+
+    @pytest.mark.asyncio
+    async def test_client_errors_are_not_retried(self):
+        """A 404 fails at once"""
+        psx_client, calls = scripted_client(404)
+
+        with pytest.raises(Exception, match="Failed to fetch EOD data for XYZ"):
+            await psx_client.get_eod_data("XYZ")
+
+        assert len(calls) == 1
+        await psx_client.close()
+
+    @pytest.mark.asyncio
+    async def test_slow_attempts_are_cut_off(self):
+        """An attempt longer than RETRY_ATTEMPT_TIMEOUT is abandoned and retried"""
+        calls = []
+
+        async def handler(request):
+            calls.append(request)
+            await asyncio.sleep(5)
+            return httpx.Response(200, json=EOD_PAYLOAD)
+
+        psx_client = PSXClient(base_url="https://psx.test")
+        psx_client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with patch.object(settings, "RETRY_ATTEMPT_TIMEOUT", 0.02):
+            with pytest.raises(Exception, match="Failed to fetch EOD data"):
+                await asyncio.wait_for(psx_client.get_eod_data("HBL"), 1)
+
+        assert len(calls) == settings.MAX_RETRIES + 1
+        await psx_client.close()
+
+    @pytest.mark.asyncio
+    async def test_circuit_opens_and_fails_fast(self):
+        """After repeated failed calls PSX is not contacted until the reset"""
+        psx_client, calls = scripted_client(503)
+
+        for symbol in ("HBL", "UBL"):
+            with pytest.raises(Exception):
+                await psx_client.get_eod_data(symbol)
+        attempts = len(calls)
+        with pytest.raises(Exception, match="eod is failing"):
+            await psx_client.get_eod_data("MCB")
+
+        assert attempts == 2 * (settings.MAX_RETRIES + 1)
+        assert len(calls) == attempts
+        assert psx_client.breakers["eod"].state == "open"
+        await psx_client.close()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_call_keeps_the_trial_of_another(self):
+        """A call cancelled mid-flight does not release a trial it never claimed"""
+        psx_client = PSXClient(base_url="https://psx.test")
+        started = asyncio.Event()
+
+        async def attempt():
+            started.set()
+            await asyncio.sleep(5)
+
+        pending = asyncio.ensure_future(psx_client._resilient("eod", attempt))
+        await started.wait()
+        # Meanwhile the circuit opens and lets a trial call through
+        breaker = psx_client.breakers["eod"]
+        breaker.reset_after = 0
+        for _ in range(breaker.threshold):
+            breaker.record_failure()
+        assert breaker.allow() is not None
+
+        pending.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+
+        assert breaker.state == "half-open"
+        assert breaker.allow() is None  # still only one trial at a time
+        await psx_client.close()
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_wait_is_not_a_failure(self):
+        """Queueing for a token does not eat the budget or trip the breaker"""
+        limiter = RateLimiter(rate=10, burst=1)
+        psx_client, calls = scripted_client(200, rate_limiter=limiter)
+        await limiter.acquire()
+
+        with patch.object(settings, "REQUEST_TIMEOUT", 0.05):
+            series = await psx_client.get_eod_data("HBL")
+
+        assert len(series) == 5
+        assert len(calls) == 1
+        assert psx_client.breakers["eod"].failures == 0
+        await psx_client.close()
+
+    @pytest.mark.asyncio
+    async def test_stale_series_is_served_without_retrying(self):
+        """With a last good series to fall back on, PSX is not retried"""
+        psx_client, calls = scripted_client(200, 503, 200)
+
+        await psx_client.get_eod_data("HBL")
+        stale = await psx_client.get_eod_data("HBL")
+
+        assert stale.stale
+        assert len(calls) == 2
+        assert psx_client.breakers["eod"].failures == 1
+        await psx_client.close()
+
+    @pytest.mark.asyncio
+    async def test_last_good_series_is_served_stale(self):
+        """When PSX fails, the previous series comes back marked stale"""
+        psx_client, calls = scripted_client(200, 503)
+
+        fresh = await psx_client.get_eod_data("HBL")
+        with patch.object(tools, "psx_client", psx_client):
+            payload = json.loads(await tools.history("HBL"))
+
+        assert payload["stale"] is True
+        assert payload["age"] >= 0
+        assert payload["data"] == fresh.to_records()
+        assert not fresh.stale
+        await psx_client.close()
+
+    @pytest.mark.asyncio
+    async def test_derived_results_report_staleness(self):
+        """price_at_time and volume_analysis carry the series' stale and age"""
+        psx_client, calls = scripted_client(200, 200, 503)
+
+        with patch.object(tools, "psx_client", psx_client):
+            analysis = json.loads(await tools.volume_analysis("HBL", days=100000))
+            fresh = json.loads(await tools.price_at_time("HBL", 1759489200))
+            stale = json.loads(await tools.price_at_time("HBL", 1759489200))
+
+        assert fresh["stale"] is False and fresh["age"] is None
+        assert stale["stale"] is True and stale["age"] >= 0
+        assert stale["data"] == fresh["data"]
+        assert analysis["stale"] is False and analysis["age"] is None
+        assert analysis["data_points"] == 5
+        await psx_client.close()
+
+    @pytest.mark.asyncio
+    async def test_snapshot_is_served_stale(self):
+        """A failed market watch refresh keeps serving the last snapshot"""
+        html = "<table><tbody><tr><td>HBL</td></tr></tbody></table>"
+        responses = iter([httpx.Response(200, text=html), httpx.Response(503)])
+
+        def handler(request):
+            return next(responses, httpx.Response(503))
+
+        psx_client = PSXClient(base_url="https://psx.test", snapshot_ttl=0, max_age=0)
+        psx_client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+        first = await psx_client.get_market_snapshot()
+        with patch.object(tools, "psx_client", psx_client):
+            payload = json.loads(await tools.market_data())
+
+        assert payload["stale"] is True
+        assert payload["snapshot_version"] == first.version
+        await psx_client.close()
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Tests for the market watch snapshot cache and the tools built on it
+"""
+
+import pytest
+import json
+import sys
+import os
+from unittest.mock import AsyncMock, patch
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from psx_mcp.client import PSXClient  # noqa: E402
+from psx_mcp.snapshot import MarketSnapshot  # noqa: E402
+from psx_mcp import tools  # noqa: E402
+
+MARKET_ROWS = [
+    {
+        "symbol": "HBL",
+        "sector": "Commercial Banks",
+        "listed_in": "KSE100",
+        "ldcp": 100.0,
+        "open_price": 101.0,
+        "high_price": 104.0,
+        "low_price": 99.0,
+        "current_price": 103.0,
+        "change": 3.0,
+        "change_percent": 3.0,
+        "volume": 1000000,
+    },
+    {
+        "symbol": "UBL",
+        "sector": "Commercial Banks",
+        "listed_in": "KSE100",
+        "ldcp": 200.0,
+        "open_price": 200.0,
+        "high_price": 201.0,
+        "low_price": 195.0,
+        "current_price": 196.0,
+        "change": -4.0,
+        "change_percent": -2.0,
+        "volume": 250000,
+    },
+    {
+        "symbol": "OGDC",
+        "sector": "Oil & Gas Exploration Companies",
+        "listed_in": "KSE100",
+        "ldcp": 80.0,
+        "open_price": 80.5,
+        "high_price": 84.0,
+        "low_price": 80.0,
+        "current_price": 84.0,
+        "change": 4.0,
+        "change_percent": 5.0,
+        "volume": 3000000,
+    },
+    {
+        "symbol": "PTC",
+        "sector": "Technology & Communication",
+        "listed_in": "KSE100",
+        "ldcp": 20.0,
+        "open_price": 20.0,
+        "high_price": 20.0,
+        "low_price": 20.0,
+        "current_price": 20.0,
+        "change": 0.0,
+        "change_percent": 0.0,
+        "volume": 0,
+    },
+]
+
+
+@pytest.fixture
+def cached_client():
+    """PSXClient whose market watch scrape is mocked out"""
+    client = PSXClient(snapshot_ttl=60)
+    client.get_market_watch_columns = AsyncMock(
+        return_value=MarketSnapshot.from_rows(MARKET_ROWS, version=0).columns
+    )
+    return client
+
+
+class TestMarketSnapshot:
+    """Test the columnar MarketSnapshot structure"""
+
+    def test_columns_are_typed_arrays(self):
+        """Numeric fields are stored as typed array columns"""
+        snapshot = MarketSnapshot.from_rows(MARKET_ROWS, version=1)
+
+        assert len(snapshot) == 4
+        assert snapshot.column("current_price").typecode == "d"
+        assert snapshot.column("volume").typecode == "q"
+        assert snapshot.column("symbol") == ("HBL", "UBL", "OGDC", "PTC")
+
+    def test_symbol_lookup(self):
+        """Symbols resolve to rows through the index, case-insensitively"""
+        snapshot = MarketSnapshot.from_rows(MARKET_ROWS, version=1)
+
+        assert snapshot.find("ogdc") == 2
+        assert snapshot.find("MISSING") is None
+        assert snapshot.row(snapshot.find("HBL")) == MARKET_ROWS[0]
+
+    def test_rows_round_trip(self):
+        """Materialized rows match the parsed input"""
+        snapshot = MarketSnapshot.from_rows(MARKET_ROWS, version=1)
+
+        assert snapshot.rows() == MARKET_ROWS
+        assert snapshot.rows([3, 0]) == [MARKET_ROWS[3], MARKET_ROWS[0]]
+
+    def test_order_by_and_filter(self):
+        """Sorting and filtering run over the columns"""
+        snapshot = MarketSnapshot.from_rows(MARKET_ROWS, version=1)
+
+        assert snapshot.order_by("change_percent", descending=True) == [2, 0, 3, 1]
+        assert snapshot.order_by("volume") == [3, 1, 0, 2]
+        assert snapshot.sector_rows("BANKS") == [0, 1]
+
+
+class TestSectorIndex:
+    """Test the per-snapshot sector index and aggregates"""
+
+    def test_sector_rows_match_substrings(self):
+        """Sector queries keep substring semantics and row order"""
+        snapshot = MarketSnapshot.from_rows(MARKET_ROWS, version=1)
+
+        assert snapshot.sector_rows("banks") == [0, 1]
+        assert snapshot.sector_rows("o") == [0, 1, 2, 3]
+        assert snapshot.sector_rows("unknown") == []
+
+    def test_sector_aggregates(self):
+        """Aggregates are precomputed for each sector"""
+        snapshot = MarketSnapshot.from_rows(MARKET_ROWS, version=1)
+        (banks,) = snapshot.sector_summaries("commercial banks")
+
+        assert banks["sector"] == "Commercial Banks"
+        assert banks["stocks"] == 2
+        assert banks["advancers"] == 1
+        assert banks["decliners"] == 1
+        assert banks["total_volume"] == 1250000
+        assert banks["volume_weighted_change_percent"] == 2.0
+        assert banks["best"] == {"symbol": "HBL", "change_percent": 3.0}
+        assert banks["worst"] == {"symbol": "UBL", "change_percent": -2.0}
+        assert len(snapshot.sector_summaries()) == 3
+
+
+class TestTopK:
+    """Test top-k selection over snapshot rankings"""
+
+    def test_top_matches_full_sort(self):
+        """Heap selection and cached orders agree with a stable full sort"""
+        snapshot = MarketSnapshot.from_rows(MARKET_ROWS, version=1)
+        expected = sorted(
+            range(4), key=lambda i: MARKET_ROWS[i]["change_percent"], reverse=True
+        )
+
+        first = snapshot.top("change_percent", 2)
+        assert ("change_percent", True) not in snapshot._orders
+        second = snapshot.top("change_percent", 3)
+        assert ("change_percent", True) in snapshot._orders
+
+        assert first == expected[:2]
+        assert second == expected[:3]
+        assert snapshot.top("change_percent", 2, descending=False) == [1, 3]
+
+    def test_derived_ranking_keys(self):
+        """Turnover, absolute change and range percent are derived columns"""
+        snapshot = MarketSnapshot.from_rows(MARKET_ROWS, version=1)
+
+        assert snapshot.top("turnover", 1) == [2]
+        assert snapshot.top("abs_change_percent", 2) == [2, 0]
+        assert snapshot.top("range_percent", 1) == [0]
+        assert snapshot.ranked_rows("turnover", [2])[0]["turnover"] == 252000000.0
+
+    def test_top_within_rows(self):
+        """Ranking can be restricted to a subset such as a sector"""
+        snapshot = MarketSnapshot.from_rows(MARKET_ROWS, version=1)
+
+        banks = snapshot.sector_rows("banks")
+        assert snapshot.top("volume", 5, row_ids=banks) == [0, 1]
+
+    def test_unknown_key_rejected(self):
+        """Unknown ranking keys raise a ValueError"""
+        snapshot = MarketSnapshot.from_rows(MARKET_ROWS, version=1)
+
+        with pytest.raises(ValueError):
+            snapshot.top("symbol", 3)
+
+
+class TestSnapshotCache:
+    """Test the TTL snapshot cache inside PSXClient"""
+
+    @pytest.mark.asyncio
+    async def test_snapshot_reused_within_ttl(self, cached_client):
+        """Repeated calls within the TTL share one scrape"""
+        first = await cached_client.get_market_snapshot()
+        second = await cached_client.get_market_snapshot()
+
+        assert first is second
+        assert first.version == 1
+        assert cached_client.get_market_watch_columns.await_count == 1
+        await cached_client.close()
+
+    @pytest.mark.asyncio
+    async def test_snapshot_refreshed_after_ttl(self, cached_client):
+        """A snapshot past its hard TTL is replaced by a new version"""
+        cached_client.ttls["snapshot"] = (0, 0)
+        first = await cached_client.get_market_snapshot()
+        second = await cached_client.get_market_snapshot()
+
+        assert second is not first
+        assert second.version == first.version + 1
+        assert cached_client.get_market_watch_columns.await_count == 2
+        await cached_client.close()
+
+
+class TestSnapshotTools:
+    """Test that the snapshot-based tools read from the shared cache"""
+
+    @pytest.mark.asyncio
+    async def test_tools_share_one_scrape(self, cached_client):
+        """Several snapshot tools back to back only scrape once"""
+        with patch.object(tools, "psx_client", cached_client):
+            await tools.market_data()
+            await tools.sector("Banks")
+            await tools.gainers(2)
+            await tools.losers(2)
+            await tools.ohlcv("HBL")
+            await tools.multi_ohlcv("HBL,OGDC")
+
+        assert cached_client.get_market_watch_columns.await_count == 1
+        await cached_client.close()
+
+    @pytest.mark.asyncio
+    async def test_response_reports_snapshot_age(self, cached_client):
+        """Snapshot tool payloads carry the version and age"""
+        with patch.object(tools, "psx_client", cached_client):
+            payload = json.loads(await tools.gainers(2))
+
+        assert payload["snapshot_version"] == 1
+        assert payload["snapshot_age"] >= 0
+        assert [row["symbol"] for row in payload["data"]] == ["OGDC", "HBL"]
+        await cached_client.close()
+
+    @pytest.mark.asyncio
+    async def test_field_projection(self, cached_client):
+        """Snapshot tools only return the requested fields"""
+        with patch.object(tools, "psx_client", cached_client):
+            rows = json.loads(await tools.market_data(fields="symbol,change_percent"))[
+                "data"
+            ]
+            movers = json.loads(await tools.top_movers("turnover", 1, fields="symbol"))[
+                "data"
+            ]
+            error = json.loads(await tools.gainers(2, fields="symbol,price"))
+
+        assert rows[0] == {"symbol": "HBL", "change_percent": 3.0}
+        assert len(rows) == len(MARKET_ROWS)
+        assert set(movers[0]) == {"symbol", "turnover"}
+        assert "Unknown StockData field(s): price" in error["error"]
+        await cached_client.close()
+
+    @pytest.mark.asyncio
+    async def test_sector_summary_tool(self, cached_client):
+        """sector_summary returns one aggregate per matching sector"""
+        with patch.object(tools, "psx_client", cached_client):
+            payload = json.loads(await tools.sector_summary("tech"))
+
+        assert len(payload["data"]) == 1
+        assert payload["data"][0]["unchanged"] == 1
+        await cached_client.close()
+
+    @pytest.mark.asyncio
+    async def test_top_movers_tool(self, cached_client):
+        """top_movers ranks by any key, optionally within a sector"""
+        with patch.object(tools, "psx_client", cached_client):
+            payload = json.loads(await tools.top_movers("volume", 1, "asc", "banks"))
+            invalid = json.loads(await tools.top_movers("volume", 1, "sideways"))
+
+        assert [row["symbol"] for row in payload["data"]] == ["UBL"]
+        assert "error" in invalid
+        await cached_client.close()
+
+    @pytest.mark.asyncio
+    async def test_multi_ohlcv_uses_symbol_index(self, cached_client):
+        """multi_ohlcv resolves symbols and flags unknown ones"""
+        with patch.object(tools, "psx_client", cached_client):
+            payload = json.loads(await tools.multi_ohlcv("ptc, hbl,NOPE"))
+
+        assert [row["symbol"] for row in payload["data"]] == ["PTC", "HBL", "NOPE"]
+        assert payload["data"][1]["close"] == 103.0
+        assert payload["data"][2]["error"] == "Not found"
+        await cached_client.close()
+
+
+def moved_rows():
+    """MARKET_ROWS a little later: HBL ticks up to a new high, UBL trades lower"""
+    rows = [dict(row) for row in MARKET_ROWS]
+    rows[0].update(current_price=105.0, high_price=105.0, volume=1200000)
+    rows[1].update(current_price=194.0, low_price=194.0, volume=260000)
+    return rows
+
+
+class TestSnapshotChanges:
+    """Test snapshot deltas and the changes_since tool"""
+
+    def test_only_changed_rows_are_returned(self):
+        """Unchanged stocks are left out; the biggest move comes first"""
+        older = MarketSnapshot.from_rows(MARKET_ROWS, version=1)
+        newer = MarketSnapshot.from_rows(moved_rows(), version=2)
+
+        changes = newer.changes_since(older)
+
+        assert [row["symbol"] for row in changes] == ["HBL", "UBL"]
+        assert changes[0]["price_change"] == 2.0
+        assert changes[0]["volume_added"] == 200000
+        assert (changes[0]["new_high"], changes[0]["new_low"]) == (True, False)
+        assert (changes[1]["new_high"], changes[1]["new_low"]) == (False, True)
+        assert newer.changes_since(older) is changes
+        assert newer.changes_since(newer) == []
+
+    def test_rows_are_aligned_by_symbol(self):
+        """Reordered or newly listed symbols are matched through the index"""
+        older = MarketSnapshot.from_rows(MARKET_ROWS, version=1)
+        rows = moved_rows()[::-1] + [dict(MARKET_ROWS[0], symbol="NEW")]
+        newer = MarketSnapshot.from_rows(rows, version=2)
+
+        changes = newer.changes_since(older)
+
+        assert [row["symbol"] for row in changes] == ["HBL", "UBL"]
+        assert changes[1]["price_change"] == -2.0
+
+    @pytest.mark.asyncio
+    async def test_changes_since_tool(self, cached_client):
+        """The tool compares against a kept version, or the previous snapshot"""
+        cached_client.ttls["snapshot"] = (0, 0)
+        cached_client.get_market_watch_columns.side_effect = [
+            MarketSnapshot.from_rows(MARKET_ROWS, version=0).columns,
+            MarketSnapshot.from_rows(MARKET_ROWS, version=0).columns,
+            MarketSnapshot.from_rows(moved_rows(), version=0).columns,
+            MarketSnapshot.from_rows(moved_rows(), version=0).columns,
+        ]
+        with patch.object(tools, "psx_client", cached_client):
+            first = json.loads(await tools.changes_since())
+            quiet = json.loads(await tools.changes_since())
+            moved = json.loads(await tools.changes_since(version=1))
+            expired = json.loads(await tools.changes_since(version=99))
+
+        assert first["since_version"] == first["snapshot_version"] == 1
+        assert (quiet["since_version"], quiet["data"]) == (1, [])
+        assert moved["snapshot_version"] == 3
+        assert [row["symbol"] for row in moved["data"]] == ["HBL", "UBL"]
+        assert "not cached" in expired["error"]
+        await cached_client.close()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Tests for the persistent EOD history store
+"""
+
+import pytest
+import sys
+import os
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from psx_mcp.client import PSXClient  # noqa: E402
+from psx_mcp.market_hours import (  # noqa: E402
+    PKT,
+    is_market_open,
+    last_close,
+    next_open,
+)
+from psx_mcp.settings import settings  # noqa: E402
+from psx_mcp.store import EODStore  # noqa: E402
+from psx_mcp.timeseries import TimeSeries  # noqa: E402
+
+EOD_RAW = [
+    [1759575600, 302.15, 1987654, 301],
+    [1759489200, 300.87, 2024970, 305],
+]
+# Bar of the Wednesday 2025-10-08 session
+SESSION_BAR = [1759921200, 305.10, 1500000, 302]
+NEWER_RAW = [
+    [1759662000, 299.50, 2154321, 303],
+    [1759575600, 302.40, 1990000, 301],
+    [1759489200, 300.87, 2024970, 305],
+]
+
+
+def json_response(payload):
+    """Build a mocked client.get returning a PSX JSON payload"""
+
+    async def fake_get(url, **kwargs):
+        response = Mock()
+        response.json.return_value = {"status": 1, "message": "", "data": payload}
+        response.raise_for_status.return_value = None
+        return response
+
+    return fake_get
+
+
+class TestMarketHours:
+    """Test session open/close resolution in Karachi time"""
+
+    def test_last_close(self):
+        """The latest close skips weekends and sessions still open"""
+        # Wednesday 2025-10-08, before and after the 15:30 close
+        morning = datetime(2025, 10, 8, 11, 0, tzinfo=PKT)
+        evening = datetime(2025, 10, 8, 16, 0, tzinfo=PKT)
+        sunday = datetime(2025, 10, 12, 12, 0, tzinfo=PKT)
+
+        assert last_close(morning) == datetime(2025, 10, 7, 15, 30, tzinfo=PKT)
+        assert last_close(evening) == datetime(2025, 10, 8, 15, 30, tzinfo=PKT)
+        assert last_close(sunday) == datetime(2025, 10, 10, 15, 30, tzinfo=PKT)
+
+    def test_session_open(self):
+        """Sessions run 09:30-15:30 on weekdays; the next open skips weekends"""
+        wednesday = datetime(2025, 10, 8, 11, 0, tzinfo=PKT)
+        friday_evening = datetime(2025, 10, 10, 16, 0, tzinfo=PKT)
+        early = datetime(2025, 10, 8, 9, 0, tzinfo=PKT)
+
+        assert is_market_open(wednesday)
+        assert not is_market_open(friday_evening)
+        assert not is_market_open(datetime(2025, 10, 11, 11, 0, tzinfo=PKT))
+        assert not is_market_open(datetime(2025, 10, 8, 15, 30, tzinfo=PKT))
+        assert next_open(early) == datetime(2025, 10, 8, 9, 30, tzinfo=PKT)
+        assert next_open(wednesday) == datetime(2025, 10, 9, 9, 30, tzinfo=PKT)
+        assert next_open(friday_evening) == datetime(2025, 10, 13, 9, 30, tzinfo=PKT)
+
+
+class TestEODStore:
+    """Test incremental merges and reads of stored history"""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        """Store rooted in a temporary data directory"""
+        return EODStore(str(tmp_path / "data"))
+
+    def test_merge_and_load(self, store):
+        """Stored history reads back newest first, like PSX serves it"""
+        series = TimeSeries.from_raw(EOD_RAW, with_open=True)
+
+        assert store.load("HBL") is None
+        assert store.merge("HBL", series) == 2
+        assert store.last_timestamp("HBL") == 1759575600
+        assert store.load("HBL").to_records() == series.to_records()
+        assert store.load("OGDC") is None
+
+    def test_merge_only_writes_newer_bars(self, store):
+        """Refreshes write new bars plus the last stored one"""
+        store.merge("HBL", TimeSeries.from_raw(EOD_RAW, with_open=True))
+        written = store.merge("HBL", TimeSeries.from_raw(NEWER_RAW, with_open=True))
+
+        assert written == 2
+        assert store.last_timestamp("HBL") == 1759662000
+        assert store.load("HBL").to_records() == (
+            TimeSeries.from_raw(NEWER_RAW, with_open=True).to_records()
+        )
+
+    def test_merge_keeps_the_served_order(self, store):
+        """A merged history keeps the order PSX serves the bars in"""
+        store.merge("HBL", TimeSeries.from_raw(EOD_RAW[::-1], with_open=True))
+        newer = TimeSeries.from_raw(NEWER_RAW[::-1], with_open=True)
+        store.merge("HBL", newer)
+
+        merged = store.load("HBL")
+        assert not merged.descending
+        assert merged.to_records() == newer.to_records()
+
+    def test_refresh_without_new_bars_keeps_history(self, store):
+        """A refresh with nothing new keeps every stored bar"""
+        store.merge("HBL", TimeSeries.from_raw(EOD_RAW, with_open=True))
+
+        assert store.merge("HBL", TimeSeries.from_raw([], with_open=True)) == 0
+        assert len(store.load("HBL")) == 2
+
+    def test_merge_drops_the_replaced_mapping(self, store):
+        """The cached mapping is released before its file is replaced"""
+        store.merge("HBL", TimeSeries.from_raw(EOD_RAW, with_open=True))
+        store.load("HBL")
+        mapped_while_writing = []
+
+        def write_series(path, series, refreshed_at):
+            mapped_while_writing.append("HBL" in store._mapped)
+
+        with patch("psx_mcp.store.write_series", side_effect=write_series):
+            store.merge("HBL", TimeSeries.from_raw(NEWER_RAW, with_open=True))
+
+        assert mapped_while_writing == [False]
+
+    def test_is_current_after_latest_close(self, store):
+        """A symbol refreshed after the latest close needs that session's bar"""
+        now = datetime(2025, 10, 8, 16, 0, tzinfo=PKT)
+        close = last_close(now).timestamp()
+        series = TimeSeries.from_raw(EOD_RAW, with_open=True)
+
+        assert not store.is_current("HBL", now)
+        store.merge("HBL", series, refreshed_at=close - 60)
+        assert not store.is_current("HBL", now)
+        # Refreshed before PSX published the session bar
+        store.merge("HBL", series, refreshed_at=close + 60)
+        assert not store.is_current("HBL", now)
+        latest = TimeSeries.from_raw([SESSION_BAR] + EOD_RAW, with_open=True)
+        store.merge("HBL", latest, refreshed_at=close + 120)
+        assert store.is_current("HBL", now)
+
+    def test_is_current_after_publish_grace(self, store):
+        """Without a bar for the session, a refresh after the grace period counts"""
+        now = datetime(2025, 10, 8, 18, 0, tzinfo=PKT)
+        close = last_close(now).timestamp()
+        series = TimeSeries.from_raw(EOD_RAW, with_open=True)
+
+        store.merge("HBL", series, refreshed_at=close + 60)
+        assert not store.is_current("HBL", now)
+        store.merge("HBL", series, refreshed_at=close + settings.EOD_PUBLISH_GRACE)
+        assert store.is_current("HBL", now)
+
+
+class TestClientStore:
+    """Test PSXClient serving EOD history through the store"""
+
+    @pytest.fixture
+    def psx_client(self, tmp_path):
+        """PSXClient backed by a temporary store"""
+        # The recorded bars predate the latest session: count refreshes at once
+        with patch.object(settings, "EOD_PUBLISH_GRACE", 0):
+            yield PSXClient(eod_store=EODStore(str(tmp_path)))
+
+    @pytest.mark.asyncio
+    async def test_current_store_skips_download(self, psx_client):
+        """Once refreshed after the close, history is read from disk"""
+        with patch.object(
+            psx_client.client, "get", side_effect=json_response(EOD_RAW)
+        ) as mock_get:
+            first = await psx_client.get_eod_data("HBL")
+            second = await psx_client.get_eod_data("HBL")
+
+            assert mock_get.call_count == 1
+            assert second.to_records() == first.to_records()
+
+        await psx_client.close()
+
+    @pytest.mark.asyncio
+    async def test_stale_store_is_refreshed(self, psx_client):
+        """A store behind the latest close is refreshed and merged"""
+        stale = last_close().timestamp() - 60
+        psx_client.eod_store.merge(
+            "HBL", TimeSeries.from_raw(EOD_RAW, with_open=True), stale
+        )
+
+        with patch.object(
+            psx_client.client, "get", side_effect=json_response(NEWER_RAW)
+        ) as mock_get:
+            series = await psx_client.get_eod_data("HBL")
+
+            assert mock_get.call_count == 1
+            assert series[0]["timestamp"] == 1759662000
+            assert len(series) == 3
+            assert psx_client.eod_store.is_current("HBL")
+
+        await psx_client.close()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Tests for the compact time series containers
+"""
+
+import pytest
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from psx_mcp.models import TimeSeriesData  # noqa: E402
+from psx_mcp.timeseries import TimeSeries  # noqa: E402
+
+EOD_RAW = [
+    [1759662000, 299.50, 2154321, 303],
+    [1759575600, "302.15", 1987654.0, 301],
+    [1759489200, 300.87, 2024970, 305],
+]
+INTRADAY_RAW = [
+    [1759491302, 300.50, 800],
+    [1759491300, 301.20, 1500],
+    [1759491298],
+    [1759491298, 300.87, 1000],
+]
+
+
+class TestTimeSeriesIngestion:
+    """Test bulk ingestion of raw PSX series"""
+
+    def test_eod_matches_model_dump(self):
+        """Bulk EOD ingestion yields the same records as per-point models"""
+        series = TimeSeries.from_raw(EOD_RAW, with_open=True)
+        expected = [
+            TimeSeriesData(
+                timestamp=item[0],
+                price=float(item[1]),
+                volume=int(item[2]),
+                open_price=float(item[3]),
+            ).model_dump()
+            for item in EOD_RAW
+        ]
+
+        assert series.to_records() == expected
+        assert series.timestamps.format == "q"
+        assert series.prices.format == "d"
+
+    def test_intraday_skips_short_points(self):
+        """Intraday points without price and volume are skipped"""
+        series = TimeSeries.from_raw(INTRADAY_RAW, with_open=False)
+
+        assert len(series) == 3
+        assert series.opens is None
+        assert series[1] == {
+            "timestamp": 1759491300,
+            "price": 301.2,
+            "volume": 1500,
+            "open_price": None,
+        }
+        assert list(series) == series.to_records()
+
+    def test_empty_and_invalid_input(self):
+        """Empty payloads give an empty series, bad values raise"""
+        assert len(TimeSeries.from_raw([], with_open=True)) == 0
+
+        with pytest.raises(ValueError):
+            TimeSeries.from_raw([[1759491300, "n/a", 10]], with_open=False)
+
+
+class TestTimeSeriesLookup:
+    """Test bisect-based range slicing and nearest-point lookup"""
+
+    @pytest.fixture
+    def series(self):
+        """Newest-first EOD series, as PSX serves it"""
+        return TimeSeries.from_raw(EOD_RAW, with_open=True)
+
+    def test_newest_first_order_is_preserved(self, series):
+        """Columns are sorted internally but records keep source order"""
+        assert series.descending
+        assert list(series.timestamps) == sorted(item[0] for item in EOD_RAW)
+        assert [point["timestamp"] for point in series] == [item[0] for item in EOD_RAW]
+        assert series[0]["timestamp"] == 1759662000
+        assert series[-1]["timestamp"] == 1759489200
+
+    def test_unsorted_input_is_sorted(self):
+        """Out-of-order points are sorted ascending with their columns"""
+        series = TimeSeries.from_raw(
+            [[30, 3.0, 300], [10, 1.0, 100], [20, 2.0, 200]], with_open=False
+        )
+
+        assert not series.descending
+        assert series.values("timestamp") == [10, 20, 30]
+        assert series.values("volume") == [100, 200, 300]
+
+    def test_between_matches_linear_filter(self, series):
+        """Range slices equal a linear filter over the records"""
+        for start, end in [
+            (1759489200, 1759575600),
+            (1759489201, 1759662000),
+            (0, 2**40),
+            (1759662001, 2**40),
+            (1759575600, 1759575600),
+        ]:
+            expected = [
+                point
+                for point in series.to_records()
+                if start <= point["timestamp"] <= end
+            ]
+            assert series.between(start, end).to_records() == expected
+
+    def test_between_is_zero_copy(self, series):
+        """Slices are views over the parent's columns"""
+        window = series.between(1759489200, 1759575600)
+
+        assert len(window) == 2
+        assert window.prices.obj is series.prices.obj
+        assert window.descending
+
+    def test_field_projection(self, series):
+        """Records and columns can be limited to selected fields"""
+        records = series.to_records(("timestamp", "price"))
+
+        assert records == [
+            {"timestamp": item[0], "price": float(item[1])} for item in EOD_RAW
+        ]
+        assert list(series.to_columns(("volume",))) == ["volume"]
+
+    def test_nearest_matches_linear_min(self):
+        """nearest() agrees with min() over records, including ties"""
+        raw = [[40, 4.0, 1], [30, 3.0, 1], [30, 3.5, 2], [10, 1.0, 1]]
+        for points in (raw, raw[::-1]):
+            series = TimeSeries.from_raw(points, with_open=False)
+            for target in range(0, 50):
+                expected = min(
+                    series.to_records(), key=lambda x: abs(x["timestamp"] - target)
+                )
+                assert series.nearest(target) == expected
+
+        assert TimeSeries.from_raw([], with_open=False).nearest(10) is None